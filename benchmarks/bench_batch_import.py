@@ -0,0 +1,46 @@
+"""Benchmark of importing many DOT files into a single project.
+
+Usage:
+    $ python benchmarks/bench_batch_import.py --n_files 300 --max_workers 4
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from codememo.graph_parsers.batch import BatchImporter
+
+
+def generate_dot_files(dir_out, n_files, n_funcs=2000, n_edges=2000, seed=0):
+    rng = random.Random(seed)
+    for i in range(n_files):
+        lines = ['digraph G {']
+        for _ in range(n_edges):
+            a, b = rng.randrange(n_funcs), rng.randrange(n_funcs)
+            lines.append(f'    "pkg.mod_{a // 100}.func_{a}" -> "pkg.mod_{b // 100}.func_{b}";')
+        lines.append('}')
+        Path(dir_out, f'test_{i}.dot').write_text('\n'.join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n_files', type=int, default=300)
+    parser.add_argument('--max_workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        generate_dot_files(dir_tmp, args.n_files)
+        for max_workers in (1, args.max_workers):
+            importer = BatchImporter(parser_type='.dot', max_workers=max_workers)
+            t_start = time.perf_counter()
+            node_collection = importer.import_from(dir_tmp)
+            elapsed = time.perf_counter() - t_start
+            print(
+                f'max_workers={max_workers}: {elapsed:.3f} s, '
+                f'nodes: {len(node_collection)}, files: {args.n_files}'
+            )
+
+
+if __name__ == '__main__':
+    main()
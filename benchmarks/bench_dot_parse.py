@@ -0,0 +1,86 @@
+"""Benchmark of parsing DOT files.
+
+Usage:
+    $ python benchmarks/bench_dot_parse.py --n_nodes 20000
+
+If `pygraphviz` and `networkx` are installed, the previous conversion pipeline
+(DOT -> AGraph -> networkx graph -> JSON graph) is measured as a reference.
+"""
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from codememo.graph_parsers import get_graph_parser
+
+
+def generate_dot_file(fn, n_nodes, n_leaves=3, seed=0):
+    rng = random.Random(seed)
+    with open(fn, 'w') as f:
+        f.write('digraph G {\n\tnode [shape=rect, style=filled];\n')
+        for i in range(n_nodes):
+            f.write(
+                f'\t"module.func_{i}"\t[color="#e5e5ff",\n\t\theight=0.5,\n'
+                f'\t\tlabel="module.func_{i}\\ncalls: 1\\ntime: 0.000040s",\n'
+                f'\t\tpos="{i % 100 * 80},{i // 100 * 60}",\n\t\twidth=1.0];\n'
+            )
+        for i in range(n_nodes - 1):
+            for j in rng.sample(range(i + 1, n_nodes), min(n_leaves, n_nodes - i - 1)):
+                f.write(f'\t"module.func_{i}" -> "module.func_{j}"\t[label=1];\n')
+        f.write('}\n')
+
+
+def measure(func, repeat):
+    elapsed = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - t_start)
+    return min(elapsed)
+
+
+def measure_peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n_nodes', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    dot_parser = get_graph_parser('.dot')
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        fn = str(Path(dir_tmp, 'call_graph.dot'))
+        generate_dot_file(fn, args.n_nodes)
+        print(f'nodes: {args.n_nodes}, size: {Path(fn).stat().st_size / 2**20:.1f} MiB')
+
+        t_native = measure(lambda: dot_parser.parse(fn), args.repeat)
+        m_native = measure_peak_memory(lambda: dot_parser.parse(fn))
+        print(f'native parser: {t_native:.3f} s, peak memory: {m_native / 2**20:.1f} MiB')
+
+        try:
+            import pygraphviz
+            from networkx import nx_agraph
+            from networkx.readwrite import json_graph
+        except ImportError:
+            return
+
+        def parse_with_pygraphviz():
+            graph = nx_agraph.from_agraph(pygraphviz.AGraph(fn))
+            return json_graph.node_link_data(graph)
+
+        t_ref = measure(parse_with_pygraphviz, args.repeat)
+        m_ref = measure_peak_memory(parse_with_pygraphviz)
+        print(f'pygraphviz + networkx (conversion only): {t_ref:.3f} s, peak memory: {m_ref / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark of importing folded stacks.
+
+Usage:
+    $ python benchmarks/bench_folded_parse.py --size 500
+
+Stacks are generated by random walks on a synthetic call graph, so that there
+are lots of distinct stacks sharing frames like real profiles.
+"""
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from codememo.graph_parsers import get_graph_parser
+
+
+def generate_folded_file(fn, size_mib, n_funcs=5000, max_depth=40, seed=0):
+    rng = random.Random(seed)
+    frames = [f'func_{i} (/src/module_{i // 50}.py:{i % 50 * 20 + 1})' for i in range(n_funcs)]
+    callees = [rng.sample(range(n_funcs), 8) for _ in range(n_funcs)]
+    target = size_mib * 2**20
+    with open(fn, 'w') as f:
+        written = 0
+        while written < target:
+            lines = []
+            for _ in range(1000):
+                idx, stack = 0, [frames[0]]
+                for _ in range(rng.randint(5, max_depth)):
+                    idx = rng.choice(callees[idx])
+                    stack.append(frames[idx])
+                lines.append(f'{";".join(stack)} {rng.randint(1, 100)}\n')
+            text = ''.join(lines)
+            f.write(text)
+            written += len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100, help='size of file in MiB')
+    parser.add_argument('--trace_memory', action='store_true')
+    args = parser.parse_args()
+
+    folded_parser = get_graph_parser('.folded')
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        fn = str(Path(dir_tmp, 'profile.folded'))
+        generate_folded_file(fn, args.size)
+        print(f'size: {Path(fn).stat().st_size / 2**20:.1f} MiB')
+
+        if args.trace_memory:
+            tracemalloc.start()
+        t_start = time.perf_counter()
+        node_collection = folded_parser.parse(fn)
+        elapsed = time.perf_counter() - t_start
+        print(f'import: {elapsed:.3f} s, nodes: {len(node_collection)}')
+        if args.trace_memory:
+            print(f'peak memory: {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
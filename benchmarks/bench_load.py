@@ -0,0 +1,65 @@
+"""Benchmark of loading project files.
+
+Usage:
+    $ python benchmarks/bench_load.py --n_nodes 20000
+"""
+import argparse
+import gc
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from codememo.objects import Snippet, Node, NodeCollection
+
+
+def generate_node_collection(n_nodes, n_leaves=3, n_lines=10, seed=0):
+    rng = random.Random(seed)
+    content = '\n'.join([f'    line_{i} = foo({i})' for i in range(n_lines)])
+    nodes = [
+        Node(Snippet(f'func_{i}', f'def func_{i}():\n{content}', lang='python'))
+        for i in range(n_nodes)
+    ]
+    for i, node in enumerate(nodes[:-1]):
+        candidates = rng.sample(range(i + 1, n_nodes), min(n_leaves, n_nodes - i - 1))
+        for j in candidates:
+            node.add_leaf(nodes[j], rng.randint(1, n_lines))
+    return NodeCollection(nodes)
+
+
+def measure(func, repeat):
+    elapsed = []
+    for _ in range(repeat):
+        # Collections loaded in previous runs are cyclic garbage, which should
+        # not be collected while measuring the next run
+        gc.collect()
+        t_start = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - t_start)
+    return min(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n_nodes', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    node_collection = generate_node_collection(args.n_nodes)
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        fn = str(Path(dir_tmp, 'project.json'))
+        node_collection.save(fn)
+
+        t_default = measure(lambda: NodeCollection.load(fn), args.repeat)
+        t_trusted = measure(lambda: NodeCollection.load(fn, trusted=True), args.repeat)
+        loaded = NodeCollection.load(fn, trusted=True)
+        t_validate = measure(loaded.validate, args.repeat)
+
+    print(f'nodes: {args.n_nodes}, edges: {sum(len(v.leaves) for v in node_collection)}')
+    print(f'load (validated): {t_default:.3f} s')
+    print(f'load (trusted):   {t_trusted:.3f} s  ({t_default / t_trusted:.2f}x)')
+    print(f'validate():       {t_validate:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
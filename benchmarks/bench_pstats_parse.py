@@ -0,0 +1,66 @@
+"""Benchmark of importing pstats files.
+
+Usage:
+    $ python benchmarks/bench_pstats_parse.py --n_funcs 1000000
+
+`pstats.Stats` is measured as a reference, since it's the usual way to load
+a dump file (and it does nothing but loading here).
+"""
+import argparse
+import marshal
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from codememo.graph_parsers import get_graph_parser
+
+
+def generate_pstats_file(fn, n_funcs, n_callers=2, seed=0):
+    rng = random.Random(seed)
+    funcs = [(f'/src/module_{i // 100}.py', i % 100 * 10 + 1, f'func_{i}') for i in range(n_funcs)]
+    stats = {}
+    for i, func in enumerate(funcs):
+        callers = {
+            funcs[j]: (1, 1, 1e-6, 1e-6)
+            for j in rng.sample(range(i), min(n_callers, i))
+        }
+        cumtime = rng.random() * 1e-3
+        stats[func] = (1, len(callers) or 1, cumtime / 2, cumtime, callers)
+    with open(fn, 'wb') as f:
+        marshal.dump(stats, f)
+
+
+def measure(func):
+    t_start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - t_start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n_funcs', type=int, default=200000)
+    parser.add_argument('--min_cumulative_time', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        fn = str(Path(dir_tmp, 'main.prof'))
+        generate_pstats_file(fn, args.n_funcs)
+        print(f'functions: {args.n_funcs}, size: {Path(fn).stat().st_size / 2**20:.1f} MiB')
+
+        pstats_parser = get_graph_parser(
+            '.prof', cache_dir=str(Path(dir_tmp, 'cache')),
+            min_cumulative_time=args.min_cumulative_time,
+        )
+        elapsed, node_collection = measure(lambda: pstats_parser.parse(fn))
+        print(f'import: {elapsed:.3f} s, nodes: {len(node_collection)}')
+        elapsed, _ = measure(lambda: pstats_parser.parse(fn))
+        print(f'import (cached): {elapsed:.3f} s')
+
+        import pstats
+        elapsed, _ = measure(lambda: pstats.Stats(fn))
+        print(f'pstats.Stats (reference): {elapsed:.3f} s')
+
+
+if __name__ == '__main__':
+    main()
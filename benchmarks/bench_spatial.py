@@ -0,0 +1,54 @@
+"""Benchmark of querying visible nodes from a spatial index of canvas.
+
+Usage:
+    $ python benchmarks/bench_spatial.py --n_nodes 10000
+"""
+import argparse
+import random
+import time
+
+from codememo.spatial import GridIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n_nodes', type=int, default=10000)
+    args = parser.parse_args()
+
+    # Nodes are laid out in columns like trees in `CodeNodeViewer`
+    rng = random.Random(0)
+    unit_x, unit_y, n_rows = 80, 80, int(args.n_nodes ** 0.5)
+    rects = [
+        (i // n_rows * unit_x, i % n_rows * unit_y, i // n_rows * unit_x + 64, i % n_rows * unit_y + 30)
+        for i in range(args.n_nodes)
+    ]
+
+    index = GridIndex()
+    t_start = time.perf_counter()
+    for i, rect in enumerate(rects):
+        index.insert(i, rect)
+    print(f'build: {time.perf_counter() - t_start:.3f} s, nodes: {len(index)}')
+
+    viewports = [
+        (x, y, x + 600, y + 400) for x, y in [
+            (rng.uniform(0, n_rows * unit_x), rng.uniform(0, n_rows * unit_y))
+            for _ in range(100)
+        ]
+    ]
+    t_start = time.perf_counter()
+    n_visible = sum([len(index.query(v)) for v in viewports])
+    elapsed = (time.perf_counter() - t_start) / len(viewports)
+    print(f'query: {elapsed * 1e6:.1f} us per viewport, visible: {n_visible / len(viewports):.1f}')
+
+    # Dragging a node by a few pixels in each frame
+    t_start = time.perf_counter()
+    n_frames = 10000
+    x0, y0, x1, y1 = rects[0]
+    for i in range(n_frames):
+        index.insert(0, (x0 + i, y0 + i, x1 + i, y1 + i))
+    elapsed = (time.perf_counter() - t_start) / n_frames
+    print(f'move: {elapsed * 1e6:.2f} us per update')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark of building and searching a symbol index of tags file.
+
+Usage:
+    $ python benchmarks/bench_symbols.py --n_symbols 1000000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from codememo.symbols import load_symbol_index
+
+
+def generate_tags_file(fn, n_symbols, seed=0):
+    rng = random.Random(seed)
+    kinds = ['class', 'function', 'member', 'variable']
+    with open(fn, 'w') as f:
+        for i in range(n_symbols):
+            name = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz_') for _ in range(rng.randint(3, 16)))
+            f.write(json.dumps({
+                '_type': 'tag', 'name': name, 'path': f'src/module_{i // 200}.py',
+                'line': i % 200 * 10 + 1, 'end': i % 200 * 10 + 9,
+                'kind': rng.choice(kinds), 'language': 'Python',
+            }) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n_symbols', type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        fn = str(Path(dir_tmp, 'project.tags'))
+        generate_tags_file(fn, args.n_symbols)
+        cache_dir = str(Path(dir_tmp, 'cache'))
+        print(f'size: {Path(fn).stat().st_size / 2**20:.1f} MiB')
+
+        t_start = time.perf_counter()
+        index = load_symbol_index(fn, cache_dir=cache_dir)
+        print(f'build index: {time.perf_counter() - t_start:.3f} s, symbols: {len(index)}')
+
+        # Invalidate in-memory index to measure loading from disk cache
+        Path(fn).touch()
+        t_start = time.perf_counter()
+        index = load_symbol_index(fn, cache_dir=cache_dir)
+        print(f'load cached index: {time.perf_counter() - t_start:.3f} s')
+
+        prefixes = ['a', 'ab', 'abc', 'x_y', 'hello']
+        t_start = time.perf_counter()
+        n_rounds = 1000
+        for _ in range(n_rounds):
+            for prefix in prefixes:
+                index.search(prefix)
+        elapsed = (time.perf_counter() - t_start) / (n_rounds * len(prefixes))
+        print(f'search: {elapsed * 1e6:.1f} us per query')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark of overhead of recording calls.
+
+Usage:
+    $ python benchmarks/bench_tracer.py --n 22
+
+If `pycallgraph2` is installed, it's measured as a reference.
+"""
+import argparse
+import time
+
+from codememo.tracer import CallRecorder
+
+
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+
+def measure(func, repeat=3):
+    elapsed = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        func()
+        elapsed.append(time.perf_counter() - t_start)
+    return min(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--n', type=int, default=22)
+    args = parser.parse_args()
+
+    t_base = measure(lambda: fib(args.n))
+    print(f'baseline: {t_base:.3f} s')
+
+    def run(**kwargs):
+        recorder = CallRecorder(**kwargs)
+        with recorder:
+            fib(args.n)
+        recorder.to_node_collection()
+
+    for kwargs in [{}, {'sample_interval': 10}, {'line_numbers': False}]:
+        elapsed = measure(lambda: run(**kwargs))
+        print(f'CallRecorder({kwargs}): {elapsed:.3f} s ({elapsed / t_base:.1f}x)')
+
+    try:
+        from pycallgraph2 import PyCallGraph
+        from pycallgraph2.output import GraphvizOutput
+    except ImportError:
+        return
+
+    class NullOutput(GraphvizOutput):
+        """Generate DOT source without running `dot`."""
+        def sanity_check(self):
+            pass
+
+        def done(self):
+            self.prepare_graph_attributes()
+            self.generate()
+
+    def run_pycallgraph():
+        with PyCallGraph(output=NullOutput()):
+            fib(args.n)
+
+    elapsed = measure(run_pycallgraph, repeat=1)
+    print(f'pycallgraph (reference): {elapsed:.3f} s ({elapsed / t_base:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
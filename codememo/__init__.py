@@ -3,6 +3,8 @@ from . import vendor
 
 from . import config
 from . import objects
+from . import archive
+from . import compression
 from . import components
 from . import events
 from . import exceptions
@@ -14,4 +16,7 @@ except:
     __version__ = '0.0.0.dev'
 
 
-__all__ = ['config', 'objects', 'components', 'events', 'exceptions', 'vendor']
+__all__ = [
+    'config', 'objects', 'archive', 'compression', 'components', 'events',
+    'exceptions', 'vendor',
+]
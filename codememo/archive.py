@@ -0,0 +1,334 @@
+"""A project container supporting random access to node records.
+
+Layout of an archive file (all integers are unsigned 64-bit little-endian):
+
+    MAGIC
+    node records        : compact JSON records (see `Node.to_record()`) without
+                          leaves, concatenated one after another
+    record offsets      : (n_nodes + 1) integers, record `i` is stored in
+                          `[offsets[i], offsets[i+1])`
+    edge offsets        : (n_nodes + 1) integers, leaves of node `i` are stored
+                          in `edges[3*edge_offsets[i]:3*edge_offsets[i+1]]`
+    edges               : n_edges * (leaf index, ref_start, ref_stop), where a
+                          `ref_stop` of 0 means `None`
+    names               : JSON array of snippet names
+    metadata            : JSON object of collection metadata (optional), see
+                          also `NodeCollection.metadata`
+    trailer             : n_nodes, n_edges, offset of footer, size of names, MAGIC
+
+The file is opened through `mmap`, so that opening an archive only reads the
+trailer. Node records are decoded on demand, and pages which are not touched
+are never read (and can be evicted by OS since they are not modified).
+
+Note that on-demand decoding (`read_node()`, `load_subgraph()`) is only
+available through this API. `NodeCollection.load()`, which is used by the app
+to open projects, always decodes all records since the viewer lays out the
+whole graph, so opening an archive in the app is not faster than opening a
+JSON project file.
+"""
+from array import array
+import json
+import mmap
+import struct
+import sys
+
+from .exceptions import FileLoadingException
+from .objects import Node, NodeCollection, _gc_paused
+
+
+__all__ = ['ProjectArchive']
+
+
+class ProjectArchive(object):
+    MAGIC = b'CMEMOARC'
+    SUFFIX = '.cma'
+    TRAILER_FORMAT = '<4Q8s'
+    TRAILER_SIZE = struct.calcsize(TRAILER_FORMAT)
+    # Number of records decoded between updates of progress
+    PROGRESS_CHUNK_SIZE = 4096
+
+    def __init__(self, fn):
+        """
+        Parameters
+        ----------
+        fn : str
+            Path of archive file.
+        """
+        self.fn = fn
+        self._file = open(fn, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as ex_value:
+            # Raised when file is empty
+            self._file.close()
+            raise FileLoadingException(f'Invalid archive file: {fn}') from ex_value
+        # Access pattern is not known until records are read, see `_advise()`
+        self._advice = None
+
+        try:
+            self._read_footer()
+        except (ValueError, struct.error) as ex:
+            self.close()
+            raise FileLoadingException(f'Invalid archive file: {fn}') from ex
+
+        self._names = None
+        self._nodes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.n_nodes
+
+    def _read_footer(self):
+        mm = self._mm
+        if len(mm) < len(self.MAGIC) + self.TRAILER_SIZE or mm[:len(self.MAGIC)] != self.MAGIC:
+            raise ValueError('magic number mismatch')
+        n_nodes, n_edges, offset_footer, size_names, magic = struct.unpack(
+            self.TRAILER_FORMAT, mm[-self.TRAILER_SIZE:]
+        )
+        if magic != self.MAGIC:
+            raise ValueError('magic number mismatch')
+
+        # Tables should be stored between records and trailer, otherwise views
+        # of them would be truncated or misaligned
+        size_tables = 8 * (2 * (n_nodes + 1) + 3 * n_edges)
+        if not (
+            len(self.MAGIC) <= offset_footer and
+            offset_footer + size_tables + size_names <= len(mm) - self.TRAILER_SIZE
+        ):
+            raise ValueError('tables are out of range')
+
+        self.n_nodes, self.n_edges = n_nodes, n_edges
+        start = offset_footer
+        self._offsets, start = self._view_integers(start, n_nodes + 1)
+        self._edge_offsets, start = self._view_integers(start, n_nodes + 1)
+        self._edges, start = self._view_integers(start, 3 * n_edges)
+        self._names_range = (start, start + size_names)
+        # Metadata is stored between names and trailer. It's empty in files
+        # written without metadata.
+        self._metadata_range = (start + size_names, len(mm) - self.TRAILER_SIZE)
+
+        # Only bounds of tables are checked here, so that pages of them are
+        # not read until they are accessed
+        if (
+            self._offsets[0] != len(self.MAGIC) or self._offsets[n_nodes] != offset_footer or
+            self._edge_offsets[0] != 0 or self._edge_offsets[n_nodes] != n_edges
+        ):
+            raise ValueError('offsets are inconsistent with trailer')
+
+    def _view_integers(self, start, count):
+        stop = start + 8 * count
+        if sys.byteorder == 'little':
+            # Zero-copy view, pages are loaded only when they are accessed
+            view = memoryview(self._mm)[start:stop].cast('Q')
+        else:
+            view = array('Q', self._mm[start:stop])
+            view.byteswap()
+        return view, stop
+
+    def _advise(self, advice):
+        """Tell OS how pages will be accessed, e.g. 'MADV_RANDOM' for reading
+        records on demand, so that readahead is disabled, or 'MADV_SEQUENTIAL'
+        for decoding all records. It's ignored if it's not supported."""
+        if advice == self._advice:
+            return
+        self._advice = advice
+        value = getattr(mmap, advice, None)
+        if value is not None and hasattr(self._mm, 'madvise'):
+            self._mm.madvise(value)
+
+    @classmethod
+    def is_archive(cls, fn):
+        try:
+            with open(fn, 'rb') as f:
+                return f.read(len(cls.MAGIC)) == cls.MAGIC
+        except OSError:
+            return False
+
+    def close(self):
+        # Views should be released before closing `mmap`
+        for name in ['_offsets', '_edge_offsets', '_edges']:
+            view = self.__dict__.pop(name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+    @property
+    def names(self):
+        """Snippet names of all nodes. They are decoded on first access."""
+        if self._names is None:
+            start, stop = self._names_range
+            self._names = json.loads(self._mm[start:stop].decode('utf-8'))
+        return self._names
+
+    @property
+    def metadata(self):
+        """Metadata of the collection. It's decoded on each access."""
+        start, stop = self._metadata_range
+        if stop <= start:
+            return {}
+        return json.loads(self._mm[start:stop].decode('utf-8'))
+
+    def find(self, pattern):
+        """Returns indices of nodes whose name matches given regex pattern."""
+        import re
+
+        regex = re.compile(pattern)
+        return [i for i, name in enumerate(self.names) if regex.search(name)]
+
+    def read_record(self, idx):
+        """Decode record of node at given index."""
+        start, stop = self._offsets[idx], self._offsets[idx + 1]
+        return json.loads(self._mm[start:stop].decode('utf-8'))
+
+    def read_node(self, idx):
+        """Returns node at given index. Note that leaves are not linked, see
+        also `load_subgraph()`."""
+        if idx not in self._nodes:
+            self._advise('MADV_RANDOM')
+            self._nodes[idx] = Node.from_record(self.read_record(idx))
+        return self._nodes[idx]
+
+    def iter_leaves(self, idx):
+        """Yields `(leaf_index, ref_start, ref_stop)` of node at given index
+        without decoding any record."""
+        edges = self._edges
+        for i in range(self._edge_offsets[idx], self._edge_offsets[idx + 1]):
+            ref_stop = edges[3*i + 2]
+            yield edges[3*i], edges[3*i + 1], (ref_stop if ref_stop != 0 else None)
+
+    def load_subgraph(self, indices, trusted=False):
+        """Returns a `NodeCollection` containing nodes reachable from given
+        indices. Only those nodes will be decoded.
+
+        Parameters
+        ----------
+        indices : list of int
+            Indices of entry nodes.
+        trusted : bool, optional
+            See also `NodeCollection.from_dict()`.
+        """
+        self._advise('MADV_RANDOM')
+        order, visited, stack = [], set(), list(indices)
+        while stack:
+            idx = stack.pop()
+            if idx in visited:
+                continue
+            visited.add(idx)
+            order.append(idx)
+            stack.extend(v[0] for v in self.iter_leaves(idx))
+
+        order.sort()
+        position_map = {v: i for i, v in enumerate(order)}
+        with _gc_paused():
+            node_collection = NodeCollection([
+                Node.from_record(self.read_record(i), trusted=trusted) for i in order
+            ])
+            edges = (
+                (position_map[idx], position_map[idx_leaf], ref_start, ref_stop)
+                for idx in order
+                for idx_leaf, ref_start, ref_stop in self.iter_leaves(idx)
+            )
+            node_collection.add_edges(edges, trusted=trusted)
+        return node_collection
+
+    def to_node_collection(self, trusted=False, progress=None):
+        """Decode all nodes and returns a `NodeCollection`.
+
+        Parameters
+        ----------
+        trusted : bool, optional
+            See also `NodeCollection.from_dict()`.
+        progress : codememo.tasks.TaskProgress, optional
+            Progress updated with decoded records, which is also checked for
+            cancellation between chunks of records.
+        """
+        self._advise('MADV_SEQUENTIAL')
+        if progress is not None:
+            progress.start_stage('Decoding', self.n_nodes)
+        nodes = self._decode_all(trusted, progress)
+
+        if progress is not None:
+            progress.start_stage('Building graph')
+        with _gc_paused():
+            node_collection = NodeCollection(nodes, metadata=self.metadata)
+            node_collection.add_edges(self._iter_all_edges(), trusted=trusted)
+        if progress is not None:
+            progress.n_edges = self.n_edges
+        return node_collection
+
+    def _decode_all(self, trusted, progress):
+        if progress is None:
+            with _gc_paused():
+                return [
+                    Node.from_record(self.read_record(i), trusted=trusted)
+                    for i in range(self.n_nodes)
+                ]
+
+        nodes = []
+        with _gc_paused():
+            for start in range(0, self.n_nodes, self.PROGRESS_CHUNK_SIZE):
+                progress.check()
+                stop = min(start + self.PROGRESS_CHUNK_SIZE, self.n_nodes)
+                nodes.extend([
+                    Node.from_record(self.read_record(i), trusted=trusted)
+                    for i in range(start, stop)
+                ])
+                progress.bytes_read = progress.n_nodes = stop
+        return nodes
+
+    def _iter_all_edges(self):
+        """Yields all edges as `(root_index, leaf_index, ref_start, ref_stop)`.
+        Unlike `iter_leaves()`, the whole edge table is read at once."""
+        edge_offsets = self._edge_offsets.tolist()
+        edges = self._edges.tolist()
+        for idx in range(self.n_nodes):
+            for i in range(3*edge_offsets[idx], 3*edge_offsets[idx + 1], 3):
+                yield idx, edges[i], edges[i + 1], (edges[i + 2] or None)
+
+    @classmethod
+    def write(cls, node_collection, fn):
+        """Write given `NodeCollection` to an archive file."""
+        nodes = node_collection.nodes
+        index_map = {v: i for i, v in enumerate(nodes)}
+        offsets, edge_offsets, edges = array('Q'), array('Q', [0]), array('Q')
+
+        with open(fn, 'wb') as f:
+            f.write(cls.MAGIC)
+            pos = len(cls.MAGIC)
+            for node in nodes:
+                offsets.append(pos)
+                data = json.dumps(
+                    node.to_record(), ensure_ascii=False, separators=(',', ':')
+                ).encode('utf-8')
+                f.write(data)
+                pos += len(data)
+
+                for leaf in node.leaves:
+                    ref_info = leaf.ref_infos[node.nid]
+                    edges.extend([index_map[leaf], ref_info.start, ref_info.stop or 0])
+                edge_offsets.append(len(edges) // 3)
+            offsets.append(pos)
+
+            names = json.dumps(
+                [v.snippet.name for v in nodes], ensure_ascii=False, separators=(',', ':')
+            ).encode('utf-8')
+
+            for table in [offsets, edge_offsets, edges]:
+                if sys.byteorder != 'little':
+                    table.byteswap()
+                f.write(table.tobytes())
+            f.write(names)
+            if node_collection.metadata:
+                f.write(json.dumps(
+                    node_collection.metadata, ensure_ascii=False, separators=(',', ':')
+                ).encode('utf-8'))
+            f.write(struct.pack(
+                cls.TRAILER_FORMAT, len(nodes), len(edges) // 3, pos, len(names), cls.MAGIC
+            ))
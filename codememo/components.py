@@ -1,5 +1,6 @@
-import time, re, math
+import time, re, math, glob
 from pathlib import Path
+from functools import partial
 
 from .vendor import imgui
 from .vendor.imgui import Vec2 as _Vec2
@@ -13,6 +14,7 @@ from .objects import (
 from .events import NodeEvent, NodeEventRegistry
 from .exceptions import NodeRemovalException
 from .internal import GlobalState
+from .spatial import GridIndex
 
 CODE_CHAR_WIDTH = 8
 CODE_CHAR_HEIGHT = 14
@@ -64,43 +66,110 @@ class MenuBar(ImguiComponent):
     def __init__(self, app):
         self.app = app
         self.file_dialog = None
+        # Map of project files being opened to their progress windows
+        self._opening_projects = {}
 
         self.app.shortcuts_registry.register('open_project', ['ctrl', 'o'], edge_trigger='positive')
         self.app.shortcuts_registry.register('new_project', ['ctrl', 'n'], edge_trigger='positive')
 
     def _open_project(self, fn):
-        # Check whether project has been opened
+        from .tasks import BackgroundTask
+
+        # Check whether project has been opened (or it's being opened)
         opened_files = [
             v.fn_src for v in self.app.imgui_components
             if isinstance(v, CodeNodeViewer)
         ]
-        if fn in opened_files:
+        self._opening_projects = {
+            k: v for k, v in self._opening_projects.items() if not v.terminated
+        }
+        if fn in opened_files or fn in self._opening_projects:
             msg = 'Project has been opened already.'
             GlobalState().push_error(ValueError(msg))
             return
 
-        try:
-            node_collection = NodeCollection.load(fn)
-        except Exception as ex:
-            GlobalState().push_error(ex)
-        else:
-            viewer = CodeNodeViewer(self.app, node_collection, fn_src=fn)
+        # Loading and layout run in a worker thread, so that other viewers keep
+        # working meanwhile. The viewer is created on UI thread after that.
+        layout_units = CodeNodeViewer.get_layout_units(self.app)
+
+        def load(progress):
+            # Project files are written by this application, so we skip the
+            # checks while loading and validate the whole collection at once.
+            # It's done before the viewer is created, since the viewer would
+            # modify the collection on UI thread.
+            node_collection = NodeCollection.load(fn, trusted=True, progress=progress)
+            progress.start_stage('Validating')
+            node_collection.validate()
+            progress.start_stage('Laying out')
+            layout = CodeNodeViewer.compute_layout(node_collection, *layout_units)
+            return node_collection, layout
+
+        def open_viewer(result):
+            node_collection, layout = result
+            viewer = CodeNodeViewer(self.app, node_collection, fn_src=fn, layout=layout)
             self.app.add_component(viewer)
             self.app.history.recently_opened_files.add(fn)
             self.app.history.write()
 
-    def _import_from_file(self, fn):
-        from .graph_parsers import get_graph_parser
+        task = BackgroundTask(load).start()
+        progress_window = TaskProgressModal(
+            self.app, f'Opening {Path(fn).name}', task, callback=open_viewer, modal=False,
+        )
+        self._opening_projects[fn] = progress_window
+        self.app.add_component(progress_window)
+
+    def _import_from_file(self, fn, parser_type=None):
+        from .graph_parsers import parser_registry
+
+        if parser_type is None:
+            parser_type = parser_registry.get_parser_type(fn)
+        options = self.app.config.importer.get_parser_options(parser_type)
+
+        # Parsing runs in a worker thread, and the viewer is created by the
+        # progress modal on UI thread after it's finished.
+        def parse(progress):
+            parser = parser_registry.get_parser(parser_type, **options)
+            parser.progress = progress
+            return parser.parse(fn)
+
+        self._run_import_task(f'Importing {Path(fn).name}', parse)
+
+    def _open_viewer(self, node_collection):
+        self.app.add_component(CodeNodeViewer(self.app, node_collection))
+
+    def _run_import_task(self, title, func, callback=None):
+        """Run `func(progress)` in background, and a viewer of returned
+        collection is opened by `callback` (or `_open_viewer()`) on UI thread
+        once it's finished."""
+        from .tasks import BackgroundTask
+
+        task = BackgroundTask(func).start()
+        callback = self._open_viewer if callback is None else callback
+        self.app.add_component(TaskProgressModal(self.app, title, task, callback=callback))
+
+    def _batch_import(self, source, parser_type=None):
+        from .graph_parsers.batch import BatchImporter, METADATA_KEY
+
+        options = self.app.config.importer.get_parser_options(parser_type)
+        # Positions laid out in separate graphs cannot be merged
+        options.pop('layout', None)
+
+        def import_files(progress):
+            importer = BatchImporter(parser_type=parser_type, parser_options=options)
+            importer.progress = progress
+            return importer.import_from(source)
+
+        def open_viewer(node_collection):
+            errors = node_collection.metadata[METADATA_KEY]['errors']
+            if errors:
+                # Other files are imported anyway
+                msg = '\n'.join([f'{k}: {v}' for k, v in errors.items()])
+                GlobalState().push_error(
+                    ValueError(f'Failed to import {len(errors)} file(s):\n{msg}')
+                )
+            self._open_viewer(node_collection)
 
-        try:
-            parser_type = Path(fn).suffix
-            parser = get_graph_parser(parser_type)
-            node_collection = parser.parse(fn)
-        except Exception as ex:
-            GlobalState().push_error(ex)
-        else:
-            viewer = CodeNodeViewer(self.app, node_collection)
-            self.app.add_component(viewer)
+        self._run_import_task(f'Importing {source}', import_files, callback=open_viewer)
 
     def handle_shortcuts(self):
         action_name = self.app.shortcuts_registry.triggered_shortcut
@@ -134,19 +203,25 @@ class MenuBar(ImguiComponent):
 
     def render_menu_import(self):
         if imgui.begin_menu('Import', True):
-            self._menu_import__from_dot_file()
+            self._menu_import__from_file()
+            imgui.separator()
+            self._menu_import__batch()
             imgui.end_menu()
 
     def _menu_file__quit(self):
         clicked, selected = imgui.menu_item('Quit')
         if clicked:
-            # Check whether there are unsaved changes before quitting
-            for component in self.app.imgui_components:
-                if hasattr(component, 'close'):
-                    component.close()
-                    break
-            else:
-                exit(1)
+            self.quit()
+
+    def quit(self):
+        """Close a viewer, which asks for saving unsaved changes, or exit if
+        there is no viewer. Other windows (e.g. progress of tasks) are not
+        closed here since they would be dropped without being noticed."""
+        for component in self.app.imgui_components:
+            if isinstance(component, CodeNodeViewer):
+                component.close()
+                return
+        exit(1)
 
     def _menu_file__new_project(self, triggered_by_shortcut=False):
         clicked = False
@@ -176,10 +251,38 @@ class MenuBar(ImguiComponent):
                     self.app.history.write()
             imgui.end_menu()
 
-    def _menu_import__from_dot_file(self):
-        clicked = imgui.menu_item('From .dot')[0]
-        if clicked and (self.file_dialog is None):
-            self.file_dialog = OpenFileDialog(self.app, self._import_from_file)
+    def _menu_import__from_file(self):
+        from .graph_parsers import parser_registry
+
+        # Parsers are discovered only once, and their modules are not imported
+        # until they are used.
+        for ext in parser_registry.extensions:
+            clicked = imgui.menu_item(f'From {ext}')[0]
+            if clicked and (self.file_dialog is None):
+                try:
+                    capabilities = parser_registry.capabilities(ext)
+                except Exception as ex:
+                    GlobalState().push_error(ex)
+                    continue
+                self.file_dialog = OpenFileDialog(
+                    self.app, partial(self._import_from_file, parser_type=ext),
+                    allow_directory=capabilities['directory'],
+                )
+
+    def _menu_import__batch(self):
+        from .graph_parsers import parser_registry
+
+        # Files in a directory, or those matching a glob pattern, are merged
+        # into a single project.
+        if imgui.begin_menu('Batch import', True):
+            for ext in parser_registry.extensions:
+                clicked = imgui.menu_item(f'From {ext} files')[0]
+                if clicked and (self.file_dialog is None):
+                    self.file_dialog = OpenFileDialog(
+                        self.app, partial(self._batch_import, parser_type=ext),
+                        allow_directory=True, allow_glob=True,
+                    )
+            imgui.end_menu()
 
 
 class CodeSnippetWindow(ImguiComponent):
@@ -685,9 +788,9 @@ class CodeNodeComponent(ImguiComponent):
             A `codememo.objects.Node` instance including necessary information
             for this node.
         """
+        self.container = None
         self.id = _id
         self.pos = pos
-        self.size = Vec2(60, 13)    # just an initial value, should be set after rendered
         self.node = node
 
         self.snippet_window = None
@@ -700,10 +803,50 @@ class CodeNodeComponent(ImguiComponent):
             app.config.viewer, 'node_max_name_length', NODE_MAX_NAME_LEGNTH
         )
 
-        self.container = None
+        # Just an estimated value, it should be set after rendered
+        self.size = (
+            Vec2(len(self.display_name) * CODE_CHAR_WIDTH, CODE_CHAR_HEIGHT) +
+            2 * NODE_WINDOW_PADDING
+        )
+
         self.is_showing_context_menu = False
         self.confirmation_modal = False
 
+    @property
+    def pos(self):
+        return self._pos
+
+    @pos.setter
+    def pos(self, value):
+        # Container is notified to update its spatial index
+        changed = getattr(self, '_pos', None) != value
+        self._pos = value
+        if changed and self.container is not None:
+            self.container.handle_node_moved(self)
+
+    @property
+    def size(self):
+        return self._size
+
+    @size.setter
+    def size(self, value):
+        changed = getattr(self, '_size', None) != value
+        self._size = value
+        if changed and self.container is not None:
+            self.container.handle_node_moved(self)
+
+    @property
+    def rect(self):
+        """Rectangle `(x_min, y_min, x_max, y_max)` of this node on canvas."""
+        pos, size = self._pos, self._size
+        return (pos.x, pos.y, pos.x + size.x, pos.y + size.y)
+
+    @property
+    def has_opened_windows(self):
+        """Whether there are windows (e.g. snippet window) opened by this node,
+        which should be rendered even if this node is not visible."""
+        return self.snippet_window is not None or bool(self.confirmation_modal)
+
     @property
     def name(self):
         return self.node.snippet.name
@@ -744,7 +887,7 @@ class CodeNodeComponent(ImguiComponent):
                 break       # process one interaction at a time
 
         if interaction_name != '':
-            is_item_clicked = imgui.is_item_clicked()
+            is_item_clicked = self.container.clicked_node is self
             event_name = self.INTERACTION_EVENT_NAME_MAP[interaction_name]
             event = self.container.state_cache[event_name]
 
@@ -771,51 +914,41 @@ class CodeNodeComponent(ImguiComponent):
             callback_yes=lambda: self.container.remove_root_reference(target, root),
         )
 
-    def render(self, draw_list, offset):
+    def render(self, draw_list, offset, zoom=1.0):
+        """
+        Parameters
+        ----------
+        draw_list : imgui.core._DrawList
+            Draw list of canvas.
+        offset : Vec2
+            Screen position of the origin of canvas.
+        zoom : float, optional
+            Scale of canvas. Font scale of canvas should be set accordingly.
+        """
         assert isinstance(self.container, CodeNodeViewer), (
             f'require a container {CodeNodeViewer} to render, got {self.container}'
         )
 
-        node_rect_min = Vec2(*(offset + self.pos))
+        node_rect_min = Vec2(*(offset + self.pos * zoom))
 
         # Display node contents first
         draw_list.channels_set_current(1)   # foreground
-        old_any_active = imgui.is_any_item_active()
-        imgui.set_cursor_screen_pos(node_rect_min + NODE_WINDOW_PADDING)
+        imgui.set_cursor_screen_pos(node_rect_min + NODE_WINDOW_PADDING * zoom)
         imgui.begin_group()
         imgui.text(f'{self.display_name}')
         imgui.end_group()
 
-        # Save the size
-        self.size = Vec2(*imgui.get_item_rect_size()) + 2 * NODE_WINDOW_PADDING
-        node_rect_max = node_rect_min + self.size
+        # Save the size, which is kept in scale of canvas
+        self.size = Vec2(*imgui.get_item_rect_size()) * (1 / zoom) + 2 * NODE_WINDOW_PADDING
+        node_rect_max = node_rect_min + self.size * zoom
 
-        # Display node box
+        # Display node box. Mouse events are handled by container, which finds
+        # the node under mouse cursor with hit-testing.
         draw_list.channels_set_current(0)
-        imgui.set_cursor_screen_pos(node_rect_min)
-        imgui.invisible_button('node', *self.size)
 
-        # Display CodeSnippetWindow
-        if imgui.is_item_hovered():
-            # Show full name in tooltip if length of name is too long
-            if len(self.name) > self._max_name_length:
-                imgui.set_tooltip(self.name)
-
-            # Open CodeSnippetWindow when double-clicked or ALT + click
-            if imgui.is_mouse_double_clicked() or (
-                imgui.get_io().key_alt and imgui.is_mouse_clicked()
-            ):
-                self.open_snippet_window()
-
-        if self.snippet_window is not None:
-            if self.snippet_window.window_opened:
-                self.snippet_window.render()
-            else:
-                # Window has been closed, so we remove this reference.
-                self.snippet_window = None
-
-        # TODO: for context menu
-        self.container.handle_active_node(self, old_any_active)
+        # Show full name in tooltip if length of name is too long
+        if self.container.hovered_node is self and len(self.name) > self._max_name_length:
+            imgui.set_tooltip(self.name)
 
         # Set background color
         bg_state = 'normal'
@@ -832,10 +965,12 @@ class CodeNodeComponent(ImguiComponent):
         fg_color_tuple = self.NODE_FG_COLOR_MAP.get(interaction_name, '')
         node_fg_color = imgui.get_color_u32_rgba(*fg_color_tuple)
 
-        draw_list.add_rect_filled(*node_rect_min, *node_rect_max, node_bg_color, 4.0)
-        draw_list.add_rect(*node_rect_min, *node_rect_max, node_fg_color, 4.0)
+        draw_list.add_rect_filled(*node_rect_min, *node_rect_max, node_bg_color, 4.0 * zoom)
+        draw_list.add_rect(*node_rect_min, *node_rect_max, node_fg_color, 4.0 * zoom)
 
-        self.is_showing_context_menu = imgui.begin_popup_context_item('node-context-menu', 2)
+        if self.container.context_menu_node is self:
+            imgui.open_popup('node-context-menu')
+        self.is_showing_context_menu = imgui.begin_popup('node-context-menu')
         if self.is_showing_context_menu:
             if len(self.node.roots) != 0 and imgui.selectable('Remove root reference')[0]:
                 if len(self.node.roots) == 1:
@@ -852,6 +987,18 @@ class CodeNodeComponent(ImguiComponent):
                 )
             imgui.end_popup()
 
+        self.render_windows()
+
+    def render_windows(self):
+        """Render windows opened by this node. This is also called by container
+        when this node is outside the visible region of canvas."""
+        if self.snippet_window is not None:
+            if self.snippet_window.window_opened:
+                self.snippet_window.render()
+            else:
+                # Window has been closed, so we remove this reference.
+                self.snippet_window = None
+
         if self.confirmation_modal:
             self.confirmation_modal.render()
             if self.confirmation_modal.terminated:
@@ -866,6 +1013,7 @@ class CodeNodeCreatorWindow(ImguiComponent):
     INPUT_SNIPPET_URL_MAX_LENGTH = 2048
     INPUT_SNIPPET_CONTENT_MAX_LENGTH = 65536
     INPUT_START_LINE_MAX_LENGTH = 16
+    MAX_SYMBOL_CANDIDATES = 20
 
     def __init__(self, app, creation_pos=None, **kwargs):
         self.app = app
@@ -880,6 +1028,9 @@ class CodeNodeCreatorWindow(ImguiComponent):
         self.input_snippet_lang = ''
         self.input_snippet = ''
         self.input_start_line = '1'
+        # Symbols matching the snippet name, which are found in the symbol
+        # index of container
+        self.symbol_candidates = []
 
         self.modal_opened = False
 
@@ -937,6 +1088,37 @@ class CodeNodeCreatorWindow(ImguiComponent):
         self.event_registry.dispatch(event)
         self.close()
 
+    def search_symbols(self, prefix):
+        index = self.container.symbol_index
+        if index is None:
+            self.symbol_candidates = []
+        else:
+            self.symbol_candidates = index.search(prefix, limit=self.MAX_SYMBOL_CANDIDATES)
+
+    def apply_symbol(self, symbol):
+        """Fill in inputs with the snippet of given symbol."""
+        try:
+            snippet = self.container.symbol_index.read_snippet(symbol)
+        except Exception as ex:
+            GlobalState().push_error(ex)
+            return
+        self.input_snippet_name = snippet.name
+        self.input_snippet_path = snippet.path
+        self.input_snippet_lang = snippet.lang
+        self.input_start_line = str(snippet.line_start)
+        self.input_snippet = snippet.content
+        self.symbol_candidates = []
+
+    def display_symbol_candidates(self):
+        imgui.begin_child('symbol-candidates', 0, 100, border=True)
+        for i, symbol in enumerate(self.symbol_candidates):
+            name = f'{symbol.scope}.{symbol.name}' if symbol.scope else symbol.name
+            label = f'{name} ({symbol.kind}) {Path(symbol.path).name}:{symbol.line}##{i}'
+            if imgui.selectable(label)[0]:
+                self.apply_symbol(symbol)
+                break
+        imgui.end_child()
+
     def display_error_modal(self, error_msg):
         imgui.open_popup('Error')
         self.modal_opened, _ = imgui.begin_popup_modal(
@@ -978,6 +1160,9 @@ class CodeNodeCreatorWindow(ImguiComponent):
         imgui.pop_item_width()
         if changed:
             self.input_snippet_name = text
+            self.search_symbols(text)
+        if self.symbol_candidates:
+            self.display_symbol_candidates()
 
         imgui.text('Language:')
         if imgui.is_item_hovered():
@@ -1058,6 +1243,13 @@ class CodeNodeCreatorWindow(ImguiComponent):
         imgui.end()
 
 
+def _contains_rect(outer, inner):
+    return (
+        outer[0] <= inner[0] and outer[1] <= inner[1] and
+        outer[2] >= inner[2] and outer[3] >= inner[3]
+    )
+
+
 class CodeNodeViewer(ImguiComponent):
     """ A viewer for CodeNodeComponent.
     reference: https://gist.github.com/ocornut/7e9b3ec566a333d725d4
@@ -1065,10 +1257,27 @@ class CodeNodeViewer(ImguiComponent):
     DEFAULT_NODE_LIST_WIDTH = 100.0
     SEARCH_TEXT_MAX_LENGTH = 128
     DEFAULT_NODE_OFFSET_Y = 80
+    # Pixels per point of positions imported from Graphviz
+    GRAPHVIZ_POSITION_SCALE = 1.5
+    LINK_ARROW_LENGTH = 8.0
+    ZOOM_MIN = 0.001
+    ZOOM_MAX = 2.0
+    # Relative change of zoom per step of mouse wheel
+    ZOOM_STEP = 0.1
+    # Nodes are rendered as components with labels, tooltips and context menus
+    # only above this zoom. Below it, they are drawn as plain rectangles.
+    LOD_ZOOM_THRESHOLD = 0.5
+    # Size of the pixel grid which nodes and links are snapped to at low zoom,
+    # so that those overlapping on screen are drawn only once
+    LOD_GRID_SIZE = 2.0
+    # Grid of canvas is hidden if its lines are closer than this
+    MIN_GRID_SIZE = 8.0
     NODE_LINK_COLOR_TUPLE = (1, 1, 0, 1)
     NODE_SLOT_COLOR_TUPLE = (0.75, 0.75, 0.75, 1)
+    RUBBER_BAND_COLOR_TUPLE = (0.75, 0.75, 0.75, 0.15)
+    LOD_LINK_COLOR_TUPLE = (1, 1, 0, 0.4)
 
-    def __init__(self, app, node_collection, fn_src=None):
+    def __init__(self, app, node_collection, fn_src=None, layout=None):
         """
         Parameters
         ----------
@@ -1078,6 +1287,9 @@ class CodeNodeViewer(ImguiComponent):
             Collection of nodes.
         fn_src : str, optional
             Filename of the source which `node_collection` is loaded from.
+        layout : tuple, optional
+            Result of `compute_layout()` calculated in advance (e.g. in a
+            background thread). It's calculated here by default.
         """
         self.app = app
         self.fn_src = fn_src
@@ -1092,13 +1304,47 @@ class CodeNodeViewer(ImguiComponent):
 
         self.node_collection = node_collection
         self.node_components = []
+        # A map from `Node.nid` to `CodeNodeComponent` for fast lookup
+        self.node_component_map = {}
         self.filtered_node_components = []
+
+        # Spatial indices of node components and links (by their index in
+        # `self.links`) on canvas, so that only visible ones are rendered.
+        # They are updated when nodes are moved or links are changed.
+        self._node_index = GridIndex()
+        self._link_index = GridIndex()
+        # A map from `Node.nid` to indices of links connected to that node
+        self._link_indices_by_nid = {}
+        # Node components rendered in current frame, and those have opened
+        # windows which should be rendered even if they are not visible
+        self._visible_node_components = []
+        self._window_owners = set()
+        # Geometry drawn at low zoom, see also `display_lod()`. It's rebuilt
+        # when `_geometry_version` is changed by moving nodes or links.
+        self._lod_cache = None
+        self._geometry_version = 0
+        # A map from indices of links to their geometry, which is invalidated
+        # when their nodes are moved or resized
+        self._link_geometry = {}
         self.links = []
         self.id_selected = -1
         self.id_hovered_in_list = -1
         self.id_hovered_in_scene = -1
         self.selected_node = None
+        # Node components selected on canvas, and `selected_node` is the one
+        # selected last
+        self.selected_node_components = set()
+        # Results of hit-testing of mouse cursor in current frame
+        self.hovered_node = None
+        self.clicked_node = None
+        self.context_menu_node = None
+        # 'nodes' while moving selected nodes, or 'rubber_band' while selecting
+        # nodes in a rectangle
+        self._canvas_drag_mode = None
+        self._rubber_band_start = None
+        self._context_menu_canvas_pos = Vec2(0.0, 0.0)
         self.panning = Vec2(0.0, 0.0)
+        self.zoom = 1.0
 
         # NOTE: We should keep node id be auto incremental to prevent dupliate
         # id being used by newly created node.
@@ -1115,13 +1361,7 @@ class CodeNodeViewer(ImguiComponent):
         self._canvas_size = Vec2(0.0, 0.0)
 
         # Settings for layout of nodes
-        max_name_length = getattr(
-            self.app.config.viewer, 'node_max_name_length', NODE_MAX_NAME_LEGNTH
-        )
-        self._layout_node_offset_x = max_name_length * CODE_CHAR_WIDTH + 2 * NODE_WINDOW_PADDING.x
-        self._layout_node_offset_y = getattr(
-            self.app.config.viewer, 'layout_node_offset_y', self.DEFAULT_NODE_OFFSET_Y
-        )
+        self._layout_node_offset_x, self._layout_node_offset_y = self.get_layout_units(app)
 
         # --- Flags for view control
         # Show grid
@@ -1131,6 +1371,8 @@ class CodeNodeViewer(ImguiComponent):
 
         self.file_dialog = None
         self.confirmation_modal = None
+        # Loaded lazily, and it's False if it failed to be loaded
+        self._symbol_index = None
 
         self.prev_dragging_delta = Vec2(0.0, 0.0)
         self.prev_panning_delta = Vec2(0.0, 0.0)
@@ -1168,10 +1410,10 @@ class CodeNodeViewer(ImguiComponent):
         if 'save_as' not in self.app.shortcuts_registry.registry:
             self.app.shortcuts_registry.register('save_as', ['ctrl', 'shift', 's'])
 
-        self.init_nodes_and_links()
+        self.init_nodes_and_links(layout=layout)
 
     @classmethod
-    def load(self, app, fn):
+    def load(cls, app, fn):
         node_collection = NodeCollection.load(fn)
         return cls(app, node_collection, fn_src=fn)
 
@@ -1182,6 +1424,186 @@ class CodeNodeViewer(ImguiComponent):
         self.fn_src = fn
         self.window_name = f"CodeNode Viewer: {Path(fn).with_suffix('').name} ###{self.window_id}"
 
+    @property
+    def symbol_index(self):
+        """Index of symbols for creating nodes, which is available if this
+        project is imported from a tags file."""
+        from .graph_parsers._ctags import METADATA_KEY
+        from .symbols import load_symbol_index
+
+        info = self.node_collection.metadata.get(METADATA_KEY)
+        if info is None or self._symbol_index is False:
+            return None
+        if self._symbol_index is None:
+            try:
+                self._symbol_index = load_symbol_index(info['path'])
+            except Exception as ex:
+                GlobalState().push_error(ex)
+                self._symbol_index = False
+                return None
+        return self._symbol_index
+
+    @property
+    def links(self):
+        return self._links
+
+    @links.setter
+    def links(self, value):
+        self._links = value
+        self._update_link_index()
+
+    def _update_link_index(self):
+        self._geometry_version += 1
+        self._link_geometry = {}
+        self._link_index.clear()
+        self._link_indices_by_nid = {}
+        for i, link in enumerate(self._links):
+            self._link_indices_by_nid.setdefault(link.root.nid, []).append(i)
+            if link.leaf is not link.root:
+                self._link_indices_by_nid.setdefault(link.leaf.nid, []).append(i)
+            self._index_link(i)
+
+    def _index_link(self, idx):
+        link = self._links[idx]
+        root = self.node_component_map.get(link.root.nid)
+        leaf = self.node_component_map.get(link.leaf.nid)
+        if root is None or leaf is None or root.pos is None or leaf.pos is None:
+            # Components are not created yet
+            return
+        # Bounding box of both nodes, including slots and arrows. Circles of
+        # self references are drawn above nodes, and their radius depends on
+        # width of node.
+        r1, r2 = root.rect, leaf.rect
+        margin = NODE_SLOT_RADIUS + self.LINK_ARROW_LENGTH
+        if root is leaf:
+            margin += root.size.x
+        self._link_index.insert(idx, (
+            min(r1[0], r2[0]) - margin, min(r1[1], r2[1]) - margin,
+            max(r1[2], r2[2]) + margin, max(r1[3], r2[3]) + margin,
+        ))
+
+    def _get_link_geometry(self, idx):
+        """Returns cached geometry of a link, see `_compute_link_geometry()`."""
+        geometry = self._link_geometry.get(idx)
+        if geometry is None:
+            geometry = self._compute_link_geometry(self._links[idx])
+            if geometry is not None:
+                self._link_geometry[idx] = geometry
+        return geometry
+
+    def _compute_link_geometry(self, link):
+        """Compute geometry of a link, or returns None if its nodes are not
+        placed yet.
+
+        Returns
+        -------
+        geometry : tuple
+            `(x1, y1, x2, y2, ax1, ay1, ax2, ay2, circle)`, where `(x1, y1)` and
+            `(x2, y2)` are the slots of leaf and root in canvas coordinates,
+            `(ax*, ay*)` are offsets of the other vertices of arrow from the
+            first slot in screen pixels (they don't change with zoom), and
+            `circle` is `(cx, cy, r)` of a self reference or None.
+        """
+        node_leaf = self.node_component_map.get(link.leaf.nid)
+        node_root = self.node_component_map.get(link.root.nid)
+        if node_leaf is None or node_root is None or node_leaf.pos is None or node_root.pos is None:
+            return None
+        x1, y1 = node_leaf.get_root_slot_pos(link.root_slot)
+        x2, y2 = node_root.get_leaf_slot_pos(link.leaf_slot)
+
+        circle = None
+        if node_root is node_leaf:
+            # Self reference is drawn as a circle passing through the top
+            # middle of node and the leaf slot
+            x1, y1 = node_leaf.pos.x + node_leaf.size.x / 2, node_leaf.pos.y
+            vx, vy = x2 - x1, y2 - y1
+            d = math.sqrt(vx**2 + vy**2)
+            # Center is moved from the middle point along unit normal vector
+            cx, cy = (x1 + x2) / 2 + vy / 2, (y1 + y2) / 2 - vx / 2
+            circle = (cx, cy, d / 2**0.5)
+            vx, vy = 0.0, 1.0
+        else:
+            vx, vy = x1 - x2, y1 - y2
+            d = math.sqrt(vx**2 + vy**2)
+            vx, vy = (vx / d, vy / d) if d > 0 else (0.0, 1.0)
+
+        # Since angles of arrows are fixed, here we just hard-coded these values
+        # in order to reduce calculation
+        cos30d, sin30d = 0.8660254037844387, 0.5
+        vx, vy = vx * self.LINK_ARROW_LENGTH, vy * self.LINK_ARROW_LENGTH
+        return (
+            x1, y1, x2, y2,
+            -(vx*cos30d + vy*sin30d), -(-vx*sin30d + vy*cos30d),
+            -(vx*cos30d - vy*sin30d), -(vx*sin30d + vy*cos30d),
+            circle,
+        )
+
+    def handle_node_moved(self, node_component):
+        """Update spatial indices after a node is moved or resized."""
+        nid = node_component.node.nid
+        if self.node_component_map.get(nid) is not node_component:
+            return
+        self._geometry_version += 1
+        link_indices = self._link_indices_by_nid.get(nid, ())
+        for idx in link_indices:
+            self._link_geometry.pop(idx, None)
+        if node_component.pos is None:
+            self._node_index.remove(node_component)
+            return
+        self._node_index.insert(node_component, node_component.rect)
+        for idx in link_indices:
+            self._index_link(idx)
+
+    def rebuild_spatial_index(self):
+        """Rebuild spatial indices after node components are changed."""
+        self._node_index.clear()
+        for component in self.node_components:
+            if component.pos is not None:
+                self._node_index.insert(component, component.rect)
+        self._update_link_index()
+        self._window_owners = set([
+            v for v in self._window_owners if self.node_component_map.get(v.node.nid) is v
+        ])
+        self.selected_node_components = set([
+            v for v in self.selected_node_components
+            if self.node_component_map.get(v.node.nid) is v
+        ])
+
+    def get_visible_rect(self):
+        """Returns the visible region `(x_min, y_min, x_max, y_max)` of canvas
+        in canvas coordinates."""
+        x_min, y_min = -self.panning.x / self.zoom, -self.panning.y / self.zoom
+        return (
+            x_min, y_min,
+            x_min + self._canvas_size.x / self.zoom, y_min + self._canvas_size.y / self.zoom,
+        )
+
+    def to_canvas_pos(self, screen_pos):
+        """Convert a position on screen to canvas coordinates."""
+        return (screen_pos - self._canvas_screen_pos - self.panning) * (1 / self.zoom)
+
+    def zoom_at(self, zoom, pivot):
+        """Change zoom while keeping the canvas position under `pivot` (a
+        position relative to the top-left corner of canvas) fixed."""
+        zoom = min(max(zoom, self.ZOOM_MIN), self.ZOOM_MAX)
+        self.panning = pivot - (pivot - self.panning) * (zoom / self.zoom)
+        self.zoom = zoom
+
+    def zoom_to_fit(self):
+        """Zoom and pan canvas to show all nodes."""
+        rects = [v.rect for v in self.node_components if v.pos is not None]
+        if not rects or self._canvas_size.x <= 0 or self._canvas_size.y <= 0:
+            return
+        x_min, y_min = min([v[0] for v in rects]), min([v[1] for v in rects])
+        x_max, y_max = max([v[2] for v in rects]), max([v[3] for v in rects])
+        margin = 2 * NODE_WINDOW_PADDING.x
+        zoom = min(
+            self._canvas_size.x / (x_max - x_min + 2 * margin),
+            self._canvas_size.y / (y_max - y_min + 2 * margin),
+        )
+        self.zoom = min(max(zoom, self.ZOOM_MIN), self.ZOOM_MAX)
+        self.panning = Vec2(margin - x_min, margin - y_min) * self.zoom
+
     def add_leaf_reference(self, root, target, **kwargs):
         try:
             self.node_collection.add_leaf_reference(root, target, **kwargs)
@@ -1196,13 +1618,72 @@ class CodeNodeViewer(ImguiComponent):
         except Exception as ex:
             GlobalState().push_error(ex)
 
-    def init_nodes_and_links(self):
-        trees, orphans = self.node_collection.resolve_trees()
-        self.links = self.node_collection.resolve_links_from_trees(trees)
+    def init_nodes_and_links(self, layout=None):
+        if layout is None:
+            nodes, positions = self.calculate_layout()
+        else:
+            nodes, positions, self.links = layout
+
+        if len(self.node_components) == 0:
+            # Instantiate `CodeNodeComponent`s with calculated positions
+            self.node_components = [
+                self._new_node_component(i, positions[i], v) for i, v in enumerate(nodes)
+            ]
+            self.update_node_component_map()
+        else:
+            # Update position instead if `CodeNodeComponent`s are already created
+            position_map = {v.nid: pos for v, pos in zip(nodes, positions)}
+            for component in self.node_components:
+                component.pos = position_map[component.node.nid]
+        self.rebuild_spatial_index()
+
+    @classmethod
+    def get_layout_units(cls, app):
+        """Returns horizontal and vertical distance between nodes in layout
+        according to config of given application."""
+        max_name_length = getattr(
+            app.config.viewer, 'node_max_name_length', NODE_MAX_NAME_LEGNTH
+        )
+        unit_x = max_name_length * CODE_CHAR_WIDTH + 2 * NODE_WINDOW_PADDING.x
+        unit_y = getattr(app.config.viewer, 'layout_node_offset_y', cls.DEFAULT_NODE_OFFSET_Y)
+        return unit_x, unit_y
+
+    def calculate_layout(self):
+        """Returns nodes and their positions arranged according to trees, and
+        links are updated as well. See also `compute_layout()`."""
+        nodes, positions, self.links = self.compute_layout(
+            self.node_collection, self._layout_node_offset_x, self._layout_node_offset_y,
+        )
+        return nodes, positions
+
+    @classmethod
+    def compute_layout(cls, node_collection, unit_x, unit_y):
+        """Returns nodes, their positions arranged according to trees, and
+        resolved links. Positions imported from Graphviz are used if they are
+        available.
+
+        This doesn't touch any viewer or UI state, so it can be called in a
+        background thread before the viewer is created.
+
+        Parameters
+        ----------
+        node_collection : codememo.objects.NodeCollection
+            Collection of nodes.
+        unit_x, unit_y : float
+            Distance between nodes, see also `get_layout_units()`.
+        """
+        imported = cls._get_imported_positions(node_collection.nodes)
+        if imported and all([v is not None for v in imported]):
+            # Nodes are laid out already, so trees are not required
+            links = node_collection.resolve_links()
+            return list(node_collection.nodes), imported, links
+
+        trees, orphans = node_collection.resolve_trees()
+        links = node_collection.resolve_links_from_trees(trees)
 
         # Calculate position according to tree
         positions = []
-        ux, uy = self._layout_node_offset_x, self._layout_node_offset_y
+        ux, uy = unit_x, unit_y
         x_offset = ux if len(orphans) != 0 else 0
         y_offset = 0
         tree_widths = [max([len(layer) for layer in tree]) for tree in trees]
@@ -1221,24 +1702,48 @@ class CodeNodeViewer(ImguiComponent):
             nodes.extend([v for layer in tree for v in layer])
         nodes.extend(orphans)
 
-        if len(self.node_components) == 0:
-            # Instantiate `CodeNodeComponent`s with calculated positions
-            init_kwargs = {
-                'convert_tab_to_spaces': self.app.config.text_input.convert_tab_to_spaces,
-                'tab_to_spaces_number': self.app.config.text_input.tab_to_spaces_number,
-            }
-            self.node_components = [
-                CodeNodeComponent(self.app, i, positions[i], v, **init_kwargs)
-                for i, v in enumerate(nodes)
+        if any([v is not None for v in imported]):
+            # Nodes without imported positions are placed on the right side
+            imported = cls._get_imported_positions(nodes)
+            x_offset = max([v.x for v in imported if v is not None]) + ux
+            positions = [
+                Vec2(pos.x + x_offset, pos.y) if v is None else v
+                for v, pos in zip(imported, positions)
             ]
-            # Set container (viewer) for nodes
-            for node in self.node_components:
-                node.set_container(self)
-        else:
-            # Update position instead if `CodeNodeComponent`s are already created
-            for component in self.node_components:
-                idx = nodes.index(component.node)
-                component.pos = positions[idx]
+        return nodes, positions, links
+
+    @classmethod
+    def _get_imported_positions(cls, nodes):
+        """Returns positions on canvas converted from those imported from
+        Graphviz, or None for nodes without them."""
+        from .graph_parsers._dot import POSITION_KEY
+
+        imported = [node.metadata.get(POSITION_KEY) for node in nodes]
+        valid = [v for v in imported if v is not None]
+        if not valid:
+            return [None] * len(nodes)
+
+        # Flip y axis since it points upward in Graphviz
+        scale = cls.GRAPHVIZ_POSITION_SCALE
+        x_min = min([v[0] for v in valid])
+        y_max = max([v[1] for v in valid])
+        return [
+            None if v is None else Vec2((v[0] - x_min) * scale, (y_max - v[1]) * scale)
+            for v in imported
+        ]
+
+    def _new_node_component(self, index, pos, node):
+        init_kwargs = {
+            'convert_tab_to_spaces': self.app.config.text_input.convert_tab_to_spaces,
+            'tab_to_spaces_number': self.app.config.text_input.tab_to_spaces_number,
+        }
+        component = CodeNodeComponent(self.app, index, pos, node, **init_kwargs)
+        # Set container (viewer) for node
+        component.set_container(self)
+        return component
+
+    def update_node_component_map(self):
+        self.node_component_map = {v.node.nid: v for v in self.node_components}
 
     def reset_hovered_id_cache(self):
         self.id_hovered_in_list = -1
@@ -1254,23 +1759,137 @@ class CodeNodeViewer(ImguiComponent):
         return (
             self.id_hovered_in_list == node.id or
             self.id_hovered_in_scene == node.id or
-            (self.id_hovered_in_list == -1 and self.id_selected == node.id)
+            (self.id_hovered_in_list == -1 and self.id_selected == node.id) or
+            node in self.selected_node_components
         )
 
+    def get_node_component_at(self, pos):
+        """Returns the topmost node component at given position on canvas, or
+        None if there is no node."""
+        hits = self._node_index.query_point(pos.x, pos.y)
+        if not hits:
+            return None
+        # Nodes are rendered in order of ID, so the last one is on the top
+        return max(hits, key=lambda v: v.id)
+
+    def get_node_components_in(self, rect):
+        """Returns node components intersecting given rectangle on canvas."""
+        return sorted(self._node_index.query(rect), key=lambda v: v.id)
+
+    def select_node_components(self, node_components, add=False):
+        """Select given node components on canvas. If `add` is True, they are
+        added to current selection instead of replacing it."""
+        if add:
+            self.selected_node_components.update(node_components)
+        else:
+            self.selected_node_components = set(node_components)
+        if self.selected_node not in self.selected_node_components:
+            self.id_selected = -1
+            self.selected_node = None
+
     def create_node_component(self, node, node_pos=None):
         self.node_collection.nodes.append(node)
 
-        init_kwargs = {
-            'convert_tab_to_spaces': self.app.config.text_input.convert_tab_to_spaces,
-            'tab_to_spaces_number': self.app.config.text_input.tab_to_spaces_number,
-        }
-
         index = self._id_auto_increment
         self._id_auto_increment += 1
 
-        component = CodeNodeComponent(self.app, index, node_pos, node, **init_kwargs)
-        component.set_container(self)
+        component = self._new_node_component(index, node_pos, node)
         self.node_components.append(component)
+        self.node_component_map[node.nid] = component
+        self.handle_node_moved(component)
+
+    def update_from_source(self):
+        """Update nodes after source files of an imported project are changed.
+        Positions of existing nodes are kept, and new nodes are placed
+        according to the layout of updated collection."""
+        from .graph_parsers import parser_registry
+        from .graph_parsers._python import MANIFEST_KEY
+
+        if MANIFEST_KEY not in self.node_collection.metadata:
+            return
+        try:
+            parser = parser_registry.get_parser('.py')
+            changes = parser.update(self.node_collection)
+        except Exception as ex:
+            GlobalState().push_error(ex)
+            return
+
+        removed_nids = set([v.nid for v in changes['removed']])
+        updated_nids = set([v.nid for v in changes['updated']])
+        self.node_components = [
+            v for v in self.node_components if v.node.nid not in removed_nids
+        ]
+        for component in self.node_components:
+            # Snippet windows are closed since their content is outdated
+            if component.node.nid in updated_nids:
+                component.snippet_window = None
+        if self.selected_node is not None and self.selected_node.node.nid in removed_nids:
+            self.id_selected = -1
+            self.selected_node = None
+
+        nodes, positions = self.calculate_layout()
+        position_map = {v.nid: pos for v, pos in zip(nodes, positions)}
+        for node in changes['added']:
+            component = self._new_node_component(
+                self._id_auto_increment, position_map[node.nid], node
+            )
+            self._id_auto_increment += 1
+            self.node_components.append(component)
+        self.update_node_component_map()
+        self.filtered_node_components = self.node_components
+        self.rebuild_spatial_index()
+
+    def resolve_sources(self, fn):
+        """Fill in snippets which have no content with source code found in
+        given directory. If a script is given, its directory is searched, and
+        names without a module part are looked up in that script."""
+        from .sources import SourceResolver
+
+        if Path(fn).is_dir():
+            resolver = SourceResolver(source_roots=[fn])
+        else:
+            resolver = SourceResolver(source_roots=[str(Path(fn).parent)], main_path=fn)
+        try:
+            resolved = resolver.resolve(self.node_collection)
+        except Exception as ex:
+            GlobalState().push_error(ex)
+            return
+
+        resolved_nids = set([v.nid for v in resolved])
+        for component in self.node_components:
+            # Snippet windows are closed since their content is outdated
+            if component.node.nid in resolved_nids:
+                component.snippet_window = None
+
+    def remove_selected_node_components(self):
+        """Remove all selected nodes after confirmation. Leaves which are not
+        selected are kept."""
+        removed = set(self.selected_node_components)
+        if len(removed) == 0:
+            return
+
+        def _remove_selected_nodes():
+            try:
+                self.node_collection.remove_nodes([v.node for v in removed])
+            except Exception as ex:
+                GlobalState().push_error(ex)
+                return
+            self.node_components = [v for v in self.node_components if v not in removed]
+            self.filtered_node_components = [
+                v for v in self.filtered_node_components if v not in removed
+            ]
+            self.update_node_component_map()
+            self.links = self.node_collection.resolve_links()
+            self.rebuild_spatial_index()
+            if self.selected_node in removed:
+                self.id_selected = -1
+                self.selected_node = None
+
+        self.confirmation_modal = ConfirmationModal(
+            'Confirm',
+            f'Are you sure you want to remove {len(removed)} selected nodes?',
+            callback_yes=_remove_selected_nodes,
+        )
 
     def remove_node_component(self, node_component):
         try:
@@ -1278,21 +1897,24 @@ class CodeNodeViewer(ImguiComponent):
             idx = self.node_components.index(node_component)
             node_component_id = node_component.id
             self.node_components.pop(idx)
+            self.node_component_map.pop(node_component.node.nid)
             self.links = self.node_collection.resolve_links()
+            self.rebuild_spatial_index()
             if self.id_selected == node_component_id:
                 self.id_selected = -1   # reset index of selected node
                 self.selected_node = None
         except NodeRemovalException as ex_node_removal:
             def _remove_node_and_leaves(node_component):
-                uuids = [v.node.uuid for v in self.node_components]
                 removed = self.node_collection.remove_node_and_its_leaves(node_component.node)
 
-                for node in removed:
-                    idx = uuids.index(node.uuid)
-                    self.node_components.pop(idx)
-                    uuids.pop(idx)
+                removed_nids = set([v.nid for v in removed])
+                self.node_components = [
+                    v for v in self.node_components if v.node.nid not in removed_nids
+                ]
+                self.update_node_component_map()
 
                 self.links = self.node_collection.resolve_links()
+                self.rebuild_spatial_index()
                 self.id_selected = -1
                 self.selected_node = None
 
@@ -1302,8 +1924,10 @@ class CodeNodeViewer(ImguiComponent):
 
                 idx = self.node_components.index(node_component)
                 self.node_components.pop(idx)
+                self.node_component_map.pop(node_component.node.nid)
 
                 self.links = self.node_collection.resolve_links()
+                self.rebuild_spatial_index()
                 if self.id_selected == node_component.id:
                     self.id_selected = -1
                     self.selected_node = None
@@ -1322,11 +1946,17 @@ class CodeNodeViewer(ImguiComponent):
             GlobalState().push_error(ex)
 
     def init_canvas(self):
-        imgui.text(f'Offset to origin: ({self.panning.x}, {self.panning.y})  ')
+        imgui.text(
+            f'Offset to origin: ({self.panning.x:.0f}, {self.panning.y:.0f}), '
+            f'zoom: {self.zoom:.0%}  '
+        )
         imgui.same_line()
         imgui.text('(?)')
         if imgui.is_item_hovered():
-            imgui.set_tooltip('Hold middle mouse button to pan canvas')
+            imgui.set_tooltip(
+                'Hold middle mouse button to pan canvas\n'
+                'Scroll mouse wheel to zoom canvas'
+            )
         imgui.push_style_var(imgui.STYLE_FRAME_PADDING, Vec2(1, 1))
         imgui.push_style_var(imgui.STYLE_WINDOW_PADDING, Vec2(0, 0))
         imgui.push_style_color(imgui.COLOR_CHILD_BACKGROUND, *(0.05, 0.1, 0.15))
@@ -1368,6 +1998,21 @@ class CodeNodeViewer(ImguiComponent):
         if clicked or triggered_by_shortcut:
             self.file_dialog = SaveFileDialog(self.app, self.save_data)
 
+    def handle_menu_item_update_from_source(self):
+        from .graph_parsers._python import MANIFEST_KEY
+
+        enabled = MANIFEST_KEY in self.node_collection.metadata
+        clicked = imgui.menu_item('Update from source', enabled=enabled)[0]
+        if clicked:
+            self.update_from_source()
+
+    def handle_menu_item_resolve_sources(self):
+        clicked = imgui.menu_item('Resolve sources')[0]
+        if clicked and self.file_dialog is None:
+            self.file_dialog = OpenFileDialog(
+                self.app, self.resolve_sources, allow_directory=True
+            )
+
     def handle_menu_item_close(self):
         clicked, selected = imgui.menu_item('Close')
         if clicked:
@@ -1378,6 +2023,16 @@ class CodeNodeViewer(ImguiComponent):
         if clicked:
             self.init_nodes_and_links()
 
+    def handle_menu_item_zoom_to_fit(self):
+        clicked, selected = imgui.menu_item('Zoom to fit')
+        if clicked:
+            self.zoom_to_fit()
+
+    def handle_menu_item_reset_zoom(self):
+        clicked, selected = imgui.menu_item('Reset zoom')
+        if clicked:
+            self.zoom_at(1.0, 0.5 * self._canvas_size)
+
     def handle_menu_item_show_grid(self):
         _, self.show_grid = imgui.checkbox('Show grid', self.show_grid)
 
@@ -1411,25 +2066,105 @@ class CodeNodeViewer(ImguiComponent):
         if self.file_dialog and self.file_dialog.terminated:
             self.file_dialog = None
 
-    def handle_active_node(self, node_component, old_any_active):
-        node_widgets_active = (not old_any_active) and imgui.is_any_item_active()
+    def handle_canvas_input(self, offset):
+        """Handle mouse events on canvas. Node under mouse cursor is found by
+        hit-testing against the spatial index, so only nodes nearby are
+        checked. This should be called right after the canvas button is
+        submitted."""
+        io = imgui.get_io()
+        mouse_pos = self.to_canvas_pos(Vec2(*imgui.get_mouse_pos()))
 
+        self.hovered_node = self.clicked_node = self.context_menu_node = None
         if imgui.is_item_hovered():
-            self.id_hovered_in_scene = node_component.id
-
-        node_moving_active = imgui.is_item_active()
-        if node_widgets_active or node_moving_active:
-            self.handle_selected_node(node_component)
-        if node_moving_active:
+            self.hovered_node = self.get_node_component_at(mouse_pos)
+            if io.mouse_wheel != 0:
+                self.zoom_at(
+                    self.zoom * (1 + self.ZOOM_STEP) ** io.mouse_wheel,
+                    Vec2(*imgui.get_mouse_pos()) - self._canvas_screen_pos,
+                )
+        node = self.hovered_node
+        if node is not None:
+            self.id_hovered_in_scene = node.id
+
+        multi_selection = io.key_ctrl or io.key_shift
+        if imgui.is_item_clicked(0):
+            self.reset_dragging_delta()
+            if node is None:
+                # Start selecting nodes in a rectangle
+                if not multi_selection:
+                    self.select_node_components([])
+                self._canvas_drag_mode = 'rubber_band'
+                self._rubber_band_start = mouse_pos
+            else:
+                self.handle_node_clicked(node, multi_selection=multi_selection)
+                self._canvas_drag_mode = 'nodes'
+
+                # Open CodeSnippetWindow when double-clicked or ALT + click
+                if imgui.is_mouse_double_clicked(0) or io.key_alt:
+                    node.open_snippet_window()
+                    self._window_owners.add(node)
+
+        if imgui.is_item_clicked(2):
+            if node is None:
+                # Position on canvas where a node will be created
+                self._context_menu_canvas_pos = mouse_pos
+                imgui.open_popup('context-menu')
+            elif self.zoom >= self.LOD_ZOOM_THRESHOLD:
+                # Context menus are available only if nodes are fully rendered
+                self.context_menu_node = node
+
+        if self._canvas_drag_mode is None:
+            return
+        if imgui.is_mouse_down(0):
             if imgui.is_mouse_dragging(0):
                 curr_delta = Vec2(*imgui.get_mouse_drag_delta(0))
-                delta = curr_delta - self.prev_dragging_delta
-                node_component.pos = node_component.pos + delta
+                delta = (curr_delta - self.prev_dragging_delta) * (1 / self.zoom)
                 self.prev_dragging_delta = curr_delta
-            else:
-                # NOTE: Reset it only when mouse is not dragging to avoid redundant
-                # calls even when a node is not clicked.
-                self.reset_dragging_delta()
+                if self._canvas_drag_mode == 'nodes':
+                    # Move all selected nodes together
+                    for component in self.selected_node_components:
+                        component.pos = component.pos + delta
+            return
+
+        # Mouse button is released
+        dragged = self.prev_dragging_delta != Vec2(0.0, 0.0)
+        if self._canvas_drag_mode == 'rubber_band' and dragged:
+            self.select_node_components(
+                self.get_node_components_in(self.get_rubber_band_rect(mouse_pos)),
+                add=multi_selection,
+            )
+        elif self._canvas_drag_mode == 'nodes' and not dragged and not multi_selection:
+            # Clicking a node in a group without moving it selects only itself
+            if self.selected_node is not None:
+                self.select_node_components([self.selected_node])
+        self._canvas_drag_mode = None
+        self._rubber_band_start = None
+        self.reset_dragging_delta()
+
+    def handle_canvas_shortcuts(self):
+        if not imgui.is_window_focused() or imgui.is_any_item_active():
+            return
+        if imgui.is_key_pressed(imgui.get_key_index(imgui.KEY_DELETE)):
+            self.remove_selected_node_components()
+
+    def get_rubber_band_rect(self, mouse_pos):
+        start = self._rubber_band_start
+        return (
+            min(start.x, mouse_pos.x), min(start.y, mouse_pos.y),
+            max(start.x, mouse_pos.x), max(start.y, mouse_pos.y),
+        )
+
+    def handle_node_clicked(self, node_component, multi_selection=False):
+        """Update selection after a node is clicked on canvas. If
+        `multi_selection` is True (CTRL or SHIFT is pressed), the node is
+        toggled in current selection."""
+        self.clicked_node = node_component
+        if multi_selection and node_component in self.selected_node_components:
+            self.select_node_components(self.selected_node_components - {node_component})
+        else:
+            if node_component not in self.selected_node_components:
+                self.select_node_components([node_component], add=multi_selection)
+            self.handle_selected_node(node_component)
 
     def handle_selected_node(self, node_component):
         self.id_selected = node_component.id
@@ -1440,26 +2175,24 @@ class CodeNodeViewer(ImguiComponent):
             self.highlight_referenced_lines_in_snippet(node_component)
 
     def handle_context_menu_canvas(self):
-        states = [node.is_showing_context_menu for node in self.node_components]
-        is_any_context_menu_showing = any(states)
-
-        # NOTE: To prevent confict, show this context menu only when no context menu
-        # of node is showing.
-        if not is_any_context_menu_showing:
-            if imgui.begin_popup_context_item('context-menu', 2):
-                if imgui.selectable('Create node')[0]:
-                    init_kwargs = {
-                        'convert_tab_to_spaces': self.app.config.text_input.convert_tab_to_spaces,
-                        'tab_to_spaces_number': self.app.config.text_input.tab_to_spaces_number,
-                    }
-                    mouse_pos = Vec2(*imgui.get_mouse_position())
-                    node_pos_on_canvas = mouse_pos - self._canvas_screen_pos
-                    node_creater = CodeNodeCreatorWindow(
-                        self.app, creation_pos=node_pos_on_canvas, **init_kwargs
-                    )
-                    node_creater.set_container(self)
-                    self.app.add_component(node_creater)
-                imgui.end_popup()
+        # NOTE: This context menu is opened by `handle_canvas_input()` only
+        # when there is no node under mouse cursor, so it won't conflict with
+        # context menus of nodes.
+        if imgui.begin_popup('context-menu'):
+            if imgui.selectable('Create node')[0]:
+                init_kwargs = {
+                    'convert_tab_to_spaces': self.app.config.text_input.convert_tab_to_spaces,
+                    'tab_to_spaces_number': self.app.config.text_input.tab_to_spaces_number,
+                }
+                node_creater = CodeNodeCreatorWindow(
+                    self.app, creation_pos=self._context_menu_canvas_pos, **init_kwargs
+                )
+                node_creater.set_container(self)
+                self.app.add_component(node_creater)
+            n_selected = len(self.selected_node_components)
+            if n_selected > 0 and imgui.selectable(f'Remove selected nodes ({n_selected})')[0]:
+                self.remove_selected_node_components()
+            imgui.end_popup()
 
     def handle_panning(self):
         if not imgui.is_window_hovered():
@@ -1488,31 +2221,30 @@ class CodeNodeViewer(ImguiComponent):
         self.create_node_component(node, node_pos=node_pos)
 
     def reset_highlighted_lines_in_snippet(self):
-        if self.id_selected == -1:
+        if self.id_selected == -1 or self.selected_node is None:
             return
-        ids = [v.id for v in self.node_components]
-        selected = self.node_components[ids.index(self.id_selected)]
+        selected = self.selected_node
         if len(selected.node.roots) == 0:
             return
-        nodes = [v.node for v in self.node_components]
         for root in selected.node.roots:
-            idx = nodes.index(root)
-            if self.node_components[idx].snippet_window is not None:
-                self.node_components[idx].snippet_window.reference_info = None
+            root_component = self.node_component_map[root.nid]
+            if root_component.snippet_window is not None:
+                root_component.snippet_window.reference_info = None
 
     def highlight_referenced_lines_in_snippet(self, node_component):
         if len(node_component.node.roots) == 0:
             return
-        nodes = [v.node for v in self.node_components]
         for root in node_component.node.roots:
-            idx = nodes.index(root)
-            if self.node_components[idx].snippet_window is not None:
-                ref_info = node_component.node.ref_infos[root.uuid]
-                self.node_components[idx].snippet_window.reference_info = ref_info
+            root_component = self.node_component_map[root.nid]
+            if root_component.snippet_window is not None:
+                ref_info = node_component.node.ref_infos[root.nid]
+                root_component.snippet_window.reference_info = ref_info
 
     def display_grid(self, draw_list):
         grid_color = imgui.get_color_u32_rgba(0.8, 0.8, 0.8, 0.15)
-        grid_size = 64.0
+        grid_size = 64.0 * self.zoom
+        if grid_size < self.MIN_GRID_SIZE:
+            return
         win_pos = Vec2(*imgui.get_cursor_screen_pos())
         canvas_size = Vec2(*imgui.get_window_size())
 
@@ -1538,65 +2270,164 @@ class CodeNodeViewer(ImguiComponent):
         draw_list.channels_split(2)
         draw_list.channels_set_current(0)   # background
 
-        nodes = [v.node for v in self.node_components]
-
         link_color = imgui.get_color_u32_rgba(*self.NODE_LINK_COLOR_TUPLE)
         slot_color = imgui.get_color_u32_rgba(*self.NODE_SLOT_COLOR_TUPLE)
 
-        # Since angles of arrows are fixed, here we just hard-coded these values
-        # in order to reduce calculation
-        cos30d, sin30d = 0.8660254037844387, 0.5
-
-        for link in self.links:
-            node_leaf = self.node_components[nodes.index(link.leaf)]
-            node_root = self.node_components[nodes.index(link.root)]
-            p1 = offset + node_leaf.get_root_slot_pos(link.root_slot)
-            p2 = offset + node_root.get_leaf_slot_pos(link.leaf_slot)
-
-            is_self_referenced = node_root is node_leaf
-            if is_self_referenced:
-                top_mid = offset + node_leaf.pos + Vec2(node_leaf.size.x / 2, 0)
-
-                # vector of "top_mid -> p2"
-                v_mid_p2 = p2 - top_mid
-                d = math.sqrt(v_mid_p2.x**2 + v_mid_p2.y**2)
-
-                # unit vector of "top_mid -> p2"
-                u_mid_p2 = v_mid_p2 * (1/d)
-
-                # unit normal vector
-                un_mid_p2 = Vec2(-u_mid_p2.y, u_mid_p2.x)
-
-                p_half = (p2 + top_mid) * 0.5
-                center = p_half - un_mid_p2 * (d/2)
-                r = d / 2**0.5
-                draw_list.add_circle(*center, r, link_color)
-
-                # Replace position of root slot
-                p1 = top_mid
+        # Geometry is cached in canvas coordinates, see `_get_link_geometry()`,
+        # so only scaling and translation are computed here.
+        ox, oy = offset
+        zoom = self.zoom
+        add_line, add_circle = draw_list.add_line, draw_list.add_circle
+        add_circle_filled, add_polyline = draw_list.add_circle_filled, draw_list.add_polyline
+        get_geometry = self._get_link_geometry
+        for idx in self._link_index.query(self.get_visible_rect()):
+            geometry = get_geometry(idx)
+            if geometry is None:
+                continue
+            x1, y1, x2, y2, ax1, ay1, ax2, ay2, circle = geometry
+            x1, y1 = ox + x1 * zoom, oy + y1 * zoom
+            x2, y2 = ox + x2 * zoom, oy + y2 * zoom
+            if circle is None:
+                add_line(x1, y1, x2, y2, link_color)
             else:
-                draw_list.add_line(*p1, *p2, link_color)
-
-            # Draw slots
-            draw_list.add_circle_filled(*p1, 4.0, slot_color)
-            draw_list.add_circle_filled(*p2, 4.0, slot_color)
-
-            # Draw arrows
-            vd = Vec2(0, 1) if is_self_referenced else (p1 - p2)
-            d = math.sqrt(vd.x**2 + vd.y**2)
-            vd = vd * (8/d)     # length: 8 pixels
-            p_arrow = [
-                p1,
-                p1 - Vec2(vd.x*cos30d + vd.y*sin30d, -vd.x*sin30d + vd.y*cos30d),
-                p1 - Vec2(vd.x*cos30d - vd.y*sin30d, vd.x*sin30d + vd.y*cos30d),
-            ]
-            draw_list.add_polyline(p_arrow, link_color, closed=True)
+                cx, cy, r = circle
+                add_circle(ox + cx * zoom, oy + cy * zoom, r * zoom, link_color)
+
+            # Draw slots and arrows
+            add_circle_filled(x1, y1, NODE_SLOT_RADIUS, slot_color)
+            add_circle_filled(x2, y2, NODE_SLOT_RADIUS, slot_color)
+            p_arrow = [(x1, y1), (x1 + ax1, y1 + ay1), (x1 + ax2, y1 + ay2)]
+            add_polyline(p_arrow, link_color, closed=True)
+
+    def display_rubber_band(self, draw_list, offset):
+        mouse_pos = self.to_canvas_pos(Vec2(*imgui.get_mouse_pos()))
+        x_min, y_min, x_max, y_max = self.get_rubber_band_rect(mouse_pos)
+        p_min = offset + Vec2(x_min, y_min) * self.zoom
+        p_max = offset + Vec2(x_max, y_max) * self.zoom
+        fill_color = imgui.get_color_u32_rgba(*self.RUBBER_BAND_COLOR_TUPLE)
+        border_color = imgui.get_color_u32_rgba(*self.NODE_SLOT_COLOR_TUPLE)
+        draw_list.add_rect_filled(*p_min, *p_max, fill_color)
+        draw_list.add_rect(*p_min, *p_max, border_color)
 
     def display_nodes(self, draw_list, offset):
-        for node in self.node_components:
+        x_min, y_min, x_max, y_max = self.get_visible_rect()
+        margin = NODE_SLOT_RADIUS / self.zoom
+        visible = self._node_index.query(
+            (x_min - margin, y_min - margin, x_max + margin, y_max + margin)
+        )
+        self._visible_node_components = sorted(visible, key=lambda v: v.id)
+
+        for node in self._visible_node_components:
             imgui.push_id(str(node.id))
-            node.render(draw_list, offset)
+            node.render(draw_list, offset, zoom=self.zoom)
             imgui.pop_id()
+            if node.has_opened_windows:
+                self._window_owners.add(node)
+
+    def display_opened_windows(self):
+        """Render windows opened by nodes which are not rendered in this frame,
+        e.g. they are out of sight or drawn in low level of detail."""
+        rendered = set(self._visible_node_components)
+        for node in list(self._window_owners):
+            if node not in rendered:
+                imgui.push_id(str(node.id))
+                node.render_windows()
+                imgui.pop_id()
+            if not node.has_opened_windows:
+                self._window_owners.discard(node)
+
+    def display_lod(self, draw_list, offset):
+        """Draw nodes as plain rectangles and links as lines without arrows,
+        which is used at low zoom instead of rendering node components."""
+        visible = self.get_visible_rect()
+        cache = self._lod_cache
+        if (
+            cache is None or cache['zoom'] != self.zoom or
+            cache['version'] != self._geometry_version or
+            not _contains_rect(cache['region'], visible)
+        ):
+            cache = self._lod_cache = self._build_lod_geometry(visible)
+
+        # Primitives out of canvas are skipped
+        ox, oy = offset
+        x_min, y_min = self._canvas_screen_pos
+        x_max, y_max = self._canvas_screen_pos + self._canvas_size
+        x_min, y_min, x_max, y_max = x_min - ox, y_min - oy, x_max - ox, y_max - oy
+
+        add_line = draw_list.add_line
+        link_color = imgui.get_color_u32_rgba(*self.LOD_LINK_COLOR_TUPLE)
+        for x0, y0, x1, y1 in cache['segments']:
+            if (
+                min(x0, x1) <= x_max and max(x0, x1) >= x_min and
+                min(y0, y1) <= y_max and max(y0, y1) >= y_min
+            ):
+                add_line(ox + x0, oy + y0, ox + x1, oy + y1, link_color)
+
+        add_rect_filled = draw_list.add_rect_filled
+        node_color = imgui.get_color_u32_rgba(*CodeNodeComponent.NODE_FG_COLOR_MAP[''])
+        for x0, y0, x1, y1 in cache['node_rects']:
+            if x0 <= x_max and x1 >= x_min and y0 <= y_max and y1 >= y_min:
+                add_rect_filled(ox + x0, oy + y0, ox + x1, oy + y1, node_color)
+
+        # Selected and hovered nodes are highlighted
+        zoom = self.zoom
+        activated_color = imgui.get_color_u32_rgba(
+            *CodeNodeComponent.NODE_BG_COLOR_MAP['activated']
+        )
+        highlighted = set(self.selected_node_components)
+        for node in [self.selected_node, self.hovered_node]:
+            if node is not None:
+                highlighted.add(node)
+        for node in highlighted:
+            if node.pos is not None:
+                x0, y0, x1, y1 = node.rect
+                add_rect_filled(
+                    ox + x0 * zoom, oy + y0 * zoom,
+                    ox + max(x1 * zoom, x0 * zoom + self.LOD_GRID_SIZE),
+                    oy + max(y1 * zoom, y0 * zoom + self.LOD_GRID_SIZE),
+                    activated_color,
+                )
+
+        if self.hovered_node is not None:
+            imgui.set_tooltip(self.hovered_node.name)
+
+    def _build_lod_geometry(self, visible_rect):
+        """Returns geometry of nodes and links in a region around the visible
+        one, which is relative to the origin of canvas on screen. Positions are
+        snapped to a pixel grid, so that nodes and links overlapping on screen
+        are merged."""
+        x_min, y_min, x_max, y_max = visible_rect
+        width, height = x_max - x_min, y_max - y_min
+        region = (x_min - width, y_min - height, x_max + width, y_max + height)
+        zoom, grid = self.zoom, self.LOD_GRID_SIZE
+
+        node_rects = set()
+        for component in self._node_index.query(region):
+            x0, y0, x1, y1 = component.rect
+            qx0, qy0 = x0 * zoom // grid * grid, y0 * zoom // grid * grid
+            qx1 = max(qx0 + grid, x1 * zoom // grid * grid)
+            qy1 = max(qy0 + grid, y1 * zoom // grid * grid)
+            node_rects.add((qx0, qy0, qx1, qy1))
+
+        # Links are drawn from the right side of root to the left side of leaf,
+        # and self references are omitted.
+        segments = set()
+        links, component_map = self.links, self.node_component_map
+        for idx in self._link_index.query(region):
+            link = links[idx]
+            if link.root is link.leaf:
+                continue
+            r = component_map[link.root.nid].rect
+            l = component_map[link.leaf.nid].rect
+            qx0, qy0 = r[2] * zoom // grid * grid, (r[1] + r[3]) * 0.5 * zoom // grid * grid
+            qx1, qy1 = l[0] * zoom // grid * grid, (l[1] + l[3]) * 0.5 * zoom // grid * grid
+            if (qx0, qy0) != (qx1, qy1):
+                segments.add((qx0, qy0, qx1, qy1))
+
+        return {
+            'zoom': zoom, 'version': self._geometry_version, 'region': region,
+            'node_rects': list(node_rects), 'segments': list(segments),
+        }
 
     def draw_node_list(self):
         imgui.begin_group()
@@ -1611,21 +2442,35 @@ class CodeNodeViewer(ImguiComponent):
         # Switch to filtered result when search mode is enabled
         node_components = self.filtered_node_components if self.is_in_search_mode else self.node_components
 
-        for node_component in node_components:
+        # Only items in the visible region of list are submitted, and the cursor
+        # is moved over the others to keep the height of list.
+        item_height = imgui.get_text_line_height_with_spacing()
+        list_start_y = imgui.get_cursor_pos_y()
+        idx_start = max(0, int((imgui.get_scroll_y() - list_start_y) // item_height))
+        idx_stop = min(
+            len(node_components), idx_start + int(imgui.get_window_height() // item_height) + 2
+        )
+        imgui.set_cursor_pos_y(list_start_y + idx_start * item_height)
+
+        for node_component in node_components[idx_start:idx_stop]:
             imgui.push_id(str(node_component.id))
             clicked, selected = imgui.selectable(
                 node_component.name, node_component.id == self.id_selected
             )
             if clicked:
                 # Highlight those referenced lines in root node
+                self.select_node_components([node_component])
                 self.handle_selected_node(node_component)
             if imgui.is_item_hovered():
                 # Pan canvas to proper position to make selected node locate at the
                 # center of visible region
                 if imgui.is_mouse_double_clicked():
-                    self.panning = 0.5 * self._canvas_size - node_component.pos - node_component.size
+                    center = node_component.pos + 0.5 * node_component.size
+                    self.panning = 0.5 * self._canvas_size - center * self.zoom
                 self.id_hovered_in_list = node_component.id
             imgui.pop_id()
+        imgui.set_cursor_pos_y(list_start_y + len(node_components) * item_height)
+        imgui.dummy(0, 0)
         imgui.end_child()
 
         if self.is_in_search_mode:
@@ -1667,13 +2512,32 @@ class CodeNodeViewer(ImguiComponent):
         offset = self._canvas_screen_pos + self.panning
         draw_list = imgui.get_window_draw_list()
 
+        # A single button covering the whole canvas receives mouse events, and
+        # nodes are found by hit-testing instead of having their own buttons.
+        imgui.invisible_button(
+            'node-canvas', max(self._canvas_size.x, 1.0), max(self._canvas_size.y, 1.0)
+        )
+        self.handle_canvas_input(offset)
+
         if self.show_grid:
             self.display_grid(draw_list)
-        self.display_links(draw_list, offset)
-        self.display_nodes(draw_list, offset)
+        if self.zoom >= self.LOD_ZOOM_THRESHOLD:
+            # Labels are scaled with canvas
+            imgui.set_window_font_scale(self.zoom)
+            self.display_links(draw_list, offset)
+            self.display_nodes(draw_list, offset)
+            draw_list.channels_merge()
+            imgui.set_window_font_scale(1.0)
+        else:
+            self._visible_node_components = []
+            self.display_lod(draw_list, offset)
+        self.display_opened_windows()
 
-        draw_list.channels_merge()
+        if self._canvas_drag_mode == 'rubber_band':
+            self.display_rubber_band(draw_list, offset)
 
+        self.handle_canvas_shortcuts()
+        self.handle_context_menu_canvas()
         self.handle_panning()
         self.finalize_canvas()
 
@@ -1720,11 +2584,15 @@ class CodeNodeViewer(ImguiComponent):
         if imgui.begin_menu('File'):
             self.handle_menu_item_save()    # overwrite the original file
             self.handle_menu_item_save_as()
+            self.handle_menu_item_update_from_source()
+            self.handle_menu_item_resolve_sources()
             imgui.separator()
             self.handle_menu_item_close()
             imgui.end_menu()
         if imgui.begin_menu('View'):
             self.handle_menu_item_rearrange_nodes()
+            self.handle_menu_item_zoom_to_fit()
+            self.handle_menu_item_reset_zoom()
             self.handle_menu_item_show_grid()
             self.handle_menu_item_enable_reference_highlight()
             imgui.end_menu()
@@ -1757,6 +2625,7 @@ class CodeNodeViewer(ImguiComponent):
             self.app.remove_component(self)
             self.node_components = []
             self.links = []
+            self.rebuild_spatial_index()
             self.app = None
 
         # Check whether there are unsaved changes
@@ -1814,7 +2683,6 @@ class CodeNodeViewer(ImguiComponent):
         imgui.begin_group()
         self.draw_node_canvas()
         imgui.end_group()
-        self.handle_context_menu_canvas()
 
         if self.confirmation_modal:
             self.confirmation_modal.render()
@@ -1878,6 +2746,109 @@ class ErrorMessageModal(ImguiComponent):
         imgui.end()
 
 
+class TaskProgressModal(ImguiComponent):
+    """A modal showing progress of a background task with a button to cancel
+    it. The task is polled in each frame, and `callback` is invoked with its
+    result on the UI thread once it's finished."""
+
+    def __init__(self, app, title, task, callback=None, modal=True):
+        """
+        Parameters
+        ----------
+        app : codememo.Application
+            Reference of running application.
+        title : str
+            Title of this modal.
+        task : codememo.tasks.BackgroundTask
+            A task which is started already.
+        callback : function, optional
+            A callback function which will be invoked after the task is
+            finished successfully. Passed arguments: [result]
+        modal : bool, optional
+            If it's False, progress is shown in a regular window, so that other
+            windows are still interactive while the task is running.
+        """
+        self.app = app
+        self.title = f'{title}###task-progress-{id(self)}'
+        self.window_name = f'task-progress-window-{id(self)}'
+        self.task = task
+        self.callback = callback
+        self.modal = modal
+        self.cancel_button_clicked = False
+        self.terminated = False
+
+    def close(self):
+        # Task is cancelled if it's closed before it's finished, otherwise it
+        # would keep running in background with its result dropped
+        if not self.task.done:
+            self.task.cancel()
+        self.app.remove_component(self)
+        self.app = None
+        self.terminated = True
+
+    def finish(self):
+        """Hand over result of the task, errors are shown by error modals."""
+        task = self.task
+        self.close()
+        if task.cancelled:
+            return
+        if task.exception is not None:
+            GlobalState().push_error(task.exception)
+        elif self.callback is not None:
+            try:
+                self.callback(task.result)
+            except Exception as ex:
+                GlobalState().push_error(ex)
+
+    def format_progress(self):
+        progress = self.task.progress
+        lines = []
+        if progress.stage:
+            lines.append(f'{progress.stage}...')
+        if progress.stage in ('', 'Reading') and progress.bytes_total > 0:
+            mib_read, mib_total = progress.bytes_read / 2**20, progress.bytes_total / 2**20
+            lines.append(
+                f'Read: {mib_read:.1f} / {mib_total:.1f} MiB ({progress.fraction:.0%})'
+            )
+        elif progress.fraction is not None:
+            lines.append(f'Progress: {progress.fraction:.0%}')
+        lines.append(f'Nodes: {progress.n_nodes}, links: {progress.n_edges}')
+        return '\n'.join(lines)
+
+    def render_content(self):
+        imgui.text(self.format_progress())
+        if self.cancel_button_clicked:
+            imgui.text('Cancelling...')
+        elif imgui.button('Cancel'):
+            self.cancel_button_clicked = True
+            self.task.cancel()
+
+    def render(self):
+        if self.task.done:
+            self.finish()
+            return
+
+        if not self.modal:
+            imgui.begin(self.title, flags=imgui.WINDOW_ALWAYS_AUTO_RESIZE)
+            self.render_content()
+            imgui.end()
+            return
+
+        # NOTE: Like `ErrorMessageModal`, a window at left-top corner is used
+        # as the container of modal.
+        imgui.begin(self.window_name, flags=imgui.WINDOW_NO_TITLE_BAR)
+        imgui.set_window_size(0, 0)
+        imgui.set_window_position_labeled(self.window_name, -10, -10)
+        imgui.open_popup(self.title)
+        modal_opened, _ = imgui.begin_popup_modal(
+            self.title, flags=imgui.WINDOW_ALWAYS_AUTO_RESIZE
+        )
+        if modal_opened:
+            self.render_content()
+            imgui.end_popup()
+        imgui.end()
+
+
 class ConfirmationModal(ImguiComponent):
     def __init__(self, title, message, callback_yes=None, callback_no=None,
         show_cancel_button=False):
@@ -1921,7 +2892,7 @@ class ConfirmationModal(ImguiComponent):
 class OpenFileDialog(ImguiComponent):
     INPUT_FILENAME_MAX_LENGTH = 256
 
-    def __init__(self, app, callback):
+    def __init__(self, app, callback, allow_directory=False, allow_glob=False):
         """
         app : codememo.Application
             Reference of running application.
@@ -1929,10 +2900,16 @@ class OpenFileDialog(ImguiComponent):
             A callback function which will be invoked after a file is selected.
             Note that this dialog will be closed then.
             Passed arguments: [filename: str]
+        allow_directory : bool, optional
+            Whether a directory can be selected.
+        allow_glob : bool, optional
+            Whether a glob pattern matching any file can be given.
         """
         self.app = app
         self.filename = str(Path('').absolute())
         self.callback = callback
+        self.allow_directory = allow_directory
+        self.allow_glob = allow_glob
         self.error_msg = ''
         self.window_opened = False
         self.terminated = False
@@ -1971,9 +2948,17 @@ class OpenFileDialog(ImguiComponent):
 
         if imgui.button('Open') or changed:
             fn = Path(self.filename)
+            if self.allow_glob and glob.has_magic(self.filename):
+                if glob.glob(self.filename, recursive=True):
+                    self.callback(self.filename)
+                    self.close()
+                else:
+                    self.error_msg = 'No file matches the pattern.'
+                imgui.end()
+                return
             try:
                 # Use this to check whether there are illegal characters in name
-                is_valid = not fn.is_dir()
+                is_valid = self.allow_directory or not fn.is_dir()
             except OSError:
                 is_valid = False
 
@@ -2020,6 +3005,35 @@ class SaveFileDialog(ImguiComponent):
         self.terminated = True
         self.app.remove_component(self)
 
+    def handle_save(self):
+        """Validate filename, then invoke callback or ask for overwriting an
+        existing file."""
+        fn = Path(self.filename)
+        try:
+            # Use this to check whehter there are illegal characters in name
+            is_valid = not fn.is_dir()
+        except OSError:
+            is_valid = False
+
+        if not is_valid:
+            self.error_msg = 'Invalid filename.'
+        elif not fn.exists():
+            self.callback(self.filename)
+            self.close()
+        elif fn.exists():
+            self.error_msg = ''
+            msg = (
+                f'File already exists, are you sure you want to overwrite it?'
+                f'\n{self.filename}'
+            )
+            self.confirmation_modal = ConfirmationModal(
+                'Error', msg,
+                callback_yes=lambda: self.callback(self.filename) or self.close(),
+            )
+        else:
+            # Should not be here...
+            GlobalState().push_error(ValueError('Cannot resolve filename.'))
+
     def render(self):
         # NOTE: If confirmation modal has been created and rendering, we should
         # not keep setting this window on top.
@@ -2050,35 +3064,7 @@ class SaveFileDialog(ImguiComponent):
         imgui.same_line(win_width - 28)
 
         if imgui.button('Save'):
-            fn = Path(self.filename)
-            try:
-                # Use this to check whehter there are illegal characters in name
-                is_valid = not fn.is_dir()
-            except OSError:
-                is_valid = False
-
-            if not is_valid:
-                self.error_msg = 'Invalid filename.'
-            elif not fn.exists():
-                self.callback(self.filename)
-                self.close()
-            elif fn.exists():
-                from textwrap import wrap as wrap_text
-
-                self.error_msg = ''
-                msg = (
-                    f'File already exists, are you sure you want to overwrite it?'
-                    f'\n{self.filename}'
-                )
-                self.confirmation_modal = ConfirmationModal(
-                    'Error', msg,
-                    callback_yes=lambda: self.callback(self.filename) or self.close(),
-                )
-            else:
-                # Should not be here...
-                GlobalState().push_error(ValueError('Cannot resolve filename.'))
-                imgui.end()
-                return
+            self.handle_save()
 
         if self.confirmation_modal:
             self.confirmation_modal.render()
@@ -0,0 +1,242 @@
+"""Facilities for reading and writing compressed project files.
+
+Compression format is detected by magic bytes of an existing file, or by the
+suffix of filename (`.gz`, `.xz`, `.bz2`) when a file is going to be written.
+All codecs are provided by the standard library.
+"""
+import bz2
+import codecs
+import gzip
+import io
+import lzma
+import queue
+import threading
+import zlib
+
+from .exceptions import DecompressionException
+
+__all__ = ['detect_compression', 'open_text', 'read_text']
+
+# name: (suffix, magic bytes)
+COMPRESSION_FORMATS = {
+    'gzip': ('.gz', b'\x1f\x8b'),
+    'xz': ('.xz', b'\xfd7zXZ\x00'),
+    'bz2': ('.bz2', b'BZh'),
+}
+_MAGIC_LENGTH = max([len(v[1]) for v in COMPRESSION_FORMATS.values()])
+
+# Errors raised by decompressors while reading a corrupted file, e.g. `bz2`
+# raises `OSError` for invalid data and all codecs raise `EOFError` for a
+# truncated file
+_DECOMPRESSOR_ERRORS = (EOFError, OSError, zlib.error, lzma.LZMAError)
+
+
+def detect_compression(fn, by_content=True):
+    """Returns name of compression format of given file, or None if it's not
+    compressed.
+
+    Parameters
+    ----------
+    fn : str
+        Path of file.
+    by_content : bool, optional
+        Check magic bytes of file first if it exists.
+    """
+    if by_content:
+        try:
+            with open(fn, 'rb') as f:
+                head = f.read(_MAGIC_LENGTH)
+        except OSError:
+            pass
+        else:
+            for name, (_, magic) in COMPRESSION_FORMATS.items():
+                if head.startswith(magic):
+                    return name
+            if len(head) != 0:
+                return None
+
+    for name, (suffix, _) in COMPRESSION_FORMATS.items():
+        if str(fn).endswith(suffix):
+            return name
+    return None
+
+
+def _create_compressor(compression):
+    if compression == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    elif compression == 'xz':
+        return lzma.LZMACompressor()
+    elif compression == 'bz2':
+        return bz2.BZ2Compressor()
+    raise ValueError(f'unsupported compression: {compression}')
+
+
+class ThreadedCompressedWriter(object):
+    """A text file-like object which compresses written data on a worker thread.
+
+    Written text is buffered and handed over to the worker in chunks, so that
+    encoding (e.g. `json.dump()`) on the calling thread and compression (which
+    releases the GIL in all codecs above) can run at the same time.
+    """
+    CHUNK_SIZE = 1 << 18
+    MAX_PENDING_CHUNKS = 8
+
+    def __init__(self, fn, compression):
+        self._file = open(fn, 'wb')
+        self._compressor = _create_compressor(compression)
+        self._buffer = []
+        self._buffer_size = 0
+        self._queue = queue.Queue(maxsize=self.MAX_PENDING_CHUNKS)
+        self._error = None
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            if self._error is not None:
+                continue    # keep consuming to avoid blocking writer
+            try:
+                self._file.write(self._compressor.compress(chunk))
+            except Exception as ex:
+                self._error = ex
+        if self._error is None:
+            try:
+                self._file.write(self._compressor.flush())
+            except Exception as ex:
+                self._error = ex
+
+    def write(self, text):
+        self._buffer.append(text)
+        self._buffer_size += len(text)
+        if self._buffer_size >= self.CHUNK_SIZE:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            self._queue.put(''.join(self._buffer).encode('utf-8'))
+            self._buffer = []
+            self._buffer_size = 0
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._worker.join()
+        self._file.close()
+        if self._error is not None:
+            raise self._error
+
+
+class _DecompressedReader(io.BufferedIOBase):
+    """A binary reader of decompressed data which raises
+    `DecompressionException` for all errors of decompressor, so that callers
+    don't have to handle errors of each codec."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        try:
+            return self._f.read(size)
+        except _DECOMPRESSOR_ERRORS as ex:
+            raise DecompressionException(f'{type(ex).__name__}: {ex}') from ex
+
+    def read1(self, size=-1):
+        try:
+            return self._f.read1(size)
+        except _DECOMPRESSOR_ERRORS as ex:
+            raise DecompressionException(f'{type(ex).__name__}: {ex}') from ex
+
+    def close(self):
+        if not self.closed:
+            self._f.close()
+        super().close()
+
+
+def _open_decompressed(f, compression):
+    """Wrap a binary file object (or a path) with decompressor of given
+    format, see also `_DecompressedReader`."""
+    if compression == 'gzip':
+        f = gzip.GzipFile(f, mode='rb') if isinstance(f, str) else gzip.GzipFile(fileobj=f, mode='rb')
+    elif compression == 'xz':
+        f = lzma.LZMAFile(f)
+    elif compression == 'bz2':
+        f = bz2.BZ2File(f)
+    else:
+        raise ValueError(f'unsupported compression: {compression}')
+    return _DecompressedReader(f)
+
+
+def open_text(fn, mode='r'):
+    """Open a (possibly compressed) file in text mode with UTF-8 encoding.
+
+    Parameters
+    ----------
+    fn : str
+        Path of file.
+    mode : str
+        'r' for reading, 'w' for writing. When writing, compression format is
+        determined by the suffix of `fn`. When reading a compressed file,
+        `DecompressionException` is raised if it's corrupted.
+    """
+    if mode == 'r':
+        compression = detect_compression(fn)
+        if compression is None:
+            return open(fn, 'r', encoding='utf-8')
+        return io.TextIOWrapper(_open_decompressed(str(fn), compression), encoding='utf-8')
+    elif mode == 'w':
+        compression = detect_compression(fn, by_content=False)
+        if compression is None:
+            return open(fn, 'w', encoding='utf-8')
+        return ThreadedCompressedWriter(fn, compression)
+    raise ValueError(f'unsupported mode: {mode}')
+
+
+def read_text(fileobj, compression, chunk_size=2**20):
+    """Read all UTF-8 text from a (possibly compressed) binary file object.
+
+    Unlike `open_text()`, data is pulled from `fileobj` in chunks of at most
+    `chunk_size` bytes, so that a wrapper of `fileobj` (e.g.
+    `codememo.tasks.ProgressReader`) sees the compressed bytes as they are
+    consumed.
+
+    Parameters
+    ----------
+    fileobj : file object
+        A file opened in binary mode.
+    compression : str
+        Name of compression format, or None if it's not compressed. See also
+        `detect_compression()`.
+    chunk_size : int, optional
+        Size of decompressed data read at once.
+
+    Raises
+    ------
+    DecompressionException
+        If compressed data is corrupted.
+    """
+    f = fileobj if compression is None else _open_decompressed(fileobj, compression)
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = []
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        chunks.append(decoder.decode(data))
+    chunks.append(decoder.decode(b'', final=True))
+    return ''.join(chunks)
@@ -55,6 +55,7 @@ class AppDefaults(Defaults):
     dir_config = osp.join(dir_home, '.codememo')
     fn_config = osp.join(dir_config, 'config.json')
     fn_history = osp.join(dir_config, 'history.json')
+    dir_cache = osp.join(dir_config, 'cache')
 
 
 class AppConfig(ConfigBase):
@@ -75,6 +76,9 @@ class AppConfig(ConfigBase):
         self.viewer = ViewerConfig(
             **kwargs.pop(ViewerConfig.name, {})
         )
+        self.importer = ImporterConfig(
+            **kwargs.pop(ImporterConfig.name, {})
+        )
         self._check_remaining_kwargs(**kwargs)
 
     @classmethod
@@ -103,6 +107,7 @@ class AppConfig(ConfigBase):
         return {
             self.text_input.name: self.text_input.to_dict(),
             self.viewer.name: self.viewer.to_dict(),
+            self.importer.name: self.importer.to_dict(),
         }
 
 
@@ -162,6 +167,49 @@ class ViewerConfig(ConfigBase):
         self._check_remaining_kwargs(**kwargs)
 
 
+class ImporterDefaults(Defaults):
+    """
+    pstats_min_cumulative_time : float
+        Functions whose cumulative time (in seconds) is less than this value
+        are pruned while importing pstats files.
+    ctags_kinds : list of str
+        Kinds of symbols (e.g. 'class', 'function') to be created as nodes
+        while importing tags files. Symbols of all kinds are created if it's
+        an empty list.
+    dot_layout : str or None
+        Where positions of nodes come from while importing DOT files, 'pos'
+        for `pos` attributes written by Graphviz, 'dot' for running `dot`
+        to lay out the graph, or None to arrange nodes by this application.
+    """
+    pstats_min_cumulative_time = 0.0
+    # Stored as a tuple, so that it can't be modified through instances
+    ctags_kinds = ('class', 'function', 'method', 'member')
+    dot_layout = 'pos'
+
+
+class ImporterConfig(ConfigBase):
+    name = 'importer'
+    keys = ['pstats_min_cumulative_time', 'ctags_kinds', 'dot_layout']
+
+    def __init__(self, **kwargs):
+        super(ImporterConfig, self).__init__()
+        for k in self.keys:
+            setattr(self, k, kwargs.pop(k, getattr(ImporterDefaults, k)))
+        self.ctags_kinds = list(self.ctags_kinds)
+        self._check_remaining_kwargs(**kwargs)
+
+    def get_parser_options(self, extension):
+        """Returns keyword arguments to instantiate graph parser for given
+        file extension."""
+        if extension in ('.prof', '.pstats'):
+            return {'min_cumulative_time': self.pstats_min_cumulative_time}
+        if extension == '.dot':
+            return {'layout': self.dot_layout}
+        if extension in ('.tags', 'tags'):
+            return {'kinds': list(self.ctags_kinds)}
+        return {}
+
+
 class HistoryBase(object):
     pass
 
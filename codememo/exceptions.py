@@ -1,10 +1,17 @@
 __all__ = [
+    'DecompressionException',
     'FileLoadingException',
     'NodeRemovalException',
     'NodeReferenceException',
+    'NodeValidationException',
+    'TaskCancelledException',
 ]
 
 
+class DecompressionException(Exception):
+    pass
+
+
 class FileLoadingException(Exception):
     pass
 
@@ -15,3 +22,11 @@ class NodeRemovalException(Exception):
 
 class NodeReferenceException(Exception):
     pass
+
+
+class NodeValidationException(Exception):
+    pass
+
+
+class TaskCancelledException(Exception):
+    pass
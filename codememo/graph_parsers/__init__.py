@@ -1,41 +1,62 @@
+"""Parsers for creating projects from graph files (e.g. call graphs).
+
+Parsers are discovered once from built-in modules (`PARSER_MODULE_MAP`) and
+from entry points in group `codememo.graph_parsers` of installed packages. A
+third-party package can provide a parser like this (in its `setup.py`):
+
+    entry_points={
+        'codememo.graph_parsers': ['.prof = my_package.parsers:ProfParser'],
+    }
+
+Module of a parser is imported only when the parser is used at the first time,
+and the parser class is cached in the registry then.
+
+Parsers are indexed by file extensions, and also by whole file names for files
+which have a conventional name without extension (e.g. `tags` of ctags), see
+also `ParserRegistry.get_parser_type()`.
+"""
+import os
+import threading
+import warnings
+
 from .base import BaseParser
 
 PARSER_MODULE_MAP = {
     '.dot': '_dot',
+    '.folded': '_folded',
+    '.prof': '_pstats',
+    '.pstats': '_pstats',
+    '.py': '_python',
+    '.tags': '_ctags',
+    '.txt': '_folded',
+    # File names
+    'tags': '_ctags',
 }
+ENTRY_POINT_GROUP = 'codememo.graph_parsers'
 CLS_BASE_PARSER = BaseParser
 
 
-def get_graph_parser(parser_type):
-    """Get an instance of graph parser dynamically.
-
-    Parameters
-    ----------
-    parser_type : str
-        Type of parser.
-
-    Returns
-    -------
-    parser : an sublcass instance of `BaseParser`
-    """
-    import importlib, sys
-    from pathlib import Path
-
-    if parser_type not in PARSER_MODULE_MAP:
-        raise ValueError(f'unsupported parser for {parser_type}')
-
-    submodule_name = PARSER_MODULE_MAP[parser_type]
-    module_name = f'{__name__}.{submodule_name}'
+def _iter_entry_points(group):
+    """Returns entry points of given group. Only metadata of packages is read,
+    modules are not imported until `EntryPoint.load()` is called."""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        # Python < 3.8
+        try:
+            import pkg_resources
+        except ImportError:
+            return []
+        return list(pkg_resources.iter_entry_points(group))
 
-    this_dir = Path(__file__).parent
-    fn_parser = this_dir.joinpath(f'{submodule_name}.py')
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        return list(eps.select(group=group))
+    return list(eps.get(group, []))
 
-    spec = importlib.util.spec_from_file_location(module_name, fn_parser)
-    mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(mod)
-    sys.modules[module_name] = mod
 
-    parser_name = getattr(mod, 'PARSER_IMPL')
+def _find_parser_class(mod):
+    parser_name = getattr(mod, 'PARSER_IMPL', None)
     if parser_name is None:
         candidates = [v for v in dir(mod) if (
             v.endswith('Parser') and v != CLS_BASE_PARSER.__name__
@@ -44,15 +65,156 @@ def get_graph_parser(parser_type):
             'Failed to find valid graph parser class, this might be an '
             'implementation error.'
         )
-        cls_parser = getattr(mod, candidates[0])
-    else:
-        cls_parser = getattr(mod, parser_name)
+        return getattr(mod, candidates[0])
+    return getattr(mod, parser_name)
+
+
+class ParserRegistry(object):
+    """A registry of graph parsers, which are indexed by file extensions."""
+
+    def __init__(self, module_map=None, entry_point_group=ENTRY_POINT_GROUP):
+        """
+        Parameters
+        ----------
+        module_map : dict, optional
+            Map of file extension to name of built-in submodule. Default is
+            `PARSER_MODULE_MAP`.
+        entry_point_group : str, optional
+            Group of entry points to discover third-party parsers. Discovery
+            of entry points is disabled if it's None.
+        """
+        self.module_map = PARSER_MODULE_MAP if module_map is None else module_map
+        self.entry_point_group = entry_point_group
+        self._loaders = None
+        self._parser_classes = {}
+        self._lock = threading.RLock()
+
+    def _discover(self):
+        with self._lock:
+            if self._loaders is not None:
+                return self._loaders
+
+            loaders = {}
+            for ext, submodule_name in self.module_map.items():
+                loaders[ext] = f'{__name__}.{submodule_name}'
+
+            if self.entry_point_group is not None:
+                for entry_point in _iter_entry_points(self.entry_point_group):
+                    name = entry_point.name
+                    ext = name if name.startswith('.') else f'.{name}'
+                    if ext in loaders:
+                        warnings.warn(
+                            f'Parser for {ext} is registered already, entry point '
+                            f'"{entry_point}" is ignored.', UserWarning
+                        )
+                        continue
+                    loaders[ext] = entry_point
+
+            self._loaders = loaders
+            return loaders
+
+    @property
+    def extensions(self):
+        """File extensions of all available parsers."""
+        return sorted(v for v in self._discover() if v.startswith('.'))
 
-    assert issubclass(cls_parser, CLS_BASE_PARSER), (
-        f'Type of imported `parser` should be a subclass of {CLS_BASE_PARSER}, '
-        'this might be an implementation error.'
-    )
-    return cls_parser()
+    def get_parser_type(self, fn):
+        """Returns type of parser for given file, which is the file name if
+        there is a parser registered for it, otherwise the file extension."""
+        name = os.path.basename(fn)
+        if name in self._discover():
+            return name
+        return os.path.splitext(name)[1]
+
+    def register(self, extension, cls_parser):
+        """Register a parser class for given file extension. Existing parser
+        for the same extension will be replaced."""
+        self._check_parser_class(cls_parser)
+        with self._lock:
+            self._discover()[extension] = cls_parser
+            self._parser_classes[extension] = cls_parser
+
+    def _check_parser_class(self, cls_parser):
+        assert isinstance(cls_parser, type) and issubclass(cls_parser, CLS_BASE_PARSER), (
+            f'Type of imported `parser` should be a subclass of {CLS_BASE_PARSER}, '
+            'this might be an implementation error.'
+        )
+
+    def get_parser_class(self, extension):
+        """Get class of parser for given file extension. Module of the parser
+        is imported on first call.
+
+        Parameters
+        ----------
+        extension : str
+            File extension, e.g. '.dot'.
+        """
+        cls_parser = self._parser_classes.get(extension)
+        if cls_parser is not None:
+            return cls_parser
+
+        with self._lock:
+            loaders = self._discover()
+            if extension not in loaders:
+                raise ValueError(f'unsupported parser for {extension}')
+            if extension in self._parser_classes:
+                return self._parser_classes[extension]
+
+            loader = loaders[extension]
+            if isinstance(loader, str):
+                import importlib
+                loaded = importlib.import_module(loader)
+            else:
+                # Entry point, it might refer to a module or a class
+                loaded = loader.load()
+            cls_parser = loaded if isinstance(loaded, type) else _find_parser_class(loaded)
+            self._check_parser_class(cls_parser)
+            self._parser_classes[extension] = cls_parser
+            return cls_parser
+
+    def get_parser(self, extension, **kwargs):
+        """Get an instance of parser for given file extension. Keyword
+        arguments are passed to constructor of the parser."""
+        return self.get_parser_class(extension)(**kwargs)
+
+    def capabilities(self, extension):
+        """Returns capabilities of parser for given file extension.
+
+        Returns
+        -------
+        capabilities : dict
+            - 'extensions': list of str, all extensions supported by the parser.
+            - 'streaming': bool, whether the parser supports streaming parse.
+            - 'directory': bool, whether the parser accepts a directory.
+            - 'update': bool, whether the parser supports incremental update.
+        """
+        cls_parser = self.get_parser_class(extension)
+        return {
+            'extensions': list(cls_parser.VALID_EXTENSIONS) or [extension],
+            'streaming': cls_parser.SUPPORTS_STREAMING,
+            'directory': cls_parser.ACCEPTS_DIRECTORY,
+            'update': cls_parser.SUPPORTS_UPDATE,
+        }
+
+
+parser_registry = ParserRegistry()
+
+
+def get_graph_parser(parser_type, **kwargs):
+    """Get an instance of graph parser from the default registry.
+
+    Parameters
+    ----------
+    parser_type : str
+        Type of parser, i.e. the file extension.
+    **kwargs
+        Arguments passed to constructor of the parser.
+
+    Returns
+    -------
+    parser : an sublcass instance of `BaseParser`
+    """
+    return parser_registry.get_parser(parser_type, **kwargs)
 
 
-__all__ = ['get_graph_parser']
+__all__ = ['ParserRegistry', 'get_graph_parser', 'parser_registry']
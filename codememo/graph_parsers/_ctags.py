@@ -0,0 +1,70 @@
+"""A parser for building nodes from tags files of universal-ctags in JSON
+format, see also `codememo.symbols`.
+
+Tags files usually contain far more symbols than anyone wants to see on a
+canvas, so only symbols of selected kinds (`CtagsParser.DEFAULT_KINDS` by
+default) become nodes. Path of the tags file is stored in metadata of the
+collection (`METADATA_KEY`), so that the symbol index can be used to create
+other nodes later.
+
+Besides files with extension `.tags`, the default output file of ctags (named
+`tags`) is parsed by this parser as well.
+"""
+from codememo.objects import Node, NodeCollection
+from codememo.symbols import load_symbol_index
+from .base import BaseParser
+
+
+__all__ = ['CtagsParser']
+
+PARSER_IMPL = 'CtagsParser'
+
+# Key of tags file in `NodeCollection.metadata`
+METADATA_KEY = 'ctags'
+
+
+class CtagsParser(BaseParser):
+    """A parser for building nodes from tags files."""
+    VALID_EXTENSIONS = ['.tags']
+    # Kinds of definitions which can be shown as code snippets in common
+    # languages, e.g. methods are 'member' in Python and 'method' in Java.
+    DEFAULT_KINDS = ['class', 'function', 'method', 'member']
+
+    def __init__(self, kinds=None, cache_dir=None, use_cache=True):
+        """
+        Parameters
+        ----------
+        kinds : list of str, optional
+            Kinds of symbols to be created as nodes, e.g. 'class', 'function'
+            and 'member' (methods) for Python. Default is `DEFAULT_KINDS`, and
+            symbols of all kinds are created if it's an empty list.
+        cache_dir : str, optional
+            Directory to store symbol indices, see also `load_symbol_index()`.
+        use_cache : bool, optional
+            Whether to read and write cached symbol indices.
+        """
+        super(CtagsParser, self).__init__()
+        self.kinds = list(self.DEFAULT_KINDS if kinds is None else kinds)
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+
+    def parse(self, fn):
+        """Parse a tags file to a `NodeCollection`. Snippets are read from
+        source files, and each file is read only once.
+
+        Parameters
+        ----------
+        fn : str
+            Path of file.
+        """
+        index = load_symbol_index(fn, cache_dir=self.cache_dir, use_cache=self.use_cache)
+        symbols = sorted(
+            index.iter_symbols(self.kinds or None), key=lambda v: (v.path, v.line)
+        )
+        nodes = [
+            Node(index.read_snippet(symbol), metadata={'kind': symbol.kind})
+            for symbol in symbols
+        ]
+        node_collection = NodeCollection(nodes)
+        node_collection.metadata[METADATA_KEY] = {'path': fn, 'n_symbols': len(index)}
+        return node_collection
@@ -1,59 +1,532 @@
-try:
-    import pygraphviz
-    from networkx import nx_agraph
-    from networkx.readwrite import json_graph
-except ImportError as ex_import:
-    msg = 'Please install required dependencies before importing this module.'
-    raise ImportError(msg) from ex_import
+"""A pure-Python parser for DOT files.
 
+File content is tokenized chunk by chunk and statements are emitted as soon as
+they are read, so that neither the whole file nor an intermediate graph object
+(e.g. `pygraphviz.AGraph`) has to be kept in memory. See also
+https://graphviz.org/doc/info/lang.html for the grammar of DOT language.
+
+Files rendered by Graphviz (e.g. `dot -Tdot`) contain the layout of nodes in
+`pos` attributes already. `DotParser` can keep those coordinates (or compute
+them by running `dot -Tplain` once) in `Node.metadata[POSITION_KEY]`, so that
+the layout does not have to be calculated again by viewers.
+"""
 from pathlib import Path
+import re
+import shlex
+import subprocess
 
-from codememo.objects import Snippet, Node, NodeCollection
+from codememo.objects import Snippet, Node
 from .base import BaseParser
 
 
-__all__ = ['DotParser']
+__all__ = ['DotParser', 'iter_dot_tokens', 'iter_dot_statements']
 
 PARSER_IMPL = 'DotParser'
 
+# Each pattern here can only match in one way, otherwise backtracking might
+# split a comment or an ID and match the rest as another token.
+_SKIP_PATTERN = r'(?:\s+(?!\s)|;|//[^\n]*(?![^\n])|/\*(?:[^*]|\*(?!/))*\*/|^\#[^\n]*(?![^\n]))*'
+_STRING_PATTERN = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+_ID_PATTERN = r'[^\W\d]\w*(?!\w)|-?(?:\.\d+|\d+(?:\.\d*)?)(?![\w.])|' + _STRING_PATTERN
+_NODE_ID_PATTERN = r'(?!(?i:strict|graph|digraph|subgraph|node|edge)\b)(?:{0})'.format(_ID_PATTERN)
+_ATTRS_PATTERN = r'\[\s*(?:(?:{0})\s*=\s*(?:{0})\s*[,;]?\s*)*\]'.format(_ID_PATTERN)
+
+# Whitespaces, comments and separators (`;`, which is always optional) are
+# skipped as the prefix of each token.
+#
+# Simple statements (`a [...]` and `a -> b [...]`), which are the majority in
+# call graphs, are matched as single tokens. They are not matched right after
+# those tokens which make them a part of another statement (e.g. `x = a`,
+# `x -> a -> b` or `"x" + "a"`), or when they are followed by tokens which
+# should be parsed by general rules (e.g. a port, an edge chain, or an
+# attribute list containing comments or HTML strings).
+#
+# Any other character is matched by `other`, it's either a syntax error or the
+# beginning of a token which is not completely read yet (e.g. an unterminated
+# string).
+_TOKEN_RE = re.compile(r"""
+    (?<![-+=:>]){skip}
+    (?:
+        (?P<edge>
+            (?P<source>{node_id}){skip}(?:->|--){skip}(?P<target>{node_id}){skip}(?P<edge_attrs>{attrs})?
+        )(?!{skip}(?:->|--|[-:+\[\]=,{{]))
+      | (?P<node>
+            (?P<name>{node_id}){skip}(?P<node_attrs>{attrs})?
+        )(?!{skip}(?:->|--|[-:+\[\]=,{{]))
+    )
+  | {skip}
+    (?:
+        (?P<id>[^\W\d]\w*|-?(?:\.\d+|\d+(?:\.\d*)?))
+      | (?P<string>{string})
+      | (?P<attrs>{attrs})
+      | (?P<punct>[{{}}\[\],=:+])
+      | (?P<edgeop>->|--)
+      | (?P<html><)
+      | (?P<other>.)
+      | \Z
+    )
+""".format(
+    skip=_SKIP_PATTERN, string=_STRING_PATTERN, node_id=_NODE_ID_PATTERN, attrs=_ATTRS_PATTERN,
+), re.DOTALL | re.MULTILINE | re.VERBOSE)
+_ATTR_RE = re.compile(r'({0})\s*=\s*({0})'.format(_ID_PATTERN), re.DOTALL)
+_ESCAPE_RE = re.compile(r'\\(\r?\n|")')
+
+# Characters which might be the beginning of an incomplete token
+_INCOMPLETE_TOKEN_STARTS = '"/-.'
+
+_EOF = ('eof', None)
+
+# Key of node position in `Node.metadata`, it's `[x, y]` in points with y axis
+# pointing upward, as the coordinate system of Graphviz.
+POSITION_KEY = 'pos'
+
+# Points per inch, coordinates in `-Tplain` output are in inches
+_POINTS_PER_INCH = 72.0
+
+
+def _unquote(text):
+    # Remove line continuations and unescape quotes, other escape sequences
+    # (e.g. `\n` in labels) are meaningful to graphviz and kept as they are.
+    if '\\' not in text:
+        return text[1:-1]
+    return _ESCAPE_RE.sub(lambda m: '"' if m.group(1) == '"' else '', text[1:-1])
+
+
+def _parse_attrs(text):
+    if text is None:
+        return {}
+    return {
+        (k if k[0] != '"' else _unquote(k)): (v if v[0] != '"' else _unquote(v))
+        for k, v in _ATTR_RE.findall(text)
+    }
+
+
+def _unquote_id(text):
+    return text if text[0] != '"' else _unquote(text)
+
+
+def _match_html_string(buffer, pos):
+    """Returns end position of a HTML string starting at `pos`, or -1 if it's
+    not terminated in given buffer."""
+    depth = 0
+    for i in range(pos, len(buffer)):
+        c = buffer[i]
+        if c == '<':
+            depth += 1
+        elif c == '>':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def _tokenize(buffer, pos, eof, tokens):
+    """Append tokens in buffer (starting from `pos`) to `tokens`, and returns
+    the position where unprocessed content begins."""
+    n = len(buffer)
+    append = tokens.append
+    while True:
+        # Pattern above always matches, so that matches are contiguous
+        prev = None
+        for m in _TOKEN_RE.finditer(buffer, pos):
+            kind = m.lastgroup
+            if kind == 'edge':
+                append((
+                    'edge', _unquote_id(m.group('source')), _unquote_id(m.group('target')),
+                    _parse_attrs(m.group('edge_attrs')),
+                ))
+            elif kind == 'node':
+                append(('node', _unquote_id(m.group('name')), _parse_attrs(m.group('node_attrs'))))
+            elif kind == 'id':
+                append(('id', m.group(kind)))
+            elif kind == 'string':
+                append(('string', _unquote(m.group(kind))))
+            elif kind == 'attrs':
+                append(('attrs', _parse_attrs(m.group(kind))))
+            elif kind == 'punct':
+                value = m.group(kind)
+                append((value, value))
+            elif kind == 'edgeop':
+                append(('edgeop', m.group(kind)))
+            else:
+                break
+            prev = m
+
+        if kind == 'html':
+            end = _match_html_string(buffer, m.start(kind))
+            if end != -1:
+                append(('string', buffer[m.start(kind) + 1:end - 1]))
+                pos = end
+                continue
+
+        if eof:
+            if kind is None:
+                return n
+        elif kind is None or kind == 'html' or buffer[m.start(kind)] in _INCOMPLETE_TOKEN_STARTS:
+            # Content after the last token is not complete yet, and the last
+            # token might be changed by following content (e.g. `a` might be
+            # the beginning of `a -> b`), so that it will be processed again.
+            if prev is None:
+                return m.start()
+            tokens.pop()
+            return prev.start()
+
+        start = m.start(kind)
+        raise ValueError(f'invalid DOT syntax near: {buffer[start:start + 20]!r}')
+
+
+def _iter_token_batches(f, chunk_size):
+    """Yields lists of tokens, one list for each chunk read from file."""
+    buffer, pos, eof = '', 0, False
+    while not eof:
+        chunk = f.read(chunk_size)
+        eof = len(chunk) == 0
+        buffer += chunk
+        tokens = []
+        pos = _tokenize(buffer, pos, eof, tokens)
+        # Keep the character before unprocessed content for lookbehind
+        if pos > 0:
+            buffer, pos = buffer[pos - 1:], 1
+        if tokens:
+            yield tokens
+
+
+def iter_dot_tokens(f, chunk_size=1 << 16):
+    """Yields tokens of DOT language from a text file.
+
+    Most of tokens are `(kind, value)`, where `kind` is one of 'id' (unquoted
+    identifier or numeral), 'string' (quoted or HTML string, which is already
+    unquoted), 'edgeop', 'attrs' (a whole attribute list parsed as a dict), or
+    the punctuation itself, e.g. '{'. Simple statements are yielded as
+    `('node', name, attrs)` and `('edge', source, target, attrs)`.
+
+    Parameters
+    ----------
+    f : file-like object
+        A file opened in text mode.
+    chunk_size : int, optional
+        Number of characters to read at once.
+    """
+    for tokens in _iter_token_batches(f, chunk_size):
+        yield from tokens
+
+
+class _StatementReader(object):
+    """A recursive descent parser collecting node and edge statements.
+
+    Tokens are pulled from batches on demand, and collected statements are
+    handed out after each top-level statement, see also `read()`.
+    """
+    KEYWORDS_ATTR_STMT = ('graph', 'node', 'edge')
+
+    def __init__(self, token_batches):
+        self._batches = iter(token_batches)
+        self._tokens, self._pos = [], 0
+        self._statements = []
+
+    def _peek(self):
+        if self._pos == len(self._tokens):
+            self._tokens, self._pos = next(self._batches, [_EOF]), 0
+        return self._tokens[self._pos]
+
+    def _next(self):
+        token = self._peek()
+        self._pos += 1
+        return token
+
+    def _raise_unexpected(self, token, expected):
+        if token[0] == 'eof':
+            raise ValueError('invalid DOT syntax: unexpected end of file')
+        raise ValueError(f'invalid DOT syntax: expected {expected}, got {token[1]!r}')
+
+    def _expect(self, kind):
+        token = self._next()
+        if token[0] != kind:
+            self._raise_unexpected(token, repr(kind))
+        return token[1]
+
+    def _is_keyword(self, token, *keywords):
+        return token[0] == 'id' and token[1].lower() in keywords
+
+    def _read_id(self):
+        token = self._next()
+        kind, value = token[0], token[1]
+        if kind != 'id' and kind != 'string':
+            self._raise_unexpected(token, 'an ID')
+        # Concatenation of quoted strings: "foo" + "bar"
+        while kind == 'string' and self._peek()[0] == '+':
+            self._next()
+            value += self._expect('string')
+        return value
+
+    def _read_attr_lists(self):
+        attrs = {}
+        while True:
+            kind = self._peek()[0]
+            if kind == 'attrs':
+                attrs.update(self._next()[1])
+            elif kind == '[':
+                self._next()
+                while self._peek()[0] != ']':
+                    key = self._read_id()
+                    self._expect('=')
+                    attrs[key] = self._read_id()
+                    if self._peek()[0] in (',', ';'):
+                        self._next()
+                self._next()
+            else:
+                return attrs
+
+    def _read_node_id(self):
+        name = self._read_id()
+        # Ports are not used in this application
+        while self._peek()[0] == ':':
+            self._next()
+            self._read_id()
+        return name
+
+    def read(self):
+        """Yields `('node', name, attrs)` and `('edge', source, target, attrs)`.
+        Nodes referenced by edge statements are yielded before the edges."""
+        token = self._next()
+        if self._is_keyword(token, 'strict'):
+            token = self._next()
+        if not self._is_keyword(token, 'graph', 'digraph'):
+            raise ValueError('it seems given file is not a valid DOT file.')
+        if self._peek()[0] != '{':
+            self._read_id()
+        self._expect('{')
+
+        members, statements = [], self._statements
+        while self._read_stmt_or_close(members):
+            # Statements inside a subgraph are handed out once it's closed
+            yield from statements
+            statements.clear()
+            del members[:]
+
+    def _read_stmt_or_close(self, members):
+        """Read a statement (or skip a separator) and returns True, or returns
+        False if the current graph is closed."""
+        kind = self._peek()[0]
+        if kind == '}':
+            self._next()
+            return False
+        elif kind == ';':
+            self._next()
+        elif kind == 'eof':
+            raise ValueError('invalid DOT syntax: unexpected end of file')
+        else:
+            self._read_stmt(members)
+        return True
+
+    def _read_subgraph(self):
+        if self._is_keyword(self._peek(), 'subgraph'):
+            self._next()
+            if self._peek()[0] != '{':
+                self._read_id()
+        self._expect('{')
+        members = []
+        while self._read_stmt_or_close(members):
+            pass
+        return members
+
+    def _read_operand(self):
+        token = self._peek()
+        if token[0] == '{' or self._is_keyword(token, 'subgraph'):
+            return self._read_subgraph()
+        return [self._read_node_id()]
+
+    def _read_stmt(self, members):
+        token = self._peek()
+        if token[0] == 'node':
+            self._next()
+            self._statements.append(token)
+            members.append(token[1])
+            return
+        elif token[0] == 'edge':
+            self._next()
+            self._statements.extend([('node', token[1], {}), ('node', token[2], {}), token])
+            members.extend(token[1:3])
+            return
+
+        if self._is_keyword(token, *self.KEYWORDS_ATTR_STMT):
+            # Default attributes are not used in this application
+            self._next()
+            self._read_attr_lists()
+            return
+
+        is_subgraph = token[0] == '{' or self._is_keyword(token, 'subgraph')
+        operand = self._read_operand()
+        kind = self._peek()[0]
+        if kind == '=' and not is_subgraph:
+            # Graph attribute: ID '=' ID
+            self._next()
+            self._read_id()
+            return
+
+        statements = self._statements
+        if kind != 'edgeop':
+            attrs = self._read_attr_lists()
+            if not is_subgraph:
+                statements.append(('node', operand[0], attrs))
+            members.extend(operand)
+            return
+
+        operands = [operand]
+        while self._peek()[0] == 'edgeop':
+            self._next()
+            operands.append(self._read_operand())
+        attrs = self._read_attr_lists()
+
+        for operand in operands:
+            statements.extend([('node', name, {}) for name in operand])
+            members.extend(operand)
+        for sources, targets in zip(operands[:-1], operands[1:]):
+            for source in sources:
+                statements.extend([('edge', source, target, attrs) for target in targets])
+
+
+def iter_dot_statements(f, chunk_size=1 << 16):
+    """Yields node and edge statements of a DOT file, see also
+    `_StatementReader.read()`.
+
+    Parameters
+    ----------
+    f : file-like object
+        A file opened in text mode.
+    chunk_size : int, optional
+        Number of characters to read at once.
+    """
+    return _StatementReader(_iter_token_batches(f, chunk_size)).read()
+
+
+def parse_position(value):
+    """Returns `[x, y]` of a `pos` attribute of node like `"10.5,20!"`, or None
+    if it's invalid."""
+    try:
+        x, y = value.rstrip('!').split(',')[:2]
+        return [float(x), float(y)]
+    except ValueError:
+        return None
+
+
+def parse_plain_positions(text):
+    """Returns a map of node name to `[x, y]` (in points) from output of
+    `dot -Tplain`, see also https://graphviz.org/docs/outputs/plain/."""
+    positions = {}
+    for line in text.splitlines():
+        if not line.startswith('node '):
+            continue
+        try:
+            _, name, x, y = shlex.split(line)[:4]
+            positions[name] = [float(x) * _POINTS_PER_INCH, float(y) * _POINTS_PER_INCH]
+        except ValueError:
+            continue
+    return positions
+
+
+def run_dot_layout(fn, dot_binary='dot', timeout=None):
+    """Lay out a DOT file by running `dot -Tplain` and returns positions of
+    nodes, see also `parse_plain_positions()`."""
+    try:
+        result = subprocess.run(
+            [dot_binary, '-Tplain', str(fn)], stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, check=True, timeout=timeout,
+        )
+    except FileNotFoundError:
+        raise RuntimeError(f'`{dot_binary}` is not found, Graphviz is required to lay out graphs.')
+    except subprocess.CalledProcessError as ex:
+        msg = ex.stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f'Failed to lay out graph by `{dot_binary}`: {msg}')
+    return parse_plain_positions(result.stdout.decode('utf-8', errors='replace'))
+
 
 class DotParser(BaseParser):
     """A parser for parsing DOT file to data structure used by this application."""
     VALID_EXTENSIONS = ['.dot']
+    SUPPORTS_STREAMING = True
+    # Edges are deduplicated and they always refer to the first line
+    TRUSTED = True
+    LAYOUT_OPTIONS = (None, 'pos', 'dot')
 
-    def _convert_to_json_graph(self, fn):
-        """Convert `AGraph` (content of a DOT file, usually generated by `graphviz`)
-        to a JSON graph."""
-        graph_dot = pygraphviz.AGraph(fn)
-        graph_netx = nx_agraph.from_agraph(graph_dot)
-        graph_json = json_graph.node_link_data(graph_netx)
-        return graph_json
+    def __init__(self, layout=None, dot_binary='dot'):
+        """
+        Parameters
+        ----------
+        layout : str, optional
+            Where positions of nodes come from, they are stored in
+            `Node.metadata[POSITION_KEY]`.
+            - None: positions are not stored.
+            - 'pos': `pos` attributes of nodes, which are written by Graphviz.
+            - 'dot': layout computed by running `dot -Tplain` once.
+        dot_binary : str, optional
+            Path of `dot` executable, it's used only if `layout` is 'dot'.
+        """
+        super(DotParser, self).__init__()
+        if layout not in self.LAYOUT_OPTIONS:
+            raise ValueError(f'`layout` should be one of {self.LAYOUT_OPTIONS}, got {layout!r}')
+        self.layout = layout
+        self.dot_binary = dot_binary
 
-    def parse(self, fn):
-        """Parse a DOT file to a `NodeCollection` object.
+    def parse_iter(self, fn, batch_size=None):
+        """Parse a DOT file and yields batches of `(nodes, edges)`, see also
+        `BaseParser.parse_iter()`.
 
-        Note that nodes with multiple parents (roots) will be separated into several
-        new nodes since `codememo.object.Node` is a single-root structure.
+        Node IDs in DOT file are used as names of snippets. Multi-edges are
+        collapsed since a leaf can only be referenced once by the same root.
+        Positions of nodes are stored according to `layout`, see also
+        `__init__()`.
 
         Parameters
         ----------
         fn : str
             Path of file.
+        batch_size : int, optional
+            Number of nodes and edges in a batch.
         """
         if Path(fn).suffix not in self.VALID_EXTENSIONS:
             raise ValueError('it seems given file is not a valid DOT file.')
+        if batch_size is None:
+            batch_size = self.DEFAULT_BATCH_SIZE
 
-        graph_json = self._convert_to_json_graph(fn)
+        node_index_map, edge_set = {}, set()
+        nodes, edges = [], []
+        # Layout is computed before parsing, since nodes are handed out while
+        # parsing.
+        positions = run_dot_layout(fn, self.dot_binary) if self.layout == 'dot' else None
+        # Attributes of a node might be declared after it's referenced by an
+        # edge, so all nodes are kept to store positions later.
+        all_nodes = [] if self.layout == 'pos' else None
 
-        raw_nodes = graph_json['nodes']
-        raw_links = graph_json['links']
+        def get_index(name):
+            idx = node_index_map.get(name)
+            if idx is None:
+                idx = node_index_map[name] = len(node_index_map)
+                node = Node(Snippet(name, ''))
+                if positions is not None and name in positions:
+                    node.metadata[POSITION_KEY] = positions[name]
+                if all_nodes is not None:
+                    all_nodes.append(node)
+                nodes.append(node)
+            return idx
 
-        nodes = [Node(Snippet(raw_node['id'], '')) for raw_node in raw_nodes]
-        node_index_map = {raw_node['id']: i for i, raw_node in enumerate(raw_nodes)}
+        with self.open_file(fn, 'r', encoding='utf-8') as f:
+            for statement in iter_dot_statements(f):
+                if statement[0] == 'node':
+                    idx = get_index(statement[1])
+                    if all_nodes is not None and 'pos' in statement[2]:
+                        pos = parse_position(statement[2]['pos'])
+                        if pos is not None:
+                            all_nodes[idx].metadata[POSITION_KEY] = pos
+                else:
+                    key = (get_index(statement[1]), get_index(statement[2]))
+                    if key not in edge_set:
+                        edge_set.add(key)
+                        edges.append(key + (1, None))
 
-        for raw_link in raw_links:
-            idx_src, idx_tgt = node_index_map[raw_link['source']], node_index_map[raw_link['target']]
-            src, tgt = nodes[idx_src], nodes[idx_tgt]
-            src.add_leaf(tgt)
+                if len(nodes) + len(edges) >= batch_size:
+                    yield nodes, edges
+                    nodes, edges = [], []
 
-        return NodeCollection(nodes)
+        if nodes or edges:
+            yield nodes, edges
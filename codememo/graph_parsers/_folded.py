@@ -0,0 +1,130 @@
+"""A parser for building call graphs from folded (collapsed) stacks, which are
+the input format of flame graphs, e.g. outputs of `py-spy record -f raw` and
+`stackcollapse-perf.pl`. Each line is a stack of frames (from root to leaf)
+separated by semicolons, followed by the number of samples:
+
+    main;foo;bar 10
+    main (app.py:10);foo (app.py:4) 3
+
+Lines are streamed and aggregated into a call graph while reading, so memory
+usage depends on the number of distinct frames and calls, not the file size.
+Each frame becomes a node whose sample counts are stored in `Node.metadata`:
+
+- 'samples': number of samples containing the frame
+- 'self_samples': number of samples where the frame is on the top of stack
+"""
+import re
+
+from codememo.objects import Snippet, Node, _gc_paused
+from .base import BaseParser
+
+
+__all__ = ['FoldedStackParser']
+
+PARSER_IMPL = 'FoldedStackParser'
+
+# Frames annotated with location by py-spy, e.g. `foo (app.py:10)`
+_LOCATION_RE = re.compile(r'^(.+) \((.+?)(?::(\d+))?\)$')
+
+
+class _FrameIndex(dict):
+    """A map from frame to index, new frames are indexed on lookup."""
+
+    def __missing__(self, key):
+        idx = self[key] = len(self)
+        return idx
+
+
+def aggregate_stacks(f):
+    """Aggregate folded stacks read from given binary stream.
+
+    Returns
+    -------
+    frames : list of bytes
+        Distinct frames in order of appearance.
+    samples : dict
+        Map of frame index to `[samples, self_samples]`.
+    calls : dict
+        Map of `(caller_index, callee_index)` to number of samples.
+    """
+    frame_index = _FrameIndex()
+    lookup = frame_index.__getitem__
+    samples, calls = {}, {}
+
+    with _gc_paused():
+        for lineno, line in enumerate(f, 1):
+            stack, _, count = line.rstrip().rpartition(b' ')
+            if not stack:
+                if count:
+                    raise ValueError(f'Invalid folded stack at line {lineno}: missing count')
+                continue
+            try:
+                count = int(count)
+            except ValueError:
+                raise ValueError(f'Invalid folded stack at line {lineno}: {count!r}') from None
+
+            indices = list(map(lookup, stack.split(b';')))
+            # A frame is counted once per sample even if it's recursive
+            for idx in set(indices):
+                entry = samples.get(idx)
+                if entry is None:
+                    samples[idx] = [count, 0]
+                else:
+                    entry[0] += count
+            samples[indices[-1]][1] += count
+            for key in zip(indices, indices[1:]):
+                calls[key] = calls.get(key, 0) + count
+
+    return list(frame_index), samples, calls
+
+
+def _make_snippet(frame):
+    name = frame.decode('utf-8', errors='replace')
+    matched = _LOCATION_RE.match(name)
+    if matched is None:
+        return Snippet(name, '')
+    name, path, line = matched.groups()
+    return Snippet(name, '', line_start=int(line) if line else None, path=path)
+
+
+class FoldedStackParser(BaseParser):
+    """A parser for building call graph from folded stacks."""
+    VALID_EXTENSIONS = ['.folded', '.txt']
+    SUPPORTS_STREAMING = True
+    # Edges are aggregated in a dict, so that there are no duplicates
+    TRUSTED = True
+    # Size of buffer for reading file
+    BUFFER_SIZE = 2**20
+
+    def parse_iter(self, fn, batch_size=None):
+        """Parse a file of folded stacks and yields batches of
+        `(nodes, edges)`, see also `BaseParser.parse_iter()`. Nodes are created
+        after the whole file is aggregated.
+
+        Parameters
+        ----------
+        fn : str
+            Path of file.
+        batch_size : int, optional
+            Number of nodes and edges in a batch.
+        """
+        if batch_size is None:
+            batch_size = self.DEFAULT_BATCH_SIZE
+        with self.open_file(fn, 'rb', buffering=self.BUFFER_SIZE) as f:
+            frames, samples, calls = aggregate_stacks(f)
+
+        for i in range(0, len(frames), batch_size):
+            nodes = []
+            for idx in range(i, min(i + batch_size, len(frames))):
+                total, self_total = samples[idx]
+                nodes.append(Node(_make_snippet(frames[idx]), metadata={
+                    'samples': total, 'self_samples': self_total,
+                }))
+            yield nodes, []
+
+        # Snippets have no content, so references point to their first line
+        edges = list(calls)
+        for i in range(0, len(edges), batch_size):
+            yield [], [
+                (idx_root, idx_leaf, 1, None) for idx_root, idx_leaf in edges[i:i + batch_size]
+            ]
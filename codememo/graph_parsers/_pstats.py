@@ -0,0 +1,220 @@
+"""A parser for building weighted call graphs from profiling results dumped by
+`cProfile` or `profile` (i.e. `pstats.Stats.dump_stats()`).
+
+Each profiled function becomes a node whose statistics are stored in
+`Node.metadata`:
+
+- 'ncalls': total number of calls
+- 'pcalls': number of primitive (non-recursive) calls
+- 'tottime': time spent in the function itself, in seconds
+- 'cumtime': time spent in the function and its callees, in seconds
+
+Functions below a threshold of cumulative time are pruned before any node is
+created. Since loading a large dump takes a while, the pruned graph is cached
+in a compact form keyed by hash of the dump file and the threshold.
+"""
+import hashlib
+import marshal
+import os
+
+from codememo.objects import Snippet, Node, NodeCollection, _gc_paused
+from .base import BaseParser
+
+
+__all__ = ['PstatsParser']
+
+PARSER_IMPL = 'PstatsParser'
+
+# Key of summary in `NodeCollection.metadata`
+METADATA_KEY = 'pstats'
+
+# Version of cached results, it should be increased once the conversion is
+# changed so that outdated caches are not used.
+CACHE_VERSION = 1
+
+
+def load_stats(data):
+    """Load the raw statistics from content of a dump file, which is a marshaled
+    dict of `{(path, line, func_name): (pcalls, ncalls, tottime, cumtime, callers)}`.
+    Unlike `pstats.Stats`, nothing else is computed here."""
+    try:
+        # Millions of containers are created at once, which would trigger
+        # garbage collection repeatedly.
+        with _gc_paused():
+            stats = marshal.loads(data)
+    except (EOFError, ValueError, TypeError) as ex:
+        raise ValueError('it seems given file is not a pstats file.') from ex
+    if not isinstance(stats, dict):
+        raise ValueError('it seems given file is not a pstats file.')
+    return stats
+
+
+def _make_snippet(func):
+    path, line, func_name = func
+    if path == '~':
+        # Built-in functions, e.g. `('~', 0, "<method 'append' of 'list' objects>")`
+        return Snippet(func_name, '')
+    return Snippet(func_name, '', line_start=line or None, path=path)
+
+
+class PstatsParser(BaseParser):
+    """A parser for building call graph from pstats files."""
+    VALID_EXTENSIONS = ['.prof', '.pstats']
+    SUPPORTS_STREAMING = True
+    # Edges are built from keys of a dict, so that there are no duplicates
+    TRUSTED = True
+
+    def __init__(self, min_cumulative_time=0.0, cache_dir=None, use_cache=True):
+        """
+        Parameters
+        ----------
+        min_cumulative_time : float, optional
+            Functions whose cumulative time (in seconds) is less than this
+            value are pruned while importing.
+        cache_dir : str, optional
+            Directory to store converted results. Default is the `cache`
+            directory under config directory of this application.
+        use_cache : bool, optional
+            Whether to read and write cached results in `parse()`.
+        """
+        super(PstatsParser, self).__init__()
+        if cache_dir is None:
+            from codememo.config import AppDefaults
+            cache_dir = AppDefaults.dir_cache
+        self.min_cumulative_time = min_cumulative_time
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+
+    def get_cache_path(self, digest):
+        """Returns path of cached result for a dump file of given hash."""
+        fn = f'pstats-v{CACHE_VERSION}-{digest}-{self.min_cumulative_time!r}.bin'
+        return os.path.join(self.cache_dir, fn)
+
+    def _load_cache(self, fn_cache):
+        try:
+            with open(fn_cache, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            with _gc_paused():
+                version, graph = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            version = None
+        # A broken or outdated cache is treated as a cache miss, and it will
+        # be overwritten later.
+        return graph if version == CACHE_VERSION else None
+
+    def _write_cache(self, graph, fn_cache):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temporary file first so that a partially written
+            # cache is never read by other processes.
+            fn_temp = f'{fn_cache}.{os.getpid()}.tmp'
+            with open(fn_temp, 'wb') as f:
+                marshal.dump((CACHE_VERSION, graph), f)
+            os.replace(fn_temp, fn_cache)
+        except OSError:
+            pass
+
+    def prune(self, stats):
+        """Returns a compact graph `(n_functions, funcs, metrics, edges)` of
+        functions whose cumulative time is not less than `min_cumulative_time`.
+
+        - `funcs`: keys of functions, i.e. `(path, line, func_name)`
+        - `metrics`: `(pcalls, ncalls, tottime, cumtime)` of functions
+        - `edges`: `(caller_index, callee_index)`, in order of callees
+        """
+        threshold = self.min_cumulative_time
+        funcs = [k for k, v in stats.items() if v[3] >= threshold]
+        index_map = {v: i for i, v in enumerate(funcs)}
+        metrics = [stats[v][:4] for v in funcs]
+        edges = [
+            (index_map[caller], idx_leaf)
+            for idx_leaf, func in enumerate(funcs)
+            for caller in stats[func][4] if caller in index_map
+        ]
+        return len(stats), funcs, metrics, edges
+
+    def parse(self, fn):
+        """Parse a pstats file to a `NodeCollection`. Converted result is
+        cached if `use_cache` is True.
+
+        Parameters
+        ----------
+        fn : str
+            Path of file.
+        """
+        data = self.read_file(fn)
+        digest = hashlib.sha1(data).hexdigest()
+
+        fn_cache = self.get_cache_path(digest) if self.use_cache else None
+        graph = None if fn_cache is None else self._load_cache(fn_cache)
+        if graph is None:
+            stats = load_stats(data)
+            del data
+            graph = self.prune(stats)
+            del stats
+            if fn_cache is not None:
+                self._write_cache(graph, fn_cache)
+
+        node_collection = self._build(graph)
+        node_collection.metadata[METADATA_KEY]['hash'] = digest
+        return node_collection
+
+    def from_stats(self, stats):
+        """Build a `NodeCollection` from raw statistics, e.g. `stats` of a
+        `cProfile.Profile` object after `create_stats()` is called.
+
+        Parameters
+        ----------
+        stats : dict
+            See also `load_stats()`.
+        """
+        return self._build(self.prune(stats))
+
+    def _build(self, graph):
+        node_collection = NodeCollection.from_batches(
+            self.track_batches(self._iter_batches(graph, self.DEFAULT_BATCH_SIZE)),
+            trusted=self.TRUSTED,
+        )
+        node_collection.metadata[METADATA_KEY] = {
+            'min_cumulative_time': self.min_cumulative_time,
+            'n_functions': graph[0],
+        }
+        return node_collection
+
+    def parse_iter(self, fn, batch_size=None):
+        """Parse a pstats file and yields batches of `(nodes, edges)`, see
+        also `BaseParser.parse_iter()`. Cache is not used here.
+
+        Parameters
+        ----------
+        fn : str
+            Path of file.
+        batch_size : int, optional
+            Number of nodes and edges in a batch.
+        """
+        if batch_size is None:
+            batch_size = self.DEFAULT_BATCH_SIZE
+        stats = load_stats(self.read_file(fn))
+        yield from self._iter_batches(self.prune(stats), batch_size)
+
+    def _iter_batches(self, graph, batch_size):
+        _, funcs, metrics, edges = graph
+        for i in range(0, len(funcs), batch_size):
+            nodes = []
+            for func, (pcalls, ncalls, tottime, cumtime) in zip(
+                funcs[i:i + batch_size], metrics[i:i + batch_size]
+            ):
+                nodes.append(Node(_make_snippet(func), metadata={
+                    'ncalls': ncalls, 'pcalls': pcalls,
+                    'tottime': tottime, 'cumtime': cumtime,
+                }))
+            yield nodes, []
+
+        # Snippets have no content, so references point to their first line
+        for i in range(0, len(edges), batch_size):
+            yield [], [
+                (idx_root, idx_leaf, 1, None) for idx_root, idx_leaf in edges[i:i + batch_size]
+            ]
@@ -0,0 +1,630 @@
+"""A parser for building call graphs from Python source code statically.
+
+Every function and class in given files becomes a node with its source code,
+and call sites are resolved to references to the called functions (or classes)
+when they can be determined statically, i.e.
+
+- names defined in enclosing functions, in the same module, or imported from
+  another module in the same source tree (`import x`, `from x import y`,
+  including relative imports and re-exports);
+- methods called through `self` or `cls` in the same class;
+- attributes of imported modules or of classes, e.g. `mod.func()` and
+  `SomeClass.method()`.
+
+Files are parsed in a process pool, and only the compact results (definitions,
+call sites and imports) are sent back to this process.
+
+A collection built by `PythonSourceParser.parse()` carries a manifest of source
+files in its metadata (`MANIFEST_KEY`), so that it can be updated incrementally
+by `PythonSourceParser.update()` after source code is changed.
+"""
+from pathlib import Path
+import hashlib
+import os
+import warnings
+
+from codememo.objects import Snippet, Node, ReferenceInfo, NodeCollection
+from .base import BaseParser
+
+
+__all__ = ['PythonSourceParser']
+
+PARSER_IMPL = 'PythonSourceParser'
+
+# Directories which are not a part of source tree
+EXCLUDED_DIRS = {'__pycache__', 'node_modules', 'site-packages', 'venv'}
+
+# Maximum length of import chains (re-exports) to be followed
+MAX_IMPORT_DEPTH = 8
+
+# Key of manifest in `NodeCollection.metadata`
+MANIFEST_KEY = 'python_source'
+
+
+def iter_source_files(root):
+    """Yields paths of Python source files under given directory in sorted
+    order. Hidden directories and those in `EXCLUDED_DIRS` are skipped."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            v for v in dirnames if not v.startswith('.') and v not in EXCLUDED_DIRS
+        )
+        for name in sorted(filenames):
+            if name.endswith('.py'):
+                yield os.path.join(dirpath, name)
+
+
+def get_module_name(rel_path):
+    """Returns `(module_name, is_package)` of a source file by its path
+    relative to the root of source tree."""
+    parts = list(Path(rel_path).with_suffix('').parts)
+    is_package = parts[-1] == '__init__'
+    if is_package:
+        parts.pop()
+    return '.'.join(parts), is_package
+
+
+def hash_content(data):
+    """Returns hex digest of file content used in manifest."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def _get_dotted_name(node):
+    """Returns name parts of expression like `a.b.c`, or None if it's not a
+    chain of attributes."""
+    import ast
+
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return tuple(reversed(parts))
+
+
+def _parse_source_file(path, rel_path):
+    """Parse a source file. This is run in worker processes.
+
+    Returns
+    -------
+    result : dict or None
+        None if the file cannot be read or parsed. Otherwise, it contains
+        - 'path', 'module', 'is_package', 'hash'
+        - 'defs': list of `(qualname, kind, parent, line_start, content)`,
+          where `parent` is the index of enclosing definition (or -1).
+        - 'calls': list of `(def_index, name_parts, lineno, end_lineno)`
+        - 'imports': dict of alias to fully qualified name
+    """
+    import ast
+    from importlib.util import decode_source
+
+    module, is_package = get_module_name(rel_path)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        text = decode_source(data)
+        tree = ast.parse(text, filename=path)
+    except (OSError, SyntaxError, ValueError, UnicodeDecodeError):
+        return None
+
+    lines = text.split('\n')
+    defs, calls, imports = [], [], {}
+    package = module if is_package else module.rpartition('.')[0]
+    def_types = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+    def resolve_relative(level, name):
+        base = package
+        for _ in range(level - 1):
+            base = base.rpartition('.')[0]
+        return '.'.join([v for v in (base, name) if v])
+
+    def visit(node, idx_parent, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, def_types):
+                qualname = prefix + child.name
+                line_start = min([child.lineno] + [v.lineno for v in child.decorator_list])
+                end_lineno = getattr(child, 'end_lineno', None) or child.lineno
+                kind = 'class' if isinstance(child, ast.ClassDef) else 'function'
+                defs.append((
+                    qualname, kind, idx_parent, line_start,
+                    '\n'.join(lines[line_start - 1:end_lineno]),
+                ))
+                child_prefix = qualname + ('.' if kind == 'class' else '.<locals>.')
+                visit(child, len(defs) - 1, child_prefix)
+                continue
+
+            if isinstance(child, ast.Call) and idx_parent != -1:
+                name_parts = _get_dotted_name(child.func)
+                if name_parts is not None:
+                    end_lineno = getattr(child, 'end_lineno', None) or child.lineno
+                    calls.append((idx_parent, name_parts, child.lineno, end_lineno))
+            elif isinstance(child, ast.Import) and idx_parent == -1:
+                for alias in child.names:
+                    if alias.asname:
+                        imports[alias.asname] = alias.name
+                    else:
+                        top = alias.name.split('.')[0]
+                        imports[top] = top
+            elif isinstance(child, ast.ImportFrom) and idx_parent == -1:
+                source = child.module or ''
+                if child.level:
+                    source = resolve_relative(child.level, source)
+                for alias in child.names:
+                    if alias.name != '*':
+                        imports[alias.asname or alias.name] = f'{source}.{alias.name}'
+            visit(child, idx_parent, prefix)
+
+    visit(tree, -1, '')
+    return {
+        'path': rel_path, 'module': module, 'is_package': is_package,
+        'hash': hash_content(data), 'defs': defs, 'calls': calls, 'imports': imports,
+    }
+
+
+def _parse_source_files(args):
+    """Parse a chunk of source files in a worker process."""
+    return [_parse_source_file(path, rel_path) for path, rel_path in args]
+
+
+class _CallResolver(object):
+    """Resolves call sites to indices of definitions across modules."""
+
+    def __init__(self):
+        # module name -> {qualname: target}, where target is an identifier of
+        # definition given by caller (e.g. global index of node)
+        self.module_defs = {}
+        self.module_imports = {}
+
+    def add_module(self, module, defs, imports):
+        """
+        Parameters
+        ----------
+        module : str
+            Name of module.
+        defs : dict
+            Map of qualified name to an identifier of definition, which is
+            returned by `resolve_*()`.
+        imports : dict
+            Map of alias to fully qualified name.
+        """
+        self.module_defs[module] = defs
+        self.module_imports[module] = imports
+
+    def resolve_global(self, dotted, depth=0):
+        """Resolve a fully qualified name like `pkg.mod.Class.method`."""
+        if depth > MAX_IMPORT_DEPTH:
+            return None
+        parts = dotted.split('.')
+        for i in range(len(parts), 0, -1):
+            module = '.'.join(parts[:i])
+            if module not in self.module_defs:
+                continue
+            rest = parts[i:]
+            if not rest:
+                return None
+            return self.resolve_in_module(module, rest, depth=depth)
+        return None
+
+    def resolve_in_module(self, module, parts, depth=0):
+        """Resolve name parts which are looked up from the global namespace of
+        given module."""
+        defs = self.module_defs[module]
+        idx = defs.get('.'.join(parts))
+        if idx is not None:
+            return idx
+        # Follow names imported into this module, e.g. re-exports
+        target = self.module_imports[module].get(parts[0])
+        if target is not None:
+            return self.resolve_global('.'.join([target] + list(parts[1:])), depth=depth + 1)
+        return None
+
+    def resolve_call(self, module, defs, idx_def, name_parts):
+        """
+        Parameters
+        ----------
+        module : str
+            Name of module where the call site is.
+        defs : list
+            Definitions of the module, see also `_parse_source_file()`.
+        idx_def : int
+            Index (in `defs`) of the definition containing the call site.
+        name_parts : tuple of str
+            Name of called object, e.g. `('self', 'foo')`.
+        """
+        local_defs = self.module_defs[module]
+
+        # Names defined in enclosing functions
+        idx = idx_def
+        while idx != -1:
+            qualname, kind, parent = defs[idx][:3]
+            if kind == 'function':
+                found = local_defs.get(f'{qualname}.<locals>.' + '.'.join(name_parts))
+                if found is not None:
+                    return found
+            idx = parent
+
+        # Methods called through `self` or `cls`
+        if len(name_parts) == 2 and name_parts[0] in ('self', 'cls'):
+            idx = idx_def
+            while idx != -1 and defs[idx][1] != 'class':
+                idx = defs[idx][2]
+            if idx != -1:
+                return local_defs.get(f'{defs[idx][0]}.{name_parts[1]}')
+            return None
+
+        return self.resolve_in_module(module, name_parts)
+
+
+def get_def_keys(qualnames):
+    """Returns keys of definitions in a file, which identify nodes in manifest
+    and while updating a collection.
+
+    Qualified names are not unique in a file, e.g. getter and setter of a
+    property, stubs decorated by `typing.overload` and definitions in branches
+    of `if` statement. So the n-th duplicate of a name is keyed as
+    `f'{qualname}#{n}'` (n > 0), which is never a valid qualified name.
+    """
+    counts, keys = {}, []
+    for qualname in qualnames:
+        n = counts.get(qualname, 0)
+        counts[qualname] = n + 1
+        keys.append(qualname if n == 0 else f'{qualname}#{n}')
+    return keys
+
+
+def _get_file_stat(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _hash_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return hash_content(f.read())
+    except OSError:
+        return None
+
+
+def _make_manifest_entry(stat, result):
+    """Returns an entry of manifest for a source file.
+
+    - 'mtime', 'size', 'hash': used to detect whether the file is changed
+    - 'imports': imports of the module, which are required to resolve calls
+      in other modules without parsing this file again
+    - 'links': `[root_key, leaf_path, leaf_key]` of references created from
+      call sites in this file, see also `get_def_keys()`
+    """
+    return {
+        'mtime': stat[0], 'size': stat[1],
+        'hash': None if result is None else result['hash'],
+        'imports': {} if result is None else result['imports'],
+        'links': [],
+    }
+
+
+def _iter_links(resolver, result):
+    """Yields `(def_index, target, ref_start, ref_stop)` of call sites in given
+    parsing result which can be resolved. A leaf can only be referenced once by
+    the same root, so only the first call site is yielded for each pair of
+    caller and callee."""
+    defs, seen = result['defs'], set()
+    for idx_def, name_parts, lineno, end_lineno in result['calls']:
+        target = resolver.resolve_call(result['module'], defs, idx_def, name_parts)
+        if target is None or (idx_def, target) in seen:
+            continue
+        seen.add((idx_def, target))
+
+        line_start = defs[idx_def][3]
+        ref_start = lineno - line_start + 1
+        ref_stop = end_lineno - line_start + 1 if end_lineno > lineno else None
+        yield idx_def, target, ref_start, ref_stop
+
+
+class PythonSourceParser(BaseParser):
+    """A parser for building call graph from Python source files."""
+    VALID_EXTENSIONS = ['.py']
+    SUPPORTS_STREAMING = True
+    SUPPORTS_UPDATE = True
+    ACCEPTS_DIRECTORY = True
+    # References are deduplicated and their lines are in range of snippets
+    TRUSTED = True
+    # Parsing in a process pool is not worth it for small source trees
+    MIN_FILES_FOR_PROCESS_POOL = 32
+
+    def __init__(self, max_workers=None):
+        """
+        Parameters
+        ----------
+        max_workers : int, optional
+            Number of processes to parse source files. If it's None, number of
+            CPUs is used.
+        """
+        super(PythonSourceParser, self).__init__()
+        self.max_workers = max_workers
+
+    def _iter_results(self, files):
+        """Yields parsing results of given `(path, rel_path)` in order."""
+        max_workers = self.max_workers or os.cpu_count() or 1
+        if max_workers <= 1 or len(files) < self.MIN_FILES_FOR_PROCESS_POOL:
+            for path, rel_path in files:
+                yield _parse_source_file(path, rel_path)
+            return
+
+        from codememo.tasks import new_process_pool
+
+        # Files are sent in chunks to reduce overhead of inter-process
+        # communication, and results are consumed in order of submission.
+        chunk_size = max(1, min(64, len(files) // (max_workers * 4)))
+        chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+        with new_process_pool(max_workers) as executor:
+            for results in executor.map(_parse_source_files, chunks):
+                yield from results
+
+    def _list_files(self, fn):
+        """Returns absolute path of `fn` and `(path, rel_path)` of source files
+        to be parsed."""
+        root = Path(fn)
+        if root.is_dir():
+            files = [(v, os.path.relpath(v, root)) for v in iter_source_files(root)]
+        elif root.suffix in self.VALID_EXTENSIONS and root.is_file():
+            files = [(str(root), root.name)]
+        else:
+            raise ValueError('it seems given path is not a Python source file or a directory.')
+        return os.path.abspath(fn), files
+
+    def _warn_failed(self, failed):
+        if failed:
+            warnings.warn(f'Failed to parse {len(failed)} file(s), e.g. {failed[0]}', UserWarning)
+
+    def parse(self, fn):
+        """Parse a Python source file, or all source files under a directory.
+        Manifest of source files is stored in metadata of returned collection,
+        see also `update()`.
+
+        Parameters
+        ----------
+        fn : str
+            Path of a source file or a directory.
+        """
+        manifest = {}
+        node_collection = NodeCollection.from_batches(
+            self.track_batches(self._parse_iter(fn, manifest=manifest)), trusted=self.TRUSTED
+        )
+        node_collection.metadata[MANIFEST_KEY] = manifest
+        return node_collection
+
+    def parse_iter(self, fn, batch_size=None):
+        """Parse a Python source file, or all source files under a directory,
+        and yields batches of `(nodes, edges)`, see also
+        `BaseParser.parse_iter()`.
+
+        Nodes are yielded as soon as files are parsed, and edges are yielded
+        after all files are parsed since call sites can refer to any file.
+
+        Parameters
+        ----------
+        fn : str
+            Path of a source file or a directory.
+        batch_size : int, optional
+            Number of nodes and edges in a batch.
+        """
+        yield from self._parse_iter(fn, batch_size=batch_size)
+
+    def _parse_iter(self, fn, batch_size=None, manifest=None):
+        """See `parse_iter()`. If `manifest` is given, it will be filled with
+        manifest of parsed files."""
+        if batch_size is None:
+            batch_size = self.DEFAULT_BATCH_SIZE
+
+        root, files = self._list_files(fn)
+        resolver = _CallResolver()
+        results, failed, entries = [], [], {}
+        # `(path, key)` of all nodes, it's used to write manifest only
+        node_keys = []
+        n_nodes, nodes = 0, []
+
+        for (path, rel_path), result in zip(files, self._iter_results(files)):
+            if manifest is not None:
+                entries[rel_path] = _make_manifest_entry(_get_file_stat(path), result)
+            if result is None:
+                failed.append(path)
+                continue
+
+            offset = n_nodes + len(nodes)
+            defs = result['defs']
+            resolver.add_module(
+                result['module'], {v[0]: offset + i for i, v in enumerate(defs)},
+                result['imports'],
+            )
+            results.append((result, offset, get_def_keys([v[0] for v in defs])))
+            nodes.extend([
+                Node(Snippet(
+                    qualname, content, line_start=line_start, lang='python',
+                    path=rel_path,
+                ))
+                for qualname, _, _, line_start, content in defs
+            ])
+            if manifest is not None:
+                node_keys.extend([(rel_path, v) for v in results[-1][2]])
+            if len(nodes) >= batch_size:
+                n_nodes += len(nodes)
+                yield nodes, []
+                nodes = []
+
+        self._warn_failed(failed)
+
+        edges = []
+        for result, offset, keys in results:
+            links = entries[result['path']]['links'] if manifest is not None else None
+            for idx_def, idx_leaf, ref_start, ref_stop in _iter_links(resolver, result):
+                edges.append((offset + idx_def, idx_leaf, ref_start, ref_stop))
+                if links is not None:
+                    links.append([keys[idx_def], *node_keys[idx_leaf]])
+                if len(nodes) + len(edges) >= batch_size:
+                    yield nodes, edges
+                    nodes, edges = [], []
+
+        if nodes or edges:
+            yield nodes, edges
+        if manifest is not None:
+            manifest.update(root=root, files=entries)
+
+    def update(self, node_collection, fn=None):
+        """Update a collection built by `parse()` after source files are
+        changed. Only files whose size or modification time is changed (and
+        then whose content is changed) are parsed again.
+
+        Nodes are identified by path of file and qualified name (and order of
+        definitions with the same name, see also `get_def_keys()`), so that
+        comments of nodes and references added manually are preserved. Nodes
+        of removed definitions are removed, and references found by last import
+        are replaced with those found in changed files.
+
+        Note that calls in unchanged files are not resolved again, e.g. a call
+        to a function which is newly defined in a changed file.
+
+        Parameters
+        ----------
+        node_collection : NodeCollection
+            A collection built by `parse()`, it's updated in place.
+        fn : str, optional
+            Path of source file or directory. Default is the path used to build
+            the collection.
+
+        Returns
+        -------
+        changes : dict
+            Lists of nodes which are 'added', 'updated' and 'removed'.
+        """
+        manifest = node_collection.metadata.get(MANIFEST_KEY)
+        if manifest is None:
+            raise ValueError('given collection is not imported from Python source files.')
+        root, files = self._list_files(manifest['root'] if fn is None else fn)
+        old_entries = manifest['files']
+
+        entries, changed, stats = {}, [], {}
+        for path, rel_path in files:
+            entry, stat = old_entries.get(rel_path), _get_file_stat(path)
+            if entry is not None and stat == (entry['mtime'], entry['size']):
+                entries[rel_path] = entry
+                continue
+            if entry is not None and entry['hash'] is not None and _hash_file(path) == entry['hash']:
+                # File is touched but its content is not modified
+                entries[rel_path] = dict(entry, mtime=stat[0], size=stat[1])
+                continue
+            changed.append((path, rel_path))
+            stats[rel_path] = stat
+
+        results, failed = [], []
+        for (path, rel_path), result in zip(changed, self._iter_results(changed)):
+            if result is None:
+                failed.append(path)
+                # Nodes of this file are kept until it can be parsed again
+                if rel_path in old_entries:
+                    entries[rel_path] = old_entries[rel_path]
+                continue
+            results.append(result)
+            entries[rel_path] = _make_manifest_entry(stats[rel_path], result)
+        self._warn_failed(failed)
+
+        # Nodes imported from source files, indexed by `(path, key)`. Nodes of
+        # a file are kept in order of definitions (new ones are appended), so
+        # keys of duplicate names are assigned in order of collection.
+        names_by_path, nodes_by_path = {}, {}
+        for node in node_collection.nodes:
+            path = node.snippet.path
+            if path in old_entries:
+                names_by_path.setdefault(path, []).append(node.snippet.name)
+                nodes_by_path.setdefault(path, []).append(node)
+        node_map = {
+            (path, key): node
+            for path, nodes in nodes_by_path.items()
+            for key, node in zip(get_def_keys(names_by_path[path]), nodes)
+        }
+
+        keys_by_path = {v['path']: get_def_keys([d[0] for d in v['defs']]) for v in results}
+        new_keys = {(path, key) for path, keys in keys_by_path.items() for key in keys}
+        removed_keys = [
+            key for key in node_map
+            if (key[0] not in entries or key[0] in keys_by_path) and key not in new_keys
+        ]
+        removed = [node_map.pop(key) for key in removed_keys]
+        node_collection.remove_nodes(removed)
+
+        added, updated = [], []
+        for result in results:
+            keys = keys_by_path[result['path']]
+            for def_key, (qualname, _, _, line_start, content) in zip(keys, result['defs']):
+                key = (result['path'], def_key)
+                node = node_map.get(key)
+                if node is None:
+                    node = Node(Snippet(
+                        qualname, content, line_start=line_start, lang='python',
+                        path=result['path'],
+                    ))
+                    node_map[key] = node
+                    added.append(node)
+                elif node.snippet.content != content or node.snippet.line_start != line_start:
+                    node.snippet = Snippet(
+                        qualname, content, line_start=line_start, lang='python',
+                        path=result['path'], url=node.snippet.url,
+                    )
+                    updated.append(node)
+        node_collection.nodes.extend(added)
+
+        # Definitions of unchanged files are restored from existing nodes, and
+        # those of parsed files are taken from results. Like `_parse_iter()`,
+        # the last one of duplicate names is resolved.
+        resolver, module_defs = _CallResolver(), {}
+        for result in results:
+            path = result['path']
+            module_defs[path] = {
+                d[0]: (path, key) for d, key in zip(result['defs'], keys_by_path[path])
+            }
+        for path, names in names_by_path.items():
+            if path not in module_defs:
+                module_defs[path] = {
+                    name: (path, key) for name, key in zip(names, get_def_keys(names))
+                }
+        for rel_path, entry in entries.items():
+            module = get_module_name(rel_path)[0]
+            resolver.add_module(module, module_defs.get(rel_path, {}), entry['imports'])
+
+        for result in results:
+            path, keys = result['path'], keys_by_path[result['path']]
+            links = {}
+            for idx_def, target, ref_start, ref_stop in _iter_links(resolver, result):
+                links[(keys[idx_def], target)] = (ref_start, ref_stop)
+
+            # References which are found by last import but not found now are
+            # removed. Other references are added manually, so they are kept.
+            old_entry = old_entries.get(path)
+            old_links = {(v[0], (v[1], v[2])) for v in old_entry['links']} if old_entry else set()
+            for root_key, target in old_links.difference(links):
+                root_node, leaf = node_map.get((path, root_key)), node_map.get(target)
+                if root_node is not None and leaf is not None and root_node.nid in leaf.ref_infos:
+                    root_node.remove_leaf(leaf)
+
+            for (root_key, target), (ref_start, ref_stop) in links.items():
+                root_node, leaf = node_map[(path, root_key)], node_map[target]
+                if root_node.nid in leaf.ref_infos:
+                    leaf.ref_infos[root_node.nid] = ReferenceInfo(ref_start, ref_stop=ref_stop)
+                else:
+                    root_node.add_leaf(leaf, ref_start, ref_stop=ref_stop)
+            entries[path]['links'] = [[root_key, *target] for root_key, target in links]
+
+        # Lines of references added manually might be out of range of updated
+        # snippets, so they are clamped.
+        for node in updated:
+            n_lines = node.snippet.n_lines
+            for leaf in node.leaves:
+                ref_info = leaf.ref_infos[node.nid]
+                if ref_info.start > n_lines or (ref_info.stop or 0) > n_lines:
+                    ref_stop = ref_info.stop and min(ref_info.stop, n_lines)
+                    leaf.ref_infos[node.nid] = ReferenceInfo(
+                        min(ref_info.start, n_lines), ref_stop=ref_stop
+                    )
+
+        node_collection.metadata[MANIFEST_KEY] = {'root': root, 'files': entries}
+        return {'added': added, 'updated': updated, 'removed': removed}
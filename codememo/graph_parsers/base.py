@@ -1,9 +1,143 @@
+import os
+
 __all__ = ['BaseParser']
 
 
 class BaseParser(object):
+    """Base class of graph parsers.
+
+    A parser should implement either `parse_iter()` (preferred, which allows
+    callers to consume the result while parsing) or `parse()`.
+
+    Attributes
+    ----------
+    VALID_EXTENSIONS : list of str
+        File extensions supported by this parser.
+    SUPPORTS_STREAMING : bool
+        Whether this parser is able to emit nodes and edges while parsing,
+        i.e. `parse_iter()` is implemented.
+    SUPPORTS_UPDATE : bool
+        Whether this parser is able to update a collection built by itself
+        incrementally, i.e. `update()` is implemented.
+    ACCEPTS_DIRECTORY : bool
+        Whether this parser is able to parse all files under a directory.
+    TRUSTED : bool
+        Whether edges yielded by `parse_iter()` are guaranteed to be valid, so
+        that they can be linked without validation.
+    DEFAULT_BATCH_SIZE : int
+        Default number of nodes and edges in a batch.
+    READ_CHUNK_SIZE : int
+        Size of chunks to read a whole file while progress is reported.
+    progress : codememo.tasks.TaskProgress or None
+        If it's set, bytes read and nodes created are reported to it while
+        parsing, and parsing is stopped by `TaskCancelledException` once it's
+        cancelled. Parsers should read files through `open_file()` or
+        `read_file()`, and build collections through `track_batches()`.
+    """
+    VALID_EXTENSIONS = []
+    SUPPORTS_STREAMING = False
+    SUPPORTS_UPDATE = False
+    ACCEPTS_DIRECTORY = False
+    TRUSTED = False
+    DEFAULT_BATCH_SIZE = 4096
+    READ_CHUNK_SIZE = 2**20
+    progress = None
+
     def __init__(self):
         pass
 
+    def open_file(self, fn, mode='r', **kwargs):
+        """Open a file for reading, see also `progress`."""
+        f = open(fn, mode, **kwargs)
+        if self.progress is None:
+            return f
+        from codememo.tasks import ProgressReader
+
+        self.progress.bytes_total += os.fstat(f.fileno()).st_size
+        return ProgressReader(f, self.progress)
+
+    def read_file(self, fn):
+        """Returns content of a file in bytes, see also `progress`."""
+        with self.open_file(fn, 'rb') as f:
+            if self.progress is None:
+                return f.read()
+            chunks = []
+            while True:
+                chunk = f.read(self.READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            return b''.join(chunks)
+
+    def track_batches(self, batches):
+        """Yields batches of `(nodes, edges)` and reports their sizes, see also
+        `progress`."""
+        progress = self.progress
+        if progress is None:
+            yield from batches
+            return
+        for nodes, edges in batches:
+            progress.check()
+            progress.n_nodes += len(nodes)
+            progress.n_edges += len(edges)
+            yield nodes, edges
+
     def parse(self, fn):
+        """Parse a file to a `NodeCollection` object. By default, it's built
+        from batches yielded by `parse_iter()`.
+
+        Parameters
+        ----------
+        fn : str
+            Path of file.
+        """
+        if type(self).parse_iter is BaseParser.parse_iter:
+            raise NotImplementedError
+        from codememo.objects import NodeCollection
+
+        return NodeCollection.from_batches(
+            self.track_batches(self.parse_iter(fn)), trusted=self.TRUSTED
+        )
+
+    def parse_iter(self, fn, batch_size=None):
+        """Parse a file and yields batches of `(nodes, edges)`.
+
+        `nodes` is a list of new `Node`s, and `edges` is a list of
+        `(root_index, leaf_index, ref_start, ref_stop)`, where indices are
+        positions of nodes in the order they are yielded. Hence an edge can
+        only refer to nodes yielded in the same or previous batches. See also
+        `NodeCollection.add_batch()`.
+
+        For parsers implementing `parse()` only, all nodes are yielded in a
+        single batch with their references linked already.
+
+        Parameters
+        ----------
+        fn : str
+            Path of file (or directory if `ACCEPTS_DIRECTORY` is True).
+        batch_size : int, optional
+            Number of nodes and edges to be collected before a batch is
+            yielded. Default is `DEFAULT_BATCH_SIZE`.
+        """
+        if type(self).parse is BaseParser.parse:
+            raise NotImplementedError
+        yield self.parse(fn).nodes, []
+
+    def update(self, node_collection, fn=None):
+        """Update a collection built by this parser in place after the source
+        file is changed. Information required to find changes should be stored
+        in `NodeCollection.metadata` by `parse()`.
+
+        Parameters
+        ----------
+        node_collection : NodeCollection
+            A collection built by this parser.
+        fn : str, optional
+            Path of file. Default is the one used to build the collection.
+
+        Returns
+        -------
+        changes : dict
+            Lists of nodes which are 'added', 'updated' and 'removed'.
+        """
         raise NotImplementedError
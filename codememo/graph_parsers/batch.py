@@ -0,0 +1,234 @@
+"""Import many graph files (e.g. a call graph per test case) into a single
+collection.
+
+Files are parsed concurrently in a process pool, and each worker sends back
+only compact records of nodes and edges. Nodes are deduplicated across files
+with a hash join on their identity, i.e. `(name, path, line_start)` of their
+snippets, and edges are deduplicated as well.
+
+Provenance is kept in metadata:
+
+- `NodeCollection.metadata[METADATA_KEY]`: 'sources' (paths of imported files)
+  and 'errors' (map of path to error message of files failed to be parsed).
+- `Node.metadata[SOURCES_KEY]`: indices of sources containing the node.
+"""
+from contextlib import closing
+from glob import glob
+import os
+
+from codememo.objects import Snippet, Node, NodeCollection, _gc_paused
+
+
+__all__ = ['BatchImporter', 'expand_sources']
+
+# Key of provenance in `NodeCollection.metadata`
+METADATA_KEY = 'batch_import'
+
+# Key of provenance in `Node.metadata`
+SOURCES_KEY = 'sources'
+
+
+def expand_sources(source, extensions=None):
+    """Returns sorted paths of files to be imported.
+
+    Parameters
+    ----------
+    source : str
+        A directory, whose files are searched recursively, or a glob pattern
+        (`**` matches any directories).
+    extensions : list of str, optional
+        File extensions to be included. All files are included by default.
+    """
+    if os.path.isdir(source):
+        files = [
+            os.path.join(dirpath, name)
+            for dirpath, _, filenames in os.walk(source) for name in filenames
+        ]
+    else:
+        files = [v for v in glob(source, recursive=True) if os.path.isfile(v)]
+    if extensions is not None:
+        files = [v for v in files if os.path.splitext(v)[1] in extensions]
+    return sorted(files)
+
+
+def _get_identity(snippet_data):
+    return (
+        snippet_data['name'], snippet_data.get('path', ''),
+        snippet_data.get('line_start', Snippet.DEFAULTS['line_start']),
+    )
+
+
+def _parse_file(args):
+    """Parse a file and returns compact records, this is run in worker
+    processes.
+
+    Returns
+    -------
+    result : tuple
+        `(snippets, metadata, edges, error)`, where `snippets` are dicts of
+        `Snippet.to_dict(omit_defaults=True)`, `metadata` are those of nodes
+        (or None), and `edges` are `(root_index, leaf_index, ref_start,
+        ref_stop)`. If the file failed to be parsed, `error` is the message
+        and others are empty.
+    """
+    from . import get_graph_parser, parser_registry
+
+    fn, parser_type, options = args
+    try:
+        parser = get_graph_parser(parser_type or parser_registry.get_parser_type(fn), **options)
+        node_collection = parser.parse(fn)
+    except Exception as ex:
+        return [], [], [], f'{type(ex).__name__}: {ex}'
+
+    nodes = node_collection.nodes
+    index_map = {v.nid: i for i, v in enumerate(nodes)}
+    edges = []
+    for idx_root, node in enumerate(nodes):
+        for leaf in node.leaves:
+            line_info = leaf.ref_infos[node.nid].line_info
+            edges.append((idx_root, index_map[leaf.nid], line_info.start, line_info.stop))
+    snippets = [v.snippet.to_dict(omit_defaults=True) for v in nodes]
+    metadata = [v._metadata or None for v in nodes]
+    return snippets, metadata, edges, None
+
+
+class BatchImporter(object):
+    """Import graph files into a single collection.
+
+    Attributes
+    ----------
+    progress : codememo.tasks.TaskProgress or None
+        If it's set, numbers of imported files and merged nodes/edges are
+        reported, and cancellation is checked between files.
+    """
+    # Starting a process pool is not worth it for a few files
+    MIN_FILES_FOR_PROCESS_POOL = 4
+
+    progress = None
+
+    def __init__(self, parser_type=None, parser_options=None, max_workers=None):
+        """
+        Parameters
+        ----------
+        parser_type : str, optional
+            Extension of files (e.g. '.dot') to select the parser. By default,
+            it's selected by extension of each file.
+        parser_options : dict, optional
+            Keyword arguments to instantiate parsers, which are passed to
+            worker processes and hence they should be picklable.
+        max_workers : int, optional
+            Number of processes to parse files. If it's None, number of CPUs
+            is used.
+        """
+        self.parser_type = parser_type
+        self.parser_options = dict(parser_options or {})
+        self.max_workers = max_workers
+
+    def _iter_results(self, files):
+        """Yields parsing results of given files in order."""
+        args = [(fn, self.parser_type, self.parser_options) for fn in files]
+        max_workers = self.max_workers or os.cpu_count() or 1
+        if max_workers <= 1 or len(files) < self.MIN_FILES_FOR_PROCESS_POOL:
+            yield from map(_parse_file, args)
+            return
+
+        from codememo.tasks import new_process_pool
+
+        chunk_size = max(1, min(16, len(files) // (max_workers * 4)))
+        with new_process_pool(max_workers) as executor:
+            yield from executor.map(_parse_file, args, chunksize=chunk_size)
+
+    def import_from(self, source):
+        """Import files in a directory or matching a glob pattern, see also
+        `expand_sources()` and `import_files()`."""
+        if self.progress is not None:
+            self.progress.start_stage('Searching files')
+        extensions = None if self.parser_type is None else [self.parser_type]
+        files = expand_sources(source, extensions)
+        if not files:
+            raise ValueError(f'No file to import is found: {source}')
+        return self.import_files(files)
+
+    def import_files(self, files):
+        """Parse files and merge them into a `NodeCollection`. Files failed to
+        be parsed are skipped, and they are listed in metadata.
+
+        Parameters
+        ----------
+        files : list of str
+            Paths of files.
+        """
+        progress = self.progress
+        if progress is not None:
+            progress.start_stage('Importing files', total=len(files))
+
+        # identity -> index of node in merged collection
+        index_map = {}
+        nodes, n_lines = [], []
+        edge_map = {}
+        errors = {}
+
+        # Results are closed on cancellation, then pending files are not
+        # parsed by the process pool.
+        with _gc_paused(), closing(self._iter_results(files)) as results:
+            for idx_source, (fn, result) in enumerate(zip(files, results)):
+                if progress is not None:
+                    progress.bytes_read = idx_source
+                    progress.n_nodes, progress.n_edges = len(nodes), len(edge_map)
+                    progress.check()
+
+                snippets, metadata, edges, error = result
+                if error is not None:
+                    errors[fn] = error
+                    continue
+
+                local_to_global = []
+                for snippet_data, node_metadata in zip(snippets, metadata):
+                    key = _get_identity(snippet_data)
+                    idx = index_map.get(key)
+                    if idx is None:
+                        idx = index_map[key] = len(nodes)
+                        node_metadata = dict(node_metadata or {})
+                        node_metadata[SOURCES_KEY] = [idx_source]
+                        snippet = Snippet.from_dict(snippet_data)
+                        nodes.append(Node(snippet, metadata=node_metadata))
+                        n_lines.append(snippet.n_lines)
+                    else:
+                        # The first one wins, but content is taken if it's
+                        # missing in the first one.
+                        node = nodes[idx]
+                        sources = node.metadata[SOURCES_KEY]
+                        if sources[-1] != idx_source:
+                            sources.append(idx_source)
+                        if not node.snippet.content and snippet_data.get('content'):
+                            node.snippet = Snippet.from_dict(snippet_data)
+                            n_lines[idx] = node.snippet.n_lines
+                    local_to_global.append(idx)
+
+                for idx_root, idx_leaf, ref_start, ref_stop in edges:
+                    key = (local_to_global[idx_root], local_to_global[idx_leaf])
+                    if key not in edge_map:
+                        edge_map[key] = (ref_start, ref_stop)
+
+            if progress is not None:
+                progress.bytes_read = len(files)
+                progress.n_nodes, progress.n_edges = len(nodes), len(edge_map)
+                progress.start_stage('Building')
+
+            # References are checked against the snippets which are kept, since
+            # they might come from different files.
+            edges = []
+            for (idx_root, idx_leaf), (ref_start, ref_stop) in edge_map.items():
+                limit = n_lines[idx_root]
+                if ref_start > limit or (ref_stop is not None and ref_stop > limit):
+                    ref_start, ref_stop = 1, None
+                edges.append((idx_root, idx_leaf, ref_start, ref_stop))
+
+            node_collection = NodeCollection(nodes)
+            node_collection.add_edges(edges, trusted=True)
+
+        node_collection.metadata[METADATA_KEY] = {
+            'sources': [os.path.abspath(v) for v in files],
+            'errors': errors,
+        }
+        return node_collection
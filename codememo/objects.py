@@ -1,9 +1,42 @@
+from contextlib import contextmanager
+from itertools import count
 from uuid import UUID, uuid4
-from .exceptions import FileLoadingException, NodeRemovalException, NodeReferenceException
+import gc
+from .exceptions import (
+    DecompressionException, FileLoadingException, NodeRemovalException,
+    NodeReferenceException, NodeValidationException,
+)
 
 
 __all__ = ['LineInfo', 'Snippet', 'ReferenceInfo', 'Node', 'NodeCollection']
 
+# Version of project file format written by `NodeCollection.to_dict()`. Files
+# without a `format_version` field are treated as version 1.
+FORMAT_VERSION = 2
+
+# Generator of `Node.nid`. Integer IDs are cheaper than UUIDs to be hashed, so
+# they are used as keys internally, and UUIDs are used for persistence only.
+# Note that IDs are unique in a process rather than dense in a collection, so
+# they cannot be used to index lists. Nodes are linked (and keyed in
+# `ref_infos`) before they are added to a collection, and they would have to be
+# rekeyed whenever a collection changes. Positions in `NodeCollection.nodes` are
+# used where dense indices are required, e.g. `NodeCollection.add_edges()`.
+_nid_counter = count()
+
+
+@contextmanager
+def _gc_paused():
+    """Pause cyclic garbage collector while building lots of objects. Those
+    objects are all alive, so collections triggered by allocations are just
+    wasted time (and it grows with the number of tracked objects)."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
 
 class LineInfo(object):
     """Information of the start and stop line number of a code snippet."""
@@ -45,6 +78,7 @@ class RelativeLineInfo(LineInfo):
 class Snippet(object):
     """Container of a code snippet."""
     __slots__ = ('name', 'content', 'line_start', 'lang', 'path', 'url')
+    DEFAULTS = {'line_start': 1, 'lang': 'raw', 'path': '', 'url': ''}
 
     def __init__(self, name, content, line_start=None, lang=None, path=None, url=None):
         """
@@ -86,8 +120,20 @@ class Snippet(object):
             lang=data.get('lang'), path=data.get('path'), url=data.get('url'),
         )
 
-    def to_dict(self):
-        return {k: getattr(self, k) for k in self.__slots__}
+    def to_dict(self, omit_defaults=False):
+        """
+        Parameters
+        ----------
+        omit_defaults : bool, optional
+            Skip fields which are equal to their default values. `from_dict()`
+            is able to restore them.
+        """
+        data = {k: getattr(self, k) for k in self.__slots__}
+        if omit_defaults:
+            for k, v in self.DEFAULTS.items():
+                if data[k] == v:
+                    del data[k]
+        return data
 
 
 class ReferenceInfo(object):
@@ -123,7 +169,11 @@ class ReferenceInfo(object):
 
 
 class Node(object):
-    def __init__(self, snippet, comment=None, uuid=None):
+    __slots__ = (
+        'nid', '_uuid', 'snippet', 'comment', 'roots', 'leaves', 'ref_infos', '_metadata',
+    )
+
+    def __init__(self, snippet, comment=None, uuid=None, metadata=None):
         """
         Parameters
         ----------
@@ -134,19 +184,21 @@ class Node(object):
         uuid : UUID, optional
             UUID of this node. It will be generated automatically if it's
             not given.
+        metadata : dict, optional
+            JSON-serializable data of this node, e.g. statistics written by
+            a profiler importer.
         """
         if not isinstance(snippet, Snippet):
             raise TypeError(f'should be an instance of {Snippet}')
 
+        # `ref_infos` is a map from `nid` of root nodes to `ReferenceInfo`
         self.ref_infos = {}
         self.snippet = snippet
         self.comment = '' if comment is None else comment
+        self.nid = next(_nid_counter)
         self.uuid = uuid4() if uuid is None else uuid
-        if not isinstance(self.uuid, UUID) and isinstance(self.uuid, str):
-            if isinstance(self.uuid, str):
-                self.uuid = UUID(self.uuid)
-            else:
-                raise TypeError(f'uuid should be an instance of {UUID}')
+        # Metadata is created on first access, since most nodes don't have it
+        self._metadata = metadata or None
 
         self.roots = []
         self.leaves = []
@@ -154,22 +206,115 @@ class Node(object):
     def __repr__(self):
         return f'<Node "{self.snippet.name}">'
 
+    @property
+    def uuid(self):
+        # UUID might be stored as a string by trusted loading path, and it will
+        # be parsed only when it's required.
+        if not isinstance(self._uuid, UUID):
+            self._uuid = UUID(self._uuid)
+        return self._uuid
+
+    @uuid.setter
+    def uuid(self, value):
+        if isinstance(value, str):
+            value = UUID(value)
+        elif not isinstance(value, UUID):
+            raise TypeError(f'uuid should be an instance of {UUID}')
+        self._uuid = value
+
+    @property
+    def metadata(self):
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value):
+        if not isinstance(value, dict):
+            raise TypeError(f'metadata should be an instance of {dict}')
+        self._metadata = value
+
     @classmethod
     def from_dict(cls, data):
         return cls(
             Snippet.from_dict(data['snippet']),
-            comment=data.get('comment'), uuid=data.get('uuid')
+            comment=data.get('comment'), uuid=data.get('uuid'),
+            metadata=data.get('metadata'),
         )
 
     def to_dict(self):
-        return {
-            'uuid': str(self.uuid),
+        data = {
+            'uuid': str(self._uuid),
             'snippet': self.snippet.to_dict(),
             'comment': self.comment,
-            'roots': [str(v.uuid) for v in self.roots],
-            'leaves': [str(v.uuid) for v in self.leaves],
-            'ref_infos': {str(k): v.to_dict() for k, v in self.ref_infos.items()},
+            'roots': [str(v._uuid) for v in self.roots],
+            'leaves': [str(v._uuid) for v in self.leaves],
+            'ref_infos': {str(v._uuid): self.ref_infos[v.nid].to_dict() for v in self.roots},
         }
+        if self._metadata:
+            data['metadata'] = self._metadata
+        return data
+
+    @classmethod
+    def from_record(cls, record, trusted=False):
+        """Create a node from a record written by `to_record()`. Note that
+        leaves are not restored here since they are resolved by collection.
+
+        Parameters
+        ----------
+        record : dict
+        trusted : bool, optional
+            Skip type checking in `__init__()`. This should be used only for
+            data written by this application, see also `NodeCollection.validate()`.
+        """
+        if not trusted:
+            return cls(
+                Snippet.from_dict(record['snippet']),
+                comment=record.get('comment'), uuid=record['uuid'],
+                metadata=record.get('metadata'),
+            )
+        node = cls.__new__(cls)
+        node.ref_infos = {}
+        node.snippet = Snippet.from_dict(record['snippet'])
+        node.comment = record.get('comment', '')
+        node.nid = next(_nid_counter)
+        node._uuid = record['uuid']
+        node._metadata = record.get('metadata')
+        node.roots = []
+        node.leaves = []
+        return node
+
+    def to_record(self, index_map=None):
+        """Returns a compact record of this node used by project format v2.
+
+        Roots are not stored since they can be derived from leaves, and
+        fields with default values are omitted. Each leaf is written as
+        `[index, ref_start]` or `[index, ref_start, ref_stop]`.
+
+        Parameters
+        ----------
+        index_map : dict, optional
+            A map from `Node` to its index in the collection. If it's not
+            given, leaves won't be included in the record.
+        """
+        record = {
+            'uuid': str(self._uuid),
+            'snippet': self.snippet.to_dict(omit_defaults=True),
+        }
+        if self.comment != '':
+            record['comment'] = self.comment
+        if self._metadata:
+            record['metadata'] = self._metadata
+        if index_map is not None and len(self.leaves) != 0:
+            leaves = []
+            for leaf in self.leaves:
+                ref_info = leaf.ref_infos[self.nid]
+                entry = [index_map[leaf], ref_info.start]
+                if ref_info.stop is not None:
+                    entry.append(ref_info.stop)
+                leaves.append(entry)
+            record['leaves'] = leaves
+        return record
 
     def set_root(self, node, ref_start, ref_stop=None):
         if node and not isinstance(node, Node):
@@ -178,7 +323,7 @@ class Node(object):
             msg = 'Duplicate reference: given node is already an root of this node'
             raise NodeReferenceException(msg)
         self.roots.append(node)
-        self.ref_infos[node.uuid] = ReferenceInfo(ref_start, ref_stop=ref_stop)
+        self.ref_infos[node.nid] = ReferenceInfo(ref_start, ref_stop=ref_stop)
 
     def reset_root(self, node):
         """Reset root of this node.
@@ -188,7 +333,7 @@ class Node(object):
         """
         idx = self.roots.index(node)
         popped = self.roots.pop(idx)
-        self.ref_infos.pop(popped.uuid)
+        self.ref_infos.pop(popped.nid)
 
     def add_leaf(self, node, ref_start=1, ref_stop=None):
         """Add a leaf node referencing to the snippet in this node.
@@ -332,8 +477,18 @@ class NodeIndexLink(object):
 
 
 class NodeCollection(object):
-    def __init__(self, nodes):
+    def __init__(self, nodes, metadata=None):
+        """
+        Parameters
+        ----------
+        nodes : list of Node
+        metadata : dict, optional
+            JSON-serializable data of this collection, e.g. the manifest of
+            source files written by a graph parser. It's saved only when it's
+            not empty.
+        """
         self.nodes = nodes
+        self.metadata = {} if metadata is None else metadata
 
     def __len__(self):
         return len(self.nodes)
@@ -348,6 +503,140 @@ class NodeCollection(object):
             target_index = -1
         return target_index
 
+    def add_edges(self, edges, trusted=False):
+        """Add references between nodes in bulk.
+
+        Parameters
+        ----------
+        edges : iterable
+            Tuples of `(root_index, leaf_index, ref_start, ref_stop)`, where
+            indices are positions of nodes in this collection.
+        trusted : bool, optional
+            Link nodes directly without checking types, duplicate references
+            and range of reference lines (see also `Node.add_leaf()`). Range
+            of indices is still checked.
+
+        Raises
+        ------
+        IndexError
+            If an index is out of range. Negative indices are not allowed.
+        """
+        nodes = self.nodes
+        n_nodes = len(nodes)
+        new_ref_info = ReferenceInfo.__new__
+        for idx_root, idx_leaf, ref_start, ref_stop in edges:
+            # Negative indices would refer to other nodes silently
+            if not (0 <= idx_root < n_nodes and 0 <= idx_leaf < n_nodes):
+                raise IndexError(
+                    f'edge from {idx_root} to {idx_leaf} refers to a node out of range '
+                    f'[0, {n_nodes})'
+                )
+            if not trusted:
+                nodes[idx_root].add_leaf(nodes[idx_leaf], ref_start, ref_stop=ref_stop)
+                continue
+
+            root, leaf = nodes[idx_root], nodes[idx_leaf]
+            ref_info = new_ref_info(ReferenceInfo)
+            ref_info.line_info = RelativeLineInfo(ref_start, ref_stop)
+            leaf.roots.append(root)
+            leaf.ref_infos[root.nid] = ref_info
+            root.leaves.append(leaf)
+
+    def add_batch(self, nodes, edges=(), trusted=False):
+        """Append nodes and add references between nodes in bulk. It's used to
+        build a collection incrementally, see also `from_batches()`.
+
+        Parameters
+        ----------
+        nodes : list of Node
+            Nodes to be appended.
+        edges : iterable, optional
+            See also `add_edges()`. Indices are positions in this collection
+            after `nodes` are appended, so that edges can refer to nodes added
+            by previous batches.
+        trusted : bool, optional
+            See also `add_edges()`.
+        """
+        self.nodes.extend(nodes)
+        self.add_edges(edges, trusted=trusted)
+
+    @classmethod
+    def from_batches(cls, batches, trusted=False):
+        """Build a collection from batches of `(nodes, edges)`, e.g. those
+        yielded by `BaseParser.parse_iter()`. Each batch is linked as soon as
+        it's received, so only one batch is buffered at a time.
+
+        Parameters
+        ----------
+        batches : iterable
+            Batches of `(nodes, edges)`, see also `add_batch()`.
+        trusted : bool, optional
+            See also `add_edges()`.
+        """
+        obj = cls([])
+        with _gc_paused():
+            for nodes, edges in batches:
+                obj.add_batch(nodes, edges, trusted=trusted)
+        return obj
+
+    def validate(self):
+        """Check consistency of nodes and references in this collection. It's
+        useful for collections loaded with `trusted=True`, and it can be run in
+        a background thread since it does not modify anything.
+
+        Raises
+        ------
+        NodeValidationException
+            If there are invalid nodes or references.
+        """
+        problems = []
+        nodes = list(self.nodes)
+        node_set = set(nodes)
+        uuids, nids = set(), set()
+
+        for node in nodes:
+            if not isinstance(node, Node):
+                problems.append(f'{node} is not an instance of {Node}')
+                continue
+            if not isinstance(node.snippet, Snippet):
+                problems.append(f'snippet of {node} is not an instance of {Snippet}')
+                continue
+            try:
+                uuid = node.uuid
+            except (TypeError, ValueError):
+                problems.append(f'uuid of {node} is not a valid UUID')
+                continue
+            if uuid in uuids:
+                problems.append(f'duplicate uuid: {uuid}')
+            if node.nid in nids:
+                problems.append(f'duplicate nid: {node.nid}')
+            uuids.add(uuid)
+            nids.add(node.nid)
+
+            n_lines = node.snippet.n_lines
+            for leaf in node.leaves:
+                if leaf not in node_set:
+                    problems.append(f'leaf {leaf} of {node} does not exist in this collection')
+                    continue
+                if node not in leaf.roots or node.nid not in leaf.ref_infos:
+                    problems.append(f'{node} is not a root of its leaf {leaf}')
+                    continue
+                ref_info = leaf.ref_infos[node.nid]
+                if not (1 <= ref_info.start <= n_lines):
+                    problems.append(f'reference from {node} to {leaf} is out of range')
+                elif ref_info.stop and ref_info.stop > n_lines:
+                    problems.append(f'reference from {node} to {leaf} is out of range')
+
+            if len(set(node.roots)) != len(node.roots):
+                problems.append(f'duplicate roots of {node}')
+            for root in node.roots:
+                if node not in root.leaves:
+                    problems.append(f'{node} is not a leaf of its root {root}')
+
+        if len(problems) != 0:
+            msg = f'Found {len(problems)} problem(s) in collection: ' + '; '.join(problems[:5])
+            raise NodeValidationException(msg)
+
     def add_leaf_reference(self, root, target, ref_start=None, ref_stop=None):
         """Add a leaf node (`target`) to the root node.
 
@@ -388,6 +677,25 @@ class NodeCollection(object):
         for root in target.roots:
             root.remove_leaf(target)
 
+    def remove_nodes(self, targets):
+        """Remove nodes and all references to/from them from this collection
+        in bulk. Unlike `remove_node()`, nodes having leaves can be removed, and
+        leaves which are not in `targets` are kept in this collection.
+
+        Parameters
+        ----------
+        targets : iterable of Node
+            Nodes to be removed.
+        """
+        targets = set(targets)
+        if len(targets) == 0:
+            return
+        for node in targets:
+            for root in list(node.roots):
+                root.remove_leaf(node)
+            node.remove_all_leaves()
+        self.nodes[:] = [v for v in self.nodes if v not in targets]
+
     def remove_node_and_its_leaves(self, target):
         """Remove node and all its leaves from this collection.
 
@@ -454,9 +762,10 @@ class NodeCollection(object):
     def resolve_index_links(self):
         """Returns list of `NodeIndexLink` objects."""
         links = []
+        index_map = {v.nid: i for i, v in enumerate(self.nodes)}
         for idx_root, node in enumerate(self.nodes):
             for leaf_slot, leaf in enumerate(node.leaves):
-                idx_leaf = self.nodes.index(leaf)
+                idx_leaf = index_map[leaf.nid]
                 root_slot = leaf.roots.index(node)
                 links.append(NodeIndexLink(idx_root, root_slot, idx_leaf, leaf_slot))
         return links
@@ -466,10 +775,11 @@ class NodeCollection(object):
         generated by `resolve_trees()`."""
         links = []
         flattened_tree = [v for tree in trees for layer in tree for v in layer]
+        index_map = {v.nid: i for i, v in enumerate(flattened_tree)}
         for node in flattened_tree:
             for leaf_slot, leaf in enumerate(node.leaves):
-                idx_leaf = flattened_tree.index(leaf)
-                idx_root = flattened_tree.index(node)
+                idx_leaf = index_map[leaf.nid]
+                idx_root = index_map[node.nid]
                 root_slot = leaf.roots.index(node)
                 links.append(NodeIndexLink(idx_root, root_slot, idx_leaf, leaf_slot))
         return links
@@ -597,10 +907,32 @@ class NodeCollection(object):
         return layerized_trees, orphan_nodes
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, trusted=False):
+        """
+        Parameters
+        ----------
+        data : dict
+        trusted : bool, optional
+            Build nodes and references without validation. This is supported
+            by format v2 only, and it should be used for data written by this
+            application. Use `validate()` to check the result if necessary.
+        """
         if 'nodes' not in data:
             raise ValueError(f'Missing key "nodes" in given data.')
 
+        version = data.get('format_version', 1)
+        if version == 1:
+            with _gc_paused():
+                return cls._from_dict_v1(data)
+        elif version == FORMAT_VERSION:
+            with _gc_paused():
+                return cls._from_dict_v2(data, trusted=trusted)
+        else:
+            raise ValueError(f'Unsupported format version: {version}')
+
+    @classmethod
+    def _from_dict_v1(cls, data):
+        """Load data in format v1 (nodes referencing each other by UUID)."""
         data_dict = {v['uuid']: v for v in data['nodes']}
         nodes_dict = {v['uuid']: Node.from_dict(v) for v in data['nodes']}
 
@@ -615,29 +947,194 @@ class NodeCollection(object):
 
         return cls(list(nodes_dict.values()))
 
+    @classmethod
+    def _from_dict_v2(cls, data, trusted=False):
+        """Load data in format v2 (nodes referencing each other by index)."""
+        records = data['nodes']
+        obj = cls(
+            [Node.from_record(v, trusted=trusted) for v in records],
+            metadata=data.get('metadata'),
+        )
+        edges = (
+            (i, entry[0], entry[1], entry[2] if len(entry) > 2 else None)
+            for i, record in enumerate(records)
+            for entry in record.get('leaves', ())
+        )
+        obj.add_edges(edges, trusted=trusted)
+        return obj
+
     def to_dict(self):
-        return {
-            'nodes': [v.to_dict() for v in self.nodes],
-        }
+        index_map = {v: i for i, v in enumerate(self.nodes)}
+        data = {'format_version': FORMAT_VERSION}
+        if self.metadata:
+            data['metadata'] = self.metadata
+        data['nodes'] = [v.to_record(index_map) for v in self.nodes]
+        return data
+
+    def iter_json(self):
+        """Yields JSON text of this collection piece by piece. Records are
+        encoded one node at a time from the live objects, so that the whole
+        result of `to_dict()` is never materialized.
+
+        Concatenated output is identical to `json.dumps(self.to_dict())` with
+        the separators used by `save()`.
+        """
+        import json
+
+        encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        index_map = {v: i for i, v in enumerate(self.nodes)}
+
+        yield '{"format_version":%d,' % FORMAT_VERSION
+        if self.metadata:
+            yield '"metadata":%s,' % encode(self.metadata)
+        yield '"nodes":['
+        for i, node in enumerate(self.nodes):
+            text = encode(node.to_record(index_map))
+            yield text if i == 0 else ',' + text
+        yield ']}'
 
     @classmethod
-    def load(cls, fn):
+    def load(cls, fn, trusted=False, progress=None):
+        """Load a project file. Files written in older format versions are
+        migrated while loading, and compressed files (gzip, xz, bz2) are
+        decompressed transparently. See `from_dict()` for `trusted`.
+
+        If `progress` (a `codememo.tasks.TaskProgress`) is given, it's updated
+        in each stage of loading, and `TaskCancelledException` is raised once
+        it's cancelled. In this case, node records are decoded one at a time
+        rather than by a single call of `json.load()`, so that other threads
+        (e.g. the UI) are not blocked for long.
+
+        All records of an archive are decoded here. To decode only some of
+        them, use `codememo.archive.ProjectArchive` directly.
+        """
         import json
+        from .archive import ProjectArchive
+        from .compression import open_text
 
         try:
-            with open(fn, 'r') as f:
-                content = json.load(f)
-            obj = cls.from_dict(content)
+            if ProjectArchive.is_archive(fn):
+                with ProjectArchive(fn) as archive:
+                    obj = archive.to_node_collection(trusted=trusted, progress=progress)
+            elif progress is None:
+                with open_text(fn, 'r') as f, _gc_paused():
+                    content = json.load(f)
+                obj = cls.from_dict(content, trusted=trusted)
+            else:
+                content = cls._read_json_with_progress(fn, progress)
+                progress.start_stage('Building graph')
+                obj = cls.from_dict(content, trusted=trusted)
         except KeyError as ex_key:
             msg = f'Failed to load this file, there are missing keys: {ex_key}'
             raise FileLoadingException(msg) from ex_key
+        except IndexError as ex_index:
+            msg = f'Failed to load this file, there are invalid references: {ex_index}'
+            raise FileLoadingException(msg) from ex_index
         except json.JSONDecodeError as ex_json_decode:
             msg = f'Failed to load this file while decoding: {ex_json_decode}'
             raise FileLoadingException(msg) from ex_json_decode
+        except DecompressionException as ex_decompress:
+            msg = f'Failed to load this file while decompressing: {ex_decompress}'
+            raise FileLoadingException(msg) from ex_decompress
         return obj
 
-    def save(self, fn):
-        import json
+    @staticmethod
+    def _read_json_with_progress(fn, progress):
+        """Read and decode a project file in JSON, see also `load()`."""
+        import os
+        from .compression import detect_compression, read_text
+        from .tasks import ProgressReader
+
+        with open(fn, 'rb') as f:
+            progress.start_stage('Reading', os.fstat(f.fileno()).st_size)
+            text = read_text(ProgressReader(f, progress), detect_compression(fn))
+
+        progress.start_stage('Decoding', len(text))
+        with _gc_paused():
+            return _decode_project_json(text, progress)
 
-        with open(fn, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
+    def save(self, fn):
+        """Save this collection to a file. File will be compressed if `fn` ends
+        with `.gz`, `.xz` or `.bz2`, and it will be written as an archive (see
+        `codememo.archive`) if `fn` ends with `.cma`."""
+        from .archive import ProjectArchive
+        from .compression import open_text
+
+        if str(fn).endswith(ProjectArchive.SUFFIX):
+            ProjectArchive.write(self, fn)
+            return
+
+        with open_text(fn, 'w') as f:
+            for text in self.iter_json():
+                f.write(text)
+
+
+def _decode_project_json(text, progress, check_interval=1024):
+    """Decode JSON text of a project file like `json.loads()`, but elements of
+    "nodes" are decoded one at a time. Cancellation is checked and `progress`
+    is updated (decoded characters, nodes and their leaves) every
+    `check_interval` nodes.
+    """
+    import json
+    import re
+
+    decode = json.JSONDecoder().raw_decode
+    skip = re.compile(r'[ \t\n\r]*').match
+
+    def expect(char, idx):
+        idx = skip(text, idx).end()
+        if not text.startswith(char, idx):
+            raise json.JSONDecodeError(f'Expecting {char!r} delimiter', text, idx)
+        return idx + 1
+
+    def decode_nodes(idx):
+        nodes, n_edges = [], 0
+        idx = skip(text, idx).end()
+        if text.startswith(']', idx):
+            return nodes, idx + 1
+        while True:
+            record, idx = decode(text, skip(text, idx).end())
+            nodes.append(record)
+            if isinstance(record, dict):
+                n_edges += len(record.get('leaves', ()))
+            if len(nodes) % check_interval == 0:
+                progress.check()
+                progress.bytes_read = idx
+                progress.n_nodes, progress.n_edges = len(nodes), n_edges
+            idx = skip(text, idx).end()
+            if text.startswith(',', idx):
+                idx += 1
+                continue
+            idx = expect(']', idx)
+            progress.n_nodes, progress.n_edges = len(nodes), n_edges
+            return nodes, idx
+
+    data = {}
+    idx = skip(text, expect('{', 0)).end()
+    if text.startswith('}', idx):
+        idx += 1
+    else:
+        while True:
+            idx = skip(text, idx).end()
+            if not text.startswith('"', idx):
+                raise json.JSONDecodeError(
+                    'Expecting property name enclosed in double quotes', text, idx
+                )
+            key, idx = decode(text, idx)
+            idx = skip(text, expect(':', idx)).end()
+            if key == 'nodes' and text.startswith('[', idx):
+                data[key], idx = decode_nodes(idx + 1)
+            else:
+                data[key], idx = decode(text, idx)
+            idx = skip(text, idx).end()
+            if text.startswith(',', idx):
+                idx += 1
+                continue
+            idx = expect('}', idx)
+            break
+
+    idx = skip(text, idx).end()
+    if idx != len(text):
+        raise json.JSONDecodeError('Extra data', text, idx)
+    progress.bytes_read = len(text)
+    return data
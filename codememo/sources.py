@@ -0,0 +1,318 @@
+"""Resolve snippets of imported nodes back to their source code.
+
+Nodes built from call graphs (e.g. by `DotParser`) usually have nothing but a
+name, and those built from profiling results have a path and a line but no
+content. `SourceResolver` locates the definition of each node, i.e.
+
+- by path and line of the snippet if they are available;
+- by a qualified name like `pkg.mod.Class.method`, whose module is looked up
+  in given source roots (and `sys.path`) without importing it;
+- by a bare name (or `__main__.name`) in the script which was run as
+  `__main__`, if it's given.
+
+Nodes are grouped by source file, and files are processed on a thread pool.
+Each file is read and parsed only once through a shared `SourceFileCache`, and
+snippets are filled in bulk after all files are processed.
+
+Example:
+
+    resolver = SourceResolver(source_roots=['src'], main_path='script.py')
+    resolved = resolver.resolve(node_collection)
+"""
+from concurrent.futures import ThreadPoolExecutor
+import inspect
+import os
+import sys
+import threading
+import tokenize
+
+
+__all__ = ['SourceFileCache', 'SourceResolver', 'read_block']
+
+# Name of the node representing code at module level
+MODULE_LEVEL_NAME = '<module>'
+
+
+def read_block(lines, line_start):
+    """Returns source code of the block (e.g. a function) starting at given
+    line, or an empty string if it's not available.
+
+    Parameters
+    ----------
+    lines : list of str
+        Lines of a source file with line endings kept.
+    line_start : int
+        Line number (1-based) where the block starts.
+    """
+    if not 1 <= line_start <= len(lines):
+        return ''
+    try:
+        block = inspect.getblock(lines[line_start - 1:])
+    except (SyntaxError, tokenize.TokenError):
+        block = lines[line_start - 1:line_start]
+    return ''.join(block).rstrip('\n')
+
+
+def _index_definitions(text, filename):
+    """Returns a list of `(qualname, line_start, line_stop)` of functions and
+    classes in given source code, where `line_start` includes decorators."""
+    import ast
+
+    try:
+        tree = ast.parse(text, filename=filename)
+    except (SyntaxError, ValueError):
+        return []
+
+    defs = []
+    def_types = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, def_types):
+                qualname = prefix + child.name
+                line_start = min([child.lineno] + [v.lineno for v in child.decorator_list])
+                line_stop = getattr(child, 'end_lineno', None) or child.lineno
+                defs.append((qualname, line_start, line_stop))
+                is_class = isinstance(child, ast.ClassDef)
+                visit(child, qualname + ('.' if is_class else '.<locals>.'))
+            else:
+                visit(child, prefix)
+
+    visit(tree, '')
+    return defs
+
+
+class SourceFile(object):
+    """Content and definitions of a Python source file, which are loaded on
+    first access."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._lines = None
+        self._defs = None
+
+    @property
+    def lines(self):
+        """Lines with line endings kept, it's empty if the file cannot be read."""
+        with self._lock:
+            if self._lines is None:
+                from importlib.util import decode_source
+                try:
+                    with open(self.path, 'rb') as f:
+                        text = decode_source(f.read())
+                except (OSError, SyntaxError, UnicodeDecodeError):
+                    text = ''
+                self._lines = text.splitlines(keepends=True)
+            return self._lines
+
+    @property
+    def definitions(self):
+        """A map of qualified name to `(line_start, line_stop)`."""
+        lines = self.lines
+        with self._lock:
+            if self._defs is None:
+                self._defs = {
+                    qualname: (start, stop) for qualname, start, stop
+                    in _index_definitions(''.join(lines), self.path)
+                }
+            return self._defs
+
+    def get_text(self, line_start, line_stop):
+        return ''.join(self.lines[line_start - 1:line_stop]).rstrip('\n')
+
+
+class SourceFileCache(object):
+    """A thread-safe cache of source files, so that each file is read and
+    parsed only once even if it's requested by multiple threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = {}
+
+    def __len__(self):
+        return len(self._files)
+
+    def get(self, path):
+        """Returns a `SourceFile` of given path."""
+        path = os.path.abspath(path)
+        with self._lock:
+            source_file = self._files.get(path)
+            if source_file is None:
+                source_file = self._files[path] = SourceFile(path)
+        return source_file
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+
+
+class SourceResolver(object):
+    """Fill in snippets of nodes with source code of their definitions."""
+
+    def __init__(self, source_roots=None, main_path=None, search_sys_path=False,
+                 max_workers=None, file_cache=None):
+        """
+        Parameters
+        ----------
+        source_roots : list of str, optional
+            Directories to look up modules and relative paths of snippets.
+        main_path : str, optional
+            Path of the script which was run as `__main__`. Names without a
+            module part are looked up in this file.
+        search_sys_path : bool, optional
+            Look up modules in `sys.path` as well after `source_roots`.
+        max_workers : int, optional
+            Number of threads to process files. Default is decided by
+            `ThreadPoolExecutor`.
+        file_cache : SourceFileCache, optional
+            Cache of source files, which can be shared between resolvers.
+        """
+        self.source_roots = list(source_roots or [])
+        self.main_path = main_path
+        self.search_sys_path = search_sys_path
+        self.max_workers = max_workers
+        self.file_cache = SourceFileCache() if file_cache is None else file_cache
+        # module name -> path of source file (or None if it's not found)
+        self._module_paths = {}
+
+    @property
+    def search_paths(self):
+        if self.search_sys_path:
+            return self.source_roots + [v for v in sys.path if v and os.path.isdir(v)]
+        return self.source_roots
+
+    def find_module(self, module):
+        """Returns path of source file of given module, or None if it's not
+        found. Modules are not imported."""
+        if module == '__main__':
+            return self.main_path
+        if module not in self._module_paths:
+            parts = module.split('.')
+            path = None
+            for root in self.search_paths:
+                base = os.path.join(root, *parts)
+                for candidate in (base + '.py', os.path.join(base, '__init__.py')):
+                    if os.path.isfile(candidate):
+                        path = candidate
+                        break
+                if path is not None:
+                    break
+            self._module_paths[module] = path
+        return self._module_paths[module]
+
+    def _find_path(self, path):
+        if os.path.isabs(path):
+            return path if os.path.isfile(path) else None
+        for root in self.source_roots:
+            candidate = os.path.join(root, path)
+            if os.path.isfile(candidate):
+                return candidate
+        return path if os.path.isfile(path) else None
+
+    def locate(self, snippet):
+        """Returns `(path, qualname, line)` of the definition of given snippet,
+        where `line` is None if it's unknown. None is returned if the source
+        file cannot be found."""
+        name = snippet.name
+        if snippet.path:
+            if not snippet.path.endswith('.py'):
+                return None
+            path = self._find_path(snippet.path)
+            return None if path is None else (path, name, snippet.line_start)
+
+        if name == MODULE_LEVEL_NAME:
+            return None if self.main_path is None else (self.main_path, name, None)
+        parts = name.split('.')
+        # The longest prefix which is a module wins, e.g. `pkg.mod.Class.method`
+        for i in range(len(parts) - 1, 0, -1):
+            path = self.find_module('.'.join(parts[:i]))
+            if path is not None:
+                return path, '.'.join(parts[i:]), None
+        if self.main_path is not None and len(parts) == 1:
+            return self.main_path, name, None
+        return None
+
+    def _resolve_in_file(self, path, targets):
+        """Resolve definitions in a file, this is run in worker threads.
+        Returns a list of `(index, line_start, content)`."""
+        source_file = self.file_cache.get(path)
+        if not source_file.lines:
+            return []
+
+        results = []
+        for idx, qualname, line in targets:
+            if qualname == MODULE_LEVEL_NAME:
+                results.append((idx, 1, source_file.get_text(1, len(source_file.lines))))
+                continue
+            span = self._find_definition(source_file, qualname, line)
+            if span is not None:
+                results.append((idx, span[0], source_file.get_text(*span)))
+            elif line is not None:
+                content = read_block(source_file.lines, line)
+                if content:
+                    results.append((idx, line, content))
+        return results
+
+    def _find_definition(self, source_file, qualname, line):
+        defs = source_file.definitions
+        if qualname in defs:
+            return defs[qualname]
+        if line is None:
+            return None
+
+        # Names recorded by profilers are not always qualified, and lines can
+        # be either the first line of definition or a line inside it. Hence the
+        # innermost definition containing the line with matching name is taken.
+        short_name = qualname.rpartition('.')[2]
+        candidates = [
+            span for k, span in defs.items()
+            if span[0] <= line <= span[1] and k.rpartition('.')[2] == short_name
+        ]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda span: span[0])
+
+    def resolve(self, nodes, overwrite=False):
+        """Fill in `content`, `path`, `line_start` and `lang` of snippets whose
+        definitions are found.
+
+        Parameters
+        ----------
+        nodes : iterable of Node
+            Nodes to be resolved, e.g. a `NodeCollection`.
+        overwrite : bool, optional
+            Resolve snippets which have content already.
+
+        Returns
+        -------
+        resolved : list of Node
+            Nodes whose snippets are updated.
+        """
+        nodes = list(nodes)
+        groups = {}
+        for idx, node in enumerate(nodes):
+            if node.snippet.content and not overwrite:
+                continue
+            location = self.locate(node.snippet)
+            if location is None:
+                continue
+            path, qualname, line = location
+            groups.setdefault(os.path.abspath(path), []).append((idx, qualname, line))
+
+        if len(groups) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(self._resolve_in_file, groups, groups.values()))
+        else:
+            results = [self._resolve_in_file(k, v) for k, v in groups.items()]
+
+        resolved = []
+        for path, file_results in zip(groups, results):
+            for idx, line_start, content in file_results:
+                snippet = nodes[idx].snippet
+                snippet.content = content
+                snippet.path = path
+                snippet.line_start = line_start
+                snippet.lang = 'python'
+                resolved.append(nodes[idx])
+        return resolved
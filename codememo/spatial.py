@@ -0,0 +1,140 @@
+"""Spatial index of rectangles on canvas, which is used to find nodes and links
+in a region (e.g. the visible part of canvas) without checking all of them.
+
+Rectangles are stored in a hierarchy of uniform grids. Width and height of
+cells are doubled separately in each level along x and y axis, and a rectangle
+is stored in the first level where it overlaps at most 2 cells in both axes.
+So a large one (e.g. a link between two distant nodes) doesn't have to be
+registered in lots of cells, and a long but thin one stays in thin cells,
+which are not hit by queries a bit away from it.
+"""
+
+
+__all__ = ['GridIndex']
+
+
+class GridIndex(object):
+    """An index of axis-aligned rectangles `(x_min, y_min, x_max, y_max)` keyed
+    by hashable objects."""
+    DEFAULT_CELL_SIZE = 256.0
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        """
+        Parameters
+        ----------
+        cell_size : float, optional
+            Size of cells in the finest level. It should be close to the size
+            of most rectangles, i.e. the size of nodes.
+        """
+        if cell_size <= 0:
+            raise ValueError(f'cell_size should be positive, got {cell_size}')
+        self.cell_size = float(cell_size)
+        self._rects = {}
+        # Level and range of cells `(cx_min, cy_min, cx_max, cy_max)` of keys
+        self._spans = {}
+        # A map from level `(level_x, level_y)` to its cells, which are maps
+        # from `(cx, cy)` to set of keys
+        self._levels = {}
+
+    def __len__(self):
+        return len(self._rects)
+
+    def __contains__(self, key):
+        return key in self._rects
+
+    def get(self, key):
+        """Returns the rectangle of given key, or None if it's not indexed."""
+        return self._rects.get(key)
+
+    def _get_span(self, rect, level):
+        cw = self.cell_size * (1 << level[0])
+        ch = self.cell_size * (1 << level[1])
+        return (int(rect[0] // cw), int(rect[1] // ch), int(rect[2] // cw), int(rect[3] // ch))
+
+    def _locate(self, rect):
+        cs = self.cell_size
+        level_x = level_y = 0
+        while rect[2] // (cs * (1 << level_x)) - rect[0] // (cs * (1 << level_x)) > 1:
+            level_x += 1
+        while rect[3] // (cs * (1 << level_y)) - rect[1] // (cs * (1 << level_y)) > 1:
+            level_y += 1
+        level = (level_x, level_y)
+        return level, self._get_span(rect, level)
+
+    def insert(self, key, rect):
+        """Add a rectangle, or update it if the key exists already. Cells are
+        not touched if the rectangle stays within the same cells."""
+        x_min, y_min, x_max, y_max = rect
+        if x_min > x_max or y_min > y_max:
+            raise ValueError(f'Invalid rectangle: {rect}')
+        rect = (x_min, y_min, x_max, y_max)
+        level, span = self._locate(rect)
+
+        if key in self._rects:
+            if self._spans[key] == (level, span):
+                self._rects[key] = rect
+                return
+            self.remove(key)
+
+        self._rects[key] = rect
+        self._spans[key] = (level, span)
+        cells = self._levels.setdefault(level, {})
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[(cx, cy)] = {key}
+                else:
+                    cell.add(key)
+
+    def remove(self, key):
+        """Remove a rectangle, nothing happens if the key doesn't exist."""
+        if key not in self._rects:
+            return
+        del self._rects[key]
+        level, span = self._spans.pop(key)
+        cells = self._levels[level]
+        for cx in range(span[0], span[2] + 1):
+            for cy in range(span[1], span[3] + 1):
+                cell = cells[(cx, cy)]
+                cell.discard(key)
+                if not cell:
+                    del cells[(cx, cy)]
+        if not cells:
+            del self._levels[level]
+
+    def clear(self):
+        self._rects.clear()
+        self._spans.clear()
+        self._levels.clear()
+
+    def query(self, rect):
+        """Returns a set of keys whose rectangles intersect given one (edges
+        are included)."""
+        candidates = set()
+        for level, cells in self._levels.items():
+            cx_min, cy_min, cx_max, cy_max = self._get_span(rect, level)
+            n_cells = (cx_max - cx_min + 1) * (cy_max - cy_min + 1)
+            if n_cells > len(cells):
+                # Querying a region larger than the populated one
+                for (cx, cy), cell in cells.items():
+                    if cx_min <= cx <= cx_max and cy_min <= cy <= cy_max:
+                        candidates.update(cell)
+                continue
+            for cx in range(cx_min, cx_max + 1):
+                for cy in range(cy_min, cy_max + 1):
+                    cell = cells.get((cx, cy))
+                    if cell is not None:
+                        candidates.update(cell)
+        # Comparisons are inlined, since coarse cells may hold lots of keys
+        x_min, y_min, x_max, y_max = rect
+        rects, result = self._rects, set()
+        for k in candidates:
+            r = rects[k]
+            if r[0] <= x_max and x_min <= r[2] and r[1] <= y_max and y_min <= r[3]:
+                result.add(k)
+        return result
+
+    def query_point(self, x, y):
+        """Returns a set of keys whose rectangles contain given point."""
+        return self.query((x, y, x, y))
@@ -0,0 +1,268 @@
+"""An index of symbols built from tags files of universal-ctags, which can be
+generated by:
+
+    $ ctags --output-format=json --fields=+ne -R -f project.tags
+
+Each line of a tags file in JSON format is an object like
+
+    {"_type": "tag", "name": "bar", "path": "pkg/mod.py", "line": 10,
+     "end": 12, "kind": "member", "scope": "Foo", "scopeKind": "class",
+     "language": "Python", "pattern": "/^    def bar(self):$/"}
+
+Symbols are kept in parallel lists sorted by case-folded names, so that both
+exact and prefix lookups are binary searches, which is fast enough for
+auto-completion over millions of symbols. Since parsing a large tags file
+takes a while, the index is cached on disk in a compact form keyed by hash of
+the tags file, and loaded indices are kept in memory as well.
+"""
+from bisect import bisect_left
+from collections import namedtuple
+import hashlib
+import json
+import marshal
+import os
+
+from .objects import Snippet, _gc_paused
+from .sources import SourceFileCache, read_block
+
+
+__all__ = ['Symbol', 'SymbolIndex', 'load_symbol_index']
+
+# Version of cached indices, it should be increased once the format is changed
+INDEX_VERSION = 1
+
+Symbol = namedtuple('Symbol', ['name', 'scope', 'kind', 'path', 'line', 'end', 'lang', 'pattern'])
+Symbol.__doc__ = """A symbol in tags file. `line` and `end` are 0 if they are
+unknown, and `pattern` is kept only if `line` is unknown."""
+
+# Indices loaded in this process, path -> `((mtime_ns, size), SymbolIndex)`
+_loaded_indices = {}
+
+
+def _pattern_to_line(pattern):
+    """Convert a search pattern like `/^def foo():$/` to the line it matches."""
+    if len(pattern) < 2 or pattern[0] != '/' or pattern[-1] != '/':
+        return None
+    text = pattern[1:-1]
+    text = text[1:] if text.startswith('^') else text
+    text = text[:-1] if text.endswith('$') else text
+    return text.replace('\\/', '/').replace('\\\\', '\\')
+
+
+class SymbolIndex(object):
+    """A sorted index of symbols."""
+
+    def __init__(self, root, paths, kinds, langs, columns):
+        """
+        Parameters
+        ----------
+        root : str
+            Directory which relative paths of symbols are based on.
+        paths, kinds, langs : list of str
+            Distinct values referenced by symbols.
+        columns : tuple of lists
+            `(keys, names, scopes, path_ids, kind_ids, lang_ids, lines, ends,
+            patterns)` of symbols sorted by `keys`, which are case-folded names.
+        """
+        self.root = root
+        self.paths = paths
+        self.kinds = kinds
+        self.langs = langs
+        (self._keys, self._names, self._scopes, self._path_ids, self._kind_ids,
+         self._lang_ids, self._lines, self._ends, self._patterns) = columns
+        self.file_cache = SourceFileCache()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, idx):
+        return Symbol(
+            self._names[idx], self._scopes[idx], self.kinds[self._kind_ids[idx]],
+            os.path.join(self.root, self.paths[self._path_ids[idx]]),
+            self._lines[idx], self._ends[idx], self.langs[self._lang_ids[idx]],
+            self._patterns[idx],
+        )
+
+    @classmethod
+    def from_tags(cls, f, root=''):
+        """Build an index from a tags file in JSON format.
+
+        Parameters
+        ----------
+        f : iterable of str or bytes
+            Lines of a tags file, e.g. a file object.
+        root : str, optional
+            Directory which paths in tags file are relative to, it's usually
+            the directory where `ctags` was run.
+        """
+        path_ids, kind_ids, lang_ids = {}, {}, {}
+        rows = []
+        with _gc_paused():
+            for lineno, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    tag = json.loads(line)
+                except ValueError:
+                    raise ValueError(f'Invalid tag at line {lineno}: {line[:80]!r}') from None
+                if tag.get('_type') != 'tag':
+                    continue
+                name = tag['name']
+                line_start = tag.get('line', 0)
+                rows.append((
+                    name.casefold(), name, tag.get('scope', ''),
+                    path_ids.setdefault(tag['path'], len(path_ids)),
+                    kind_ids.setdefault(tag.get('kind', ''), len(kind_ids)),
+                    lang_ids.setdefault(tag.get('language', '').lower(), len(lang_ids)),
+                    line_start, tag.get('end', 0),
+                    '' if line_start else tag.get('pattern', ''),
+                ))
+            rows.sort()
+            columns = tuple(map(list, zip(*rows))) if rows else tuple([] for _ in range(9))
+        return cls(root, list(path_ids), list(kind_ids), list(lang_ids), columns)
+
+    def save(self, fn):
+        """Save this index to a file. It's written to a temporary file first, so
+        that a partially written file is never read by others."""
+        columns = (
+            self._keys, self._names, self._scopes, self._path_ids, self._kind_ids,
+            self._lang_ids, self._lines, self._ends, self._patterns,
+        )
+        fn_temp = f'{fn}.{os.getpid()}.tmp'
+        with open(fn_temp, 'wb') as f:
+            marshal.dump((INDEX_VERSION, self.root, self.paths, self.kinds, self.langs, columns), f)
+        os.replace(fn_temp, fn)
+
+    @classmethod
+    def load(cls, fn):
+        with open(fn, 'rb') as f:
+            data = f.read()
+        try:
+            with _gc_paused():
+                version, *args = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            version = None
+        if version != INDEX_VERSION:
+            raise ValueError(f'Unsupported symbol index: {fn}')
+        return cls(*args)
+
+    def _iter_range(self, key):
+        """Yields indices of symbols whose keys start with given key."""
+        keys = self._keys
+        idx = bisect_left(keys, key)
+        while idx < len(keys) and keys[idx].startswith(key):
+            yield idx
+            idx += 1
+
+    def find(self, name):
+        """Returns symbols of given name."""
+        return [
+            self[i] for i in self._iter_range(name.casefold()) if self._names[i] == name
+        ]
+
+    def search(self, prefix, limit=20):
+        """Returns symbols whose names start with given prefix (case-insensitive)
+        in alphabetical order.
+
+        Parameters
+        ----------
+        prefix : str
+            Prefix of names.
+        limit : int, optional
+            Maximum number of returned symbols.
+        """
+        if not prefix:
+            return []
+        result = []
+        for idx in self._iter_range(prefix.casefold()):
+            if len(result) == limit:
+                break
+            result.append(self[idx])
+        return result
+
+    def iter_symbols(self, kinds=None):
+        """Yields symbols of given kinds (all symbols by default)."""
+        kind_ids = None if kinds is None else set(
+            i for i, v in enumerate(self.kinds) if v in kinds
+        )
+        for idx in range(len(self)):
+            if kind_ids is None or self._kind_ids[idx] in kind_ids:
+                yield self[idx]
+
+    def read_snippet(self, symbol):
+        """Returns a `Snippet` of given symbol whose content is read from the
+        exact range of lines. If end of range is unknown, the whole block is
+        read for Python code, otherwise only the first line is read."""
+        name = f'{symbol.scope}.{symbol.name}' if symbol.scope else symbol.name
+        source_file = self.file_cache.get(symbol.path)
+        lines = source_file.lines
+
+        line_start = symbol.line
+        if not line_start and symbol.pattern:
+            target = _pattern_to_line(symbol.pattern)
+            line_start = next(
+                (i for i, v in enumerate(lines, 1) if v.rstrip('\r\n') == target), 0
+            )
+        if not 1 <= line_start <= len(lines):
+            content, line_start = '', None
+        elif symbol.end >= line_start:
+            content = source_file.get_text(line_start, symbol.end)
+        elif symbol.lang == 'python':
+            content = read_block(lines, line_start)
+        else:
+            content = lines[line_start - 1].rstrip('\r\n')
+        return Snippet(
+            name, content, line_start=line_start, lang=symbol.lang or None, path=symbol.path,
+        )
+
+
+def load_symbol_index(fn, cache_dir=None, use_cache=True):
+    """Load a symbol index of a tags file. Loaded indices are kept in memory,
+    and they are cached on disk as well if `use_cache` is True.
+
+    Parameters
+    ----------
+    fn : str
+        Path of tags file in JSON format.
+    cache_dir : str, optional
+        Directory to store indices. Default is the `cache` directory under
+        config directory of this application.
+    use_cache : bool, optional
+        Whether to read and write cached indices.
+    """
+    fn = os.path.abspath(fn)
+    stat = os.stat(fn)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if fn in _loaded_indices and _loaded_indices[fn][0] == stamp:
+        return _loaded_indices[fn][1]
+
+    if cache_dir is None:
+        from .config import AppDefaults
+        cache_dir = AppDefaults.dir_cache
+
+    with open(fn, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    fn_cache = os.path.join(cache_dir, f'symbols-v{INDEX_VERSION}-{digest}.bin')
+
+    index = None
+    if use_cache:
+        try:
+            index = SymbolIndex.load(fn_cache)
+        except (OSError, ValueError):
+            # A missing, broken or outdated cache will be overwritten later
+            pass
+    if index is None:
+        index = SymbolIndex.from_tags(data.splitlines(), root=os.path.dirname(fn))
+        if use_cache:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                index.save(fn_cache)
+            except OSError:
+                pass
+    # Paths in cached index are relative to the tags file which is cached
+    # first, but a tags file with the same content may be located elsewhere.
+    index.root = os.path.dirname(fn)
+
+    _loaded_indices[fn] = (stamp, index)
+    return index
@@ -0,0 +1,189 @@
+"""Run long operations (e.g. importing a large file) in background threads, so
+that the UI keeps responding while they are running.
+
+A task reports progress through a `TaskProgress` object, which is also used to
+cancel it. Cancellation is cooperative: the task checks `TaskProgress.check()`
+regularly (e.g. whenever a chunk of file is read by `ProgressReader`) and stops
+by raising `TaskCancelledException`.
+
+Results are not handed over to the UI by the background thread. Instead, the
+UI polls `BackgroundTask.done` in each frame and takes the result then.
+
+Tasks which need more processes should create them by `new_process_pool()`.
+"""
+import sys
+import threading
+
+from .exceptions import TaskCancelledException
+
+
+__all__ = ['BackgroundTask', 'ProgressReader', 'TaskProgress', 'new_process_pool']
+
+
+def new_process_pool(max_workers):
+    """Returns a `ProcessPoolExecutor` whose workers are spawned rather than
+    forked. Pools are created by background tasks while other threads (e.g.
+    the UI loop) are running, and a forked child might deadlock on locks held
+    by those threads. Note that `fork` is still used on Python 3.6, which
+    doesn't support choosing the start method of a pool.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if sys.version_info < (3, 7):
+        return ProcessPoolExecutor(max_workers=max_workers)
+
+    import multiprocessing
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+    )
+
+
+class TaskProgress(object):
+    """Progress of a task. Counters are written by the task and read by the UI,
+    and they are only informative.
+
+    A task consisting of several steps (e.g. reading and then decoding a file)
+    can name the current one with `start_stage()`. Byte counters are reset for
+    each stage, so that `fraction` is the progress of the current stage.
+    """
+
+    def __init__(self):
+        self.stage = ''
+        self.bytes_read = 0
+        self.bytes_total = 0
+        self.n_nodes = 0
+        self.n_edges = 0
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def fraction(self):
+        """Fraction of bytes read, or None if the total is unknown."""
+        if self.bytes_total <= 0:
+            return None
+        return min(1.0, self.bytes_read / self.bytes_total)
+
+    def start_stage(self, name, total=0):
+        """Start a new stage and check for cancellation.
+
+        Parameters
+        ----------
+        name : str
+            Name of stage shown to users.
+        total : int, optional
+            Amount of work (bytes, characters, ...) of this stage. If it's 0,
+            the progress of this stage is unknown.
+        """
+        self.check()
+        self.stage = name
+        self.bytes_read = 0
+        self.bytes_total = total
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        """Raise `TaskCancelledException` if the task is cancelled."""
+        if self._cancelled.is_set():
+            raise TaskCancelledException('task is cancelled.')
+
+
+class ProgressReader(object):
+    """A wrapper of file object which counts data read into `TaskProgress` and
+    checks for cancellation on each read. For files opened in text mode,
+    characters are counted as bytes."""
+    # Approximate size of lines read at once while iterating
+    LINES_BLOCK_SIZE = 2**16
+
+    def __init__(self, f, progress):
+        self._f = f
+        self._progress = progress
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        # Lines are read in blocks, so that progress is not updated per line
+        progress, readlines = self._progress, self._f.readlines
+        while True:
+            progress.check()
+            lines = readlines(self.LINES_BLOCK_SIZE)
+            if not lines:
+                return
+            progress.bytes_read += sum(map(len, lines))
+            yield from lines
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def read(self, size=-1):
+        self._progress.check()
+        data = self._f.read(size)
+        self._progress.bytes_read += len(data)
+        return data
+
+    def readline(self, size=-1):
+        self._progress.check()
+        line = self._f.readline(size)
+        self._progress.bytes_read += len(line)
+        return line
+
+    def close(self):
+        self._f.close()
+
+
+class BackgroundTask(object):
+    """Run a function in a daemon thread. The function is called with a
+    `TaskProgress` object as its only argument."""
+
+    def __init__(self, func, progress=None):
+        """
+        Parameters
+        ----------
+        func : callable
+            Function to run, its return value is stored in `result`.
+        progress : TaskProgress, optional
+            Progress passed to `func`, a new one is created by default.
+        """
+        self.func = func
+        self.progress = TaskProgress() if progress is None else progress
+        self.result = None
+        self.exception = None
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def cancelled(self):
+        return isinstance(self.exception, TaskCancelledException)
+
+    def _run(self):
+        try:
+            self.result = self.func(self.progress)
+        except Exception as ex:
+            self.exception = ex
+        finally:
+            self._done.set()
+
+    def start(self):
+        if self._thread is not None:
+            raise RuntimeError('task can only be started once.')
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self.progress.cancel()
+
+    def wait(self, timeout=None):
+        """Block until the task is done, returns False if it's timed out."""
+        return self._done.wait(timeout)
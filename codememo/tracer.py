@@ -0,0 +1,241 @@
+"""Record call graph of code running in this process.
+
+Example:
+
+    from codememo.tracer import CallRecorder
+
+    with CallRecorder() as recorder:
+        run_something()
+    recorder.save('calls.json')
+
+    # Or as a decorator, calls are accumulated over invocations
+    recorder = CallRecorder(sample_interval=10)
+
+    @recorder
+    def handle_request(request):
+        ...
+
+Two backends are available:
+
+- `sys.setprofile()` with a minimal callback (default). Only function calls
+  are handled, and each call is aggregated as a counter keyed by code objects
+  of caller and callee and the line of call site, so that nothing is formatted
+  while recording. With `sample_interval=N`, only every N-th call is recorded.
+- `cProfile` (with `line_numbers=False`), whose profiler is implemented in C
+  and thus has a much lower overhead, but lines of call sites are not
+  available.
+"""
+import linecache
+import sys
+from functools import wraps
+
+from .objects import Snippet, Node, NodeCollection
+from .sources import read_block
+
+
+__all__ = ['CallRecorder']
+
+# Key of recording settings in `NodeCollection.metadata`
+METADATA_KEY = 'tracer'
+
+
+def read_source_block(filename, line_start):
+    """Returns source code of the block (e.g. a function) starting at given
+    line, or an empty string if it's not available."""
+    return read_block(linecache.getlines(filename), line_start)
+
+
+def _make_snippet(code, with_source):
+    name = getattr(code, 'co_qualname', code.co_name)
+    if code.co_name == '<module>':
+        line_start = 1
+        content = ''.join(linecache.getlines(code.co_filename)).rstrip('\n') if with_source else ''
+    else:
+        line_start = code.co_firstlineno
+        content = read_source_block(code.co_filename, line_start) if with_source else ''
+    return Snippet(name, content, line_start=line_start, lang='python', path=code.co_filename)
+
+
+class CallRecorder(object):
+    """Record calls in current thread, it can be used as a context manager or
+    a decorator. Recording can be started and stopped multiple times, and
+    calls are accumulated.
+
+    Only the thread calling `start()` is recorded, since profilers of other
+    threads are not replaced (`threading.setprofile()` would only apply to
+    threads started afterwards). The profiler which was set before `start()`
+    (e.g. a recorder outside, a debugger or coverage) is suspended while
+    recording, and it's restored by `stop()`.
+    """
+
+    def __init__(self, sample_interval=1, line_numbers=True, with_source=True):
+        """
+        Parameters
+        ----------
+        sample_interval : int, optional
+            Record only one of every `sample_interval` calls to reduce overhead.
+            Counts of calls are not scaled.
+        line_numbers : bool, optional
+            Record lines of call sites. If it's False, `cProfile` is used to
+            record calls, and sampling is not supported.
+        with_source : bool, optional
+            Fill content of snippets with source code of functions.
+        """
+        if sample_interval < 1:
+            raise ValueError('`sample_interval` should be a positive integer.')
+        if not line_numbers and sample_interval != 1:
+            raise ValueError('sampling is not supported when `line_numbers` is False.')
+        self.sample_interval = sample_interval
+        self.line_numbers = line_numbers
+        self.with_source = with_source
+
+        # `(caller_code, lineno, callee_code)` -> number of calls
+        self._calls = {}
+        self._profile = None
+        self._previous_profile_func = None
+        self._running = False
+
+    @property
+    def running(self):
+        return self._running
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # Nested calls are recorded by the outermost one
+            if self._running:
+                return func(*args, **kwargs)
+            with self:
+                return func(*args, **kwargs)
+        return wrapper
+
+    def _make_profile_func(self):
+        # Names are bound as closure variables to make the callback cheap
+        calls = self._calls
+        get = calls.get
+        interval = self.sample_interval
+
+        if interval == 1:
+            def profile(frame, event, arg):
+                if event == 'call':
+                    caller = frame.f_back
+                    if caller is not None:
+                        key = (caller.f_code, caller.f_lineno, frame.f_code)
+                        calls[key] = get(key, 0) + 1
+            return profile
+
+        countdown = [interval]
+
+        def profile(frame, event, arg):
+            if event == 'call':
+                countdown[0] -= 1
+                if countdown[0]:
+                    return
+                countdown[0] = interval
+                caller = frame.f_back
+                if caller is not None:
+                    key = (caller.f_code, caller.f_lineno, frame.f_code)
+                    calls[key] = get(key, 0) + 1
+        return profile
+
+    def start(self):
+        if self._running:
+            raise RuntimeError('recorder is running already.')
+        self._running = True
+        self._previous_profile_func = sys.getprofile()
+        if self.line_numbers:
+            sys.setprofile(self._make_profile_func())
+        else:
+            if self._profile is None:
+                import cProfile
+                self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self):
+        if not self._running:
+            return
+        if not self.line_numbers:
+            self._profile.disable()
+        # `cProfile` also clears profiler of this thread while disabling
+        sys.setprofile(self._previous_profile_func)
+        self._previous_profile_func = None
+        self._running = False
+
+    def to_node_collection(self):
+        """Returns a `NodeCollection` of recorded calls. Call counts are
+        stored in `Node.metadata`."""
+        if self._running:
+            raise RuntimeError('recorder should be stopped first.')
+        if self.line_numbers:
+            node_collection = self._build_from_calls()
+        else:
+            node_collection = self._build_from_profile()
+        node_collection.metadata[METADATA_KEY] = {
+            'sample_interval': self.sample_interval,
+            'line_numbers': self.line_numbers,
+        }
+        return node_collection
+
+    def _build_from_calls(self):
+        # Calls of `stop()` and `__exit__()` are recorded as well
+        this_file = _make_snippet.__code__.co_filename
+        index_map, codes, call_counts = {}, [], []
+        edges = {}
+        for (caller, lineno, callee), count in self._calls.items():
+            if caller.co_filename == this_file or callee.co_filename == this_file:
+                continue
+            for code in (caller, callee):
+                if code not in index_map:
+                    index_map[code] = len(codes)
+                    codes.append(code)
+                    call_counts.append(0)
+            idx_root, idx_leaf = index_map[caller], index_map[callee]
+            call_counts[idx_leaf] += count
+            # Only the first call site is kept for each pair of caller and
+            # callee, since a leaf can only be referenced once by a root.
+            edges.setdefault((idx_root, idx_leaf), lineno)
+
+        nodes = [
+            Node(_make_snippet(code, self.with_source), metadata={'calls': n_calls})
+            for code, n_calls in zip(codes, call_counts)
+        ]
+        node_collection = NodeCollection(nodes)
+
+        def to_ref_start(snippet, lineno):
+            ref_start = lineno - snippet.line_start + 1
+            return ref_start if 1 <= ref_start <= snippet.n_lines else 1
+
+        node_collection.add_edges([
+            (idx_root, idx_leaf, to_ref_start(nodes[idx_root].snippet, lineno), None)
+            for (idx_root, idx_leaf), lineno in edges.items()
+        ], trusted=True)
+        return node_collection
+
+    def _build_from_profile(self):
+        from .graph_parsers._pstats import PstatsParser
+
+        this_file = _make_snippet.__code__.co_filename
+        self._profile.create_stats()
+        stats = {
+            k: v for k, v in self._profile.stats.items() if k[0] != this_file
+        }
+        node_collection = PstatsParser(use_cache=False).from_stats(stats)
+        for node in node_collection:
+            snippet = node.snippet
+            if snippet.path != '':
+                snippet.lang = 'python'
+                if self.with_source:
+                    snippet.content = read_source_block(snippet.path, snippet.line_start)
+        return node_collection
+
+    def save(self, fn):
+        """Save recorded calls as a project file, see also
+        `NodeCollection.save()`."""
+        self.to_node_collection().save(fn)
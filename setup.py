@@ -25,11 +25,9 @@ else:
 THIS_DIR = Path(__file__).parent
 
 EXTRAS_REQUIRE = {
-    'dot': ['networkx>=2.5'],
+    # DOT files are parsed natively now, this is kept for compatibility
+    'dot': [],
 }
-# For non-linux users, `pygraphviz` have to be installed manually
-if sys.platform == 'linux':
-    EXTRAS_REQUIRE['dot'].append('pygraphviz>=1.6')
 EXTRAS_REQUIRE['full'] = list(set([v for req_list in EXTRAS_REQUIRE.values() for v in req_list]))
 
 
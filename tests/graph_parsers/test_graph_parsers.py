@@ -1,12 +1,34 @@
 from subprocess import check_call
 from pathlib import Path
+import io
+import json
+import os
 import shlex
 
 import pytest
-from codememo.graph_parsers import get_graph_parser
+from codememo.objects import Snippet, Node, NodeCollection
+from codememo.graph_parsers import get_graph_parser, parser_registry, ParserRegistry
+from codememo.graph_parsers.base import BaseParser
+from codememo.graph_parsers._dot import (
+    DotParser, iter_dot_tokens, iter_dot_statements, parse_plain_positions,
+)
 
 THIS_DIR = Path(__file__).parent
 
+DESIRED_NODE_NAMES = [
+    '__main__', '<module>', 'main', 'foo', 'bar', 'buzz', 'my_print',
+]
+DESIRED_NODE_LINKS = [
+    ('__main__', '<module>'),
+    ('<module>', 'main'),
+    ('main', 'foo'),
+    ('main', 'bar'),
+    ('main', 'buzz'),
+    ('foo', 'my_print'),
+    ('bar', 'my_print'),
+    ('buzz', 'my_print'),
+]
+
 
 @pytest.fixture(scope='module')
 def call_graph_dot_file():
@@ -21,36 +43,780 @@ def call_graph_dot_file():
     return fn_script, fn_dot_file
 
 
+def check_call_graph(node_collection):
+    node_names = [v.snippet.name for v in node_collection]
+    node_links = [
+        (link.root.snippet.name, link.leaf.snippet.name.split(' ')[0])
+        for link in node_collection.resolve_links()
+    ]
+
+    assert set(node_names) == set(DESIRED_NODE_NAMES)
+
+    # Here we won't validate `root_slot` and `leaf_slot` of `NodeLink`s because
+    # we cannot guarantee that order of leaf nodes generated by other tools will
+    # always match to our implementation.
+    assert set(node_links) == set(DESIRED_NODE_LINKS)
+
+
 class TestDotParser:
     def test_parse(self, call_graph_dot_file):
         _, fn_dot_file = call_graph_dot_file
 
         parser = get_graph_parser('.dot')
         node_collection = parser.parse(fn_dot_file)
+        check_call_graph(node_collection)
+
+    def test_parse_static_sample(self):
+        # Layout output of pycallgraph (`dot -Tdot`), so that this test does
+        # not depend on graphviz
+        parser = get_graph_parser('.dot')
+        node_collection = parser.parse(THIS_DIR.joinpath('call_graph_sample.dot'))
+        check_call_graph(node_collection)
+        assert len(node_collection) == len(DESIRED_NODE_NAMES)
+        node_collection.validate()
+
+    def test_parse_iter(self):
+        parser = get_graph_parser('.dot')
+        batches = list(parser.parse_iter(THIS_DIR.joinpath('call_graph_sample.dot'), batch_size=4))
+        assert len(batches) > 1
+        assert all(len(nodes) + len(edges) <= 4 for nodes, edges in batches)
+
+        # Edges only refer to nodes yielded in the same or previous batches
+        n_nodes = 0
+        for nodes, edges in batches:
+            n_nodes += len(nodes)
+            assert all(max(v[0], v[1]) < n_nodes for v in edges)
+
+        node_collection = NodeCollection.from_batches(batches, trusted=True)
+        check_call_graph(node_collection)
+
+    def test_parse_invalid_file(self, tmpdir):
+        fn = Path(tmpdir, 'invalid.dot')
+        fn.write_text('digraph G { a -> ')
+        parser = get_graph_parser('.dot')
+        with pytest.raises(ValueError, match='unexpected end of file'):
+            parser.parse(fn)
+
+        fn.write_text('{ a -> b }')
+        with pytest.raises(ValueError, match='not a valid DOT file'):
+            parser.parse(fn)
+
+    def test_parse_positions(self, tmpdir):
+        parser = get_graph_parser('.dot', layout='pos')
+        node_collection = parser.parse(THIS_DIR.joinpath('call_graph_sample.dot'))
+        check_call_graph(node_collection)
+        node_map = {v.snippet.name: v for v in node_collection}
+        assert node_map['main'].metadata == {'pos': [128.5, 278.0]}
+        assert node_map['foo'].metadata == {'pos': [52.0, 206.0]}
+
+        # Attributes declared after the node is referenced by an edge
+        fn = Path(tmpdir, 'graph.dot')
+        fn.write_text('digraph G { a -> b; b [pos="1,2!"]; c [pos="invalid"] }')
+        node_collection = parser.parse(fn)
+        assert [v.metadata for v in node_collection] == [{}, {'pos': [1.0, 2.0]}, {}]
 
-        desired_node_names = [
-            '__main__', '<module>', 'main', 'foo', 'bar', 'buzz', 'my_print',
+        # Positions are ignored by default
+        node_collection = get_graph_parser('.dot').parse(fn)
+        assert [v.metadata for v in node_collection] == [{}, {}, {}]
+
+    def test_parse_plain_positions(self):
+        text = (
+            'graph 1 2.5 3\n'
+            'node a 1.25 2 0.75 0.5 a solid ellipse black lightgrey\n'
+            'node "<module>" 0.5 1 0.75 0.5 "<module>" solid ellipse black lightgrey\n'
+            'edge a "<module>" 4 1 1 1 1 1 1 1 1 solid black\n'
+            'stop\n'
+        )
+        assert parse_plain_positions(text) == {'a': [90.0, 144.0], '<module>': [36.0, 72.0]}
+
+    def test_layout_options(self):
+        with pytest.raises(ValueError, match='layout'):
+            DotParser(layout='neato')
+        parser = DotParser(layout='dot', dot_binary='codememo-nonexistent-dot')
+        with pytest.raises(RuntimeError, match='is not found'):
+            parser.parse(THIS_DIR.joinpath('call_graph_sample.dot'))
+
+
+class TestDotTokenizer:
+    TEXT = (
+        '# preprocessor line\n'
+        'digraph "G" { // comment\n'
+        '  a -> b [label="multi\\\nline \\"quoted\\"", w=-1.5]; /* block\n'
+        'comment */ c [label=<<b>bold</b>>];\n'
+        '  d:port -> e\n'
+        '}'
+    )
+
+    def test_tokens(self):
+        tokens = list(iter_dot_tokens(io.StringIO(self.TEXT)))
+        assert tokens == [
+            ('id', 'digraph'), ('string', 'G'), ('{', '{'),
+            ('edge', 'a', 'b', {'label': 'multiline "quoted"', 'w': '-1.5'}),
+            # Statements which cannot be matched as a whole are tokenized as usual
+            ('id', 'c'), ('[', '['), ('id', 'label'), ('=', '='), ('string', '<b>bold</b>'), (']', ']'),
+            ('id', 'd'), (':', ':'), ('id', 'port'), ('edgeop', '->'), ('id', 'e'),
+            ('}', '}'),
+        ]
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 7])
+    def test_statements_across_chunks(self, chunk_size):
+        desired = list(iter_dot_statements(io.StringIO(self.TEXT)))
+        assert desired == [
+            ('node', 'a', {}), ('node', 'b', {}),
+            ('edge', 'a', 'b', {'label': 'multiline "quoted"', 'w': '-1.5'}),
+            ('node', 'c', {'label': '<b>bold</b>'}),
+            ('node', 'd', {}), ('node', 'e', {}), ('edge', 'd', 'e', {}),
         ]
-        desired_node_links = [
-            ('__main__', '<module>'),
-            ('<module>', 'main'),
-            ('main', 'foo'),
-            ('main', 'bar'),
-            ('main', 'buzz'),
-            ('foo', 'my_print'),
-            ('bar', 'my_print'),
-            ('buzz', 'my_print'),
+        statements = list(iter_dot_statements(io.StringIO(self.TEXT), chunk_size=chunk_size))
+        assert statements == desired
+
+    def test_unterminated_string(self):
+        with pytest.raises(ValueError, match='invalid DOT syntax'):
+            list(iter_dot_tokens(io.StringIO('graph { "a }')))
+
+
+class TestDotStatements:
+    def test_edge_chain_and_subgraph_operands(self):
+        text = (
+            'strict graph { rankdir=LR; node [shape=box];'
+            ' a -- b:p1:n -- { c; d } [weight=2]; "e" + "f"; }'
+        )
+        statements = list(iter_dot_statements(io.StringIO(text)))
+        nodes = [v[1] for v in statements if v[0] == 'node']
+        edges = [v[1:] for v in statements if v[0] == 'edge']
+
+        assert nodes == ['c', 'd', 'a', 'b', 'c', 'd', 'ef']
+        assert edges == [
+            ('a', 'b', {'weight': '2'}),
+            ('b', 'c', {'weight': '2'}),
+            ('b', 'd', {'weight': '2'}),
         ]
 
-        node_names = [v.snippet.name for v in node_collection]
-        node_links = [
-            (link.root.snippet.name, link.leaf.snippet.name.split(' ')[0])
+
+class FakeParser(BaseParser):
+    VALID_EXTENSIONS = ['.fake']
+
+
+class FakeEntryPoint:
+    def __init__(self, name, target):
+        self.name = name
+        self.target = target
+        self.n_loaded = 0
+
+    def load(self):
+        self.n_loaded += 1
+        return self.target
+
+
+class TestParserRegistry:
+    def test_builtin_parser_is_imported_once(self, mocker):
+        import importlib
+
+        registry = ParserRegistry(entry_point_group=None)
+        spy = mocker.spy(importlib, 'import_module')
+        assert registry.extensions == ['.dot', '.folded', '.prof', '.pstats', '.py', '.tags', '.txt']
+        assert spy.call_count == 0
+
+        assert isinstance(registry.get_parser('.dot'), DotParser)
+        assert isinstance(registry.get_parser('.dot'), DotParser)
+        assert spy.call_count == 1
+        assert registry.capabilities('.dot') == {
+            'extensions': ['.dot'], 'streaming': True, 'directory': False, 'update': False,
+        }
+
+    def test_entry_points(self, mocker):
+        entry_points = [FakeEntryPoint('fake', FakeParser), FakeEntryPoint('.dot', FakeParser)]
+        mocker.patch('codememo.graph_parsers._iter_entry_points', return_value=entry_points)
+
+        registry = ParserRegistry()
+        with pytest.warns(UserWarning, match='registered already'):
+            assert registry.extensions == ['.dot', '.fake', '.folded', '.prof', '.pstats', '.py', '.tags', '.txt']
+        assert entry_points[0].n_loaded == 0
+
+        assert isinstance(registry.get_parser('.fake'), FakeParser)
+        assert isinstance(registry.get_parser('.fake'), FakeParser)
+        assert entry_points[0].n_loaded == 1
+        # Built-in parser is not overridden
+        assert registry.get_parser_class('.dot') is DotParser
+
+    def test_register(self):
+        registry = ParserRegistry(entry_point_group=None)
+        registry.register('.fake', FakeParser)
+        assert registry.extensions == ['.dot', '.fake', '.folded', '.prof', '.pstats', '.py', '.tags', '.txt']
+        assert registry.get_parser_class('.fake') is FakeParser
+
+        with pytest.raises(AssertionError):
+            registry.register('.bad', object)
+
+    def test_unsupported_parser(self):
+        registry = ParserRegistry(entry_point_group=None)
+        with pytest.raises(ValueError, match='unsupported parser'):
+            registry.get_parser('.unknown')
+
+
+class TestBaseParser:
+    def test_parse_only_parser(self):
+        class ParseOnlyParser(BaseParser):
+            def parse(self, fn):
+                foo, bar = Node(Snippet('foo', '')), Node(Snippet('bar', ''))
+                foo.add_leaf(bar)
+                return NodeCollection([foo, bar])
+
+        batches = list(ParseOnlyParser().parse_iter('foo.txt'))
+        assert len(batches) == 1
+        node_collection = NodeCollection.from_batches(batches)
+        assert [v.snippet.name for v in node_collection.nodes[0].leaves] == ['bar']
+
+    def test_not_implemented(self):
+        with pytest.raises(NotImplementedError):
+            BaseParser().parse('foo.txt')
+        with pytest.raises(NotImplementedError):
+            list(BaseParser().parse_iter('foo.txt'))
+
+
+@pytest.fixture
+def python_source_tree(tmpdir):
+    files = {
+        'pkg/__init__.py': 'from .core import Engine\n',
+        'pkg/core.py': (
+            'import os\n'
+            'from .utils import helper as assist\n'
+            '\n'
+            '\n'
+            'class Engine(object):\n'
+            '    def __init__(self):\n'
+            '        self.state = assist(\n'
+            '            1,\n'
+            '        )\n'
+            '\n'
+            '    def run(self):\n'
+            '        def step():\n'
+            '            return os.getcwd()\n'
+            '        step()\n'
+            '        self.run()\n'
+            '        return self.stop()\n'
+            '\n'
+            '    def stop(self):\n'
+            '        pass\n'
+        ),
+        'pkg/utils.py': (
+            'def helper(value):\n'
+            '    return value\n'
+        ),
+        'main.py': (
+            'import pkg.utils as u\n'
+            'from pkg import Engine\n'
+            '\n'
+            '@staticmethod\n'
+            'def main():\n'
+            '    Engine().run()\n'
+            '    u.helper(2)\n'
+            '    undefined()\n'
+        ),
+        'broken.py': 'def broken(:\n',
+        '.hidden/ignored.py': 'def ignored():\n    pass\n',
+    }
+    for rel_path, content in files.items():
+        fn = Path(tmpdir, rel_path)
+        fn.parent.mkdir(parents=True, exist_ok=True)
+        fn.write_text(content)
+    return Path(tmpdir)
+
+
+class TestPythonSourceParser:
+    def check_source_tree(self, node_collection):
+        node_map = {(v.snippet.path, v.snippet.name): v for v in node_collection}
+        assert set(node_map) == {
+            ('main.py', 'main'),
+            (str(Path('pkg/core.py')), 'Engine'),
+            (str(Path('pkg/core.py')), 'Engine.__init__'),
+            (str(Path('pkg/core.py')), 'Engine.run'),
+            (str(Path('pkg/core.py')), 'Engine.run.<locals>.step'),
+            (str(Path('pkg/core.py')), 'Engine.stop'),
+            (str(Path('pkg/utils.py')), 'helper'),
+        }
+
+        main = node_map[('main.py', 'main')]
+        # Decorators are included in snippet
+        assert main.snippet.line_start == 4
+        assert main.snippet.content.startswith('@staticmethod\ndef main():')
+        assert main.snippet.lang == 'python'
+
+        links = {
+            (link.root.snippet.name, link.leaf.snippet.name): link.leaf.ref_infos[link.root.nid]
             for link in node_collection.resolve_links()
+        }
+        assert set(links) == {
+            ('main', 'Engine'),
+            ('main', 'helper'),
+            ('Engine.__init__', 'helper'),
+            ('Engine.run', 'Engine.run.<locals>.step'),
+            ('Engine.run', 'Engine.run'),
+            ('Engine.run', 'Engine.stop'),
+        }
+
+        # Reference lines are relative to snippet
+        ref_info = links[('Engine.__init__', 'helper')]
+        assert (ref_info.start, ref_info.stop) == (2, 4)
+        ref_info = links[('main', 'helper')]
+        assert (ref_info.start, ref_info.stop) == (4, None)
+
+        node_collection.validate()
+
+    def test_parse_directory(self, python_source_tree):
+        parser = get_graph_parser('.py')
+        with pytest.warns(UserWarning, match='Failed to parse 1 file'):
+            node_collection = parser.parse(str(python_source_tree))
+        self.check_source_tree(node_collection)
+
+    def test_parse_in_process_pool(self, python_source_tree, mocker):
+        from codememo.graph_parsers._python import PythonSourceParser
+
+        mocker.patch.object(PythonSourceParser, 'MIN_FILES_FOR_PROCESS_POOL', 1)
+        parser = PythonSourceParser(max_workers=2)
+        with pytest.warns(UserWarning, match='Failed to parse 1 file'):
+            batches = list(parser.parse_iter(str(python_source_tree), batch_size=2))
+        assert len(batches) > 1
+        self.check_source_tree(NodeCollection.from_batches(batches, trusted=True))
+
+    def test_parse_single_file(self):
+        parser = get_graph_parser('.py')
+        node_collection = parser.parse(str(THIS_DIR.joinpath('script_for_call_graph.py')))
+        links = {
+            (link.root.snippet.name, link.leaf.snippet.name)
+            for link in node_collection.resolve_links()
+        }
+        assert links == {
+            ('main', 'foo'), ('main', 'bar'), ('main', 'buzz'),
+            ('foo', 'my_print'), ('bar', 'my_print'), ('buzz', 'my_print'),
+        }
+
+    def test_update(self, python_source_tree, tmpdir, mocker):
+        from codememo.graph_parsers import _python
+
+        parser = get_graph_parser('.py')
+        with pytest.warns(UserWarning, match='Failed to parse 1 file'):
+            node_collection = parser.parse(str(python_source_tree))
+
+        # Manifest is saved along with the project
+        fn_project = str(Path(tmpdir, 'project.json'))
+        node_collection.save(fn_project)
+        node_collection = NodeCollection.load(fn_project)
+
+        node_map = {v.snippet.name: v for v in node_collection}
+        main, stop = node_map['main'], node_map['Engine.stop']
+        main.comment = 'entry point'
+        # A reference added manually
+        main.add_leaf(stop, 5)
+
+        python_source_tree.joinpath('main.py').write_text(
+            'import pkg.utils as u\n'
+            '\n'
+            'def main():\n'
+            '    u.extra()\n'
+        )
+        python_source_tree.joinpath('pkg/utils.py').write_text(
+            'def helper(value):\n'
+            '    return value + 1\n'
+            '\n'
+            'def extra():\n'
+            '    pass\n'
+        )
+        python_source_tree.joinpath('broken.py').write_text('def fixed():\n    pass\n')
+        # Files which are touched without being modified are not parsed again
+        fn_core = python_source_tree.joinpath('pkg/core.py')
+        os.utime(fn_core, ns=(fn_core.stat().st_atime_ns, fn_core.stat().st_mtime_ns + 10**9))
+
+        spy = mocker.spy(_python, '_parse_source_file')
+        changes = parser.update(node_collection)
+        assert sorted(v.args[1] for v in spy.call_args_list) == sorted([
+            'broken.py', 'main.py', str(Path('pkg/utils.py')),
+        ])
+        assert sorted(v.snippet.name for v in changes['added']) == ['extra', 'fixed']
+        assert sorted(v.snippet.name for v in changes['updated']) == ['helper', 'main']
+        assert changes['removed'] == []
+
+        node_map = {v.snippet.name: v for v in node_collection}
+        assert node_map['main'] is main and main.comment == 'entry point'
+        assert main.snippet.content == 'def main():\n    u.extra()'
+        assert main.leaves == [stop, node_map['extra']]
+        # Reference added manually is kept, and its lines are clamped
+        assert stop.ref_infos[main.nid].start == 2
+        assert node_map['helper'].roots == [node_map['Engine.__init__']]
+        node_collection.validate()
+
+        python_source_tree.joinpath('pkg/utils.py').unlink()
+        changes = parser.update(node_collection)
+        assert sorted(v.snippet.name for v in changes['removed']) == ['extra', 'helper']
+        assert main.leaves == [stop]
+        assert node_map['Engine.__init__'].leaves == []
+        assert len(node_collection) == 7
+        manifest = node_collection.metadata[_python.MANIFEST_KEY]
+        assert str(Path('pkg/utils.py')) not in manifest['files']
+        node_collection.validate()
+
+    def test_update_duplicate_qualnames(self, tmpdir):
+        # Getter and setter of a property share the same qualified name
+        fn = Path(tmpdir, 'prop.py')
+        fn.write_text(
+            'def helper():\n'
+            '    pass\n'
+            '\n'
+            'class C:\n'
+            '    @property\n'
+            '    def x(self):\n'
+            '        return helper()\n'
+            '\n'
+            '    @x.setter\n'
+            '    def x(self, value):\n'
+            '        pass\n'
+        )
+        parser = get_graph_parser('.py')
+        node_collection = parser.parse(str(tmpdir))
+        getter, setter = [v for v in node_collection if v.snippet.name == 'C.x']
+        helper = next(v for v in node_collection if v.snippet.name == 'helper')
+        assert getter.leaves == [helper] and setter.leaves == []
+        getter.comment = 'getter'
+        setter.comment = 'setter'
+
+        fn.write_text(
+            'def helper():\n'
+            '    pass\n'
+            '\n'
+            'class C:\n'
+            '    @property\n'
+            '    def x(self):\n'
+            '        return helper()\n'
+            '\n'
+            '    @x.setter\n'
+            '    def x(self, value):\n'
+            '        helper()\n'
+        )
+        os.utime(fn, ns=(fn.stat().st_atime_ns, fn.stat().st_mtime_ns + 10**9))
+        changes = parser.update(node_collection)
+        # Snippet of class includes its methods
+        assert [v.snippet.name for v in changes['updated']] == ['C', 'C.x']
+        assert changes['updated'][1] is setter
+        assert changes['added'] == [] and changes['removed'] == []
+        assert getter.comment == 'getter' and 'return helper()' in getter.snippet.content
+        assert setter.comment == 'setter' and 'value):\n        helper()' in setter.snippet.content
+        assert getter.leaves == [helper] and setter.leaves == [helper]
+        node_collection.validate()
+
+        # The setter is removed
+        fn.write_text(
+            'def helper():\n'
+            '    pass\n'
+            '\n'
+            'class C:\n'
+            '    @property\n'
+            '    def x(self):\n'
+            '        return helper()\n'
+        )
+        os.utime(fn, ns=(fn.stat().st_atime_ns, fn.stat().st_mtime_ns + 2 * 10**9))
+        changes = parser.update(node_collection)
+        assert changes['removed'] == [setter]
+        assert [v.snippet.name for v in changes['updated']] == ['C']
+        assert getter in node_collection.nodes and getter.leaves == [helper]
+        assert helper.roots == [getter]
+        node_collection.validate()
+
+    def test_update_without_manifest(self):
+        parser = get_graph_parser('.py')
+        with pytest.raises(ValueError, match='not imported from Python source'):
+            parser.update(NodeCollection([]))
+
+
+def _fib(n):
+    return n if n < 2 else _fib(n - 1) + _fib(n - 2)
+
+
+def _profiled_main():
+    sorted(range(10))
+    return _fib(8)
+
+
+@pytest.fixture
+def pstats_file(tmpdir):
+    import cProfile
+
+    profile = cProfile.Profile()
+    profile.runcall(_profiled_main)
+    fn = str(Path(tmpdir, 'main.prof'))
+    profile.dump_stats(fn)
+    return fn
+
+
+class TestPstatsParser:
+    def get_parser(self, tmpdir, **kwargs):
+        return get_graph_parser('.prof', cache_dir=str(Path(tmpdir, 'cache')), **kwargs)
+
+    def test_parse(self, pstats_file, tmpdir):
+        node_collection = self.get_parser(tmpdir, use_cache=False).parse(pstats_file)
+        node_map = {v.snippet.name: v for v in node_collection}
+        main, fib = node_map['_profiled_main'], node_map['_fib']
+
+        assert main.snippet.path == __file__
+        assert main.snippet.line_start == _profiled_main.__code__.co_firstlineno
+        assert fib.metadata['ncalls'] == 67 and fib.metadata['pcalls'] == 1
+        assert fib.metadata['cumtime'] <= main.metadata['cumtime']
+
+        # Recursive calls are self references
+        assert fib in main.leaves and fib in fib.leaves
+        assert node_map['<built-in method builtins.sorted>'] in main.leaves
+        assert node_collection.metadata['pstats']['n_functions'] == len(node_collection)
+        node_collection.validate()
+
+    def test_prune(self, pstats_file, tmpdir):
+        threshold = 1e6
+        parser = self.get_parser(tmpdir, use_cache=False, min_cumulative_time=threshold)
+        assert len(parser.parse(pstats_file)) == 0
+
+        parser = self.get_parser(tmpdir, use_cache=False)
+        full = parser.parse(pstats_file)
+        threshold = sorted(v.metadata['cumtime'] for v in full)[len(full) // 2]
+        parser = self.get_parser(tmpdir, use_cache=False, min_cumulative_time=threshold)
+        pruned = parser.parse(pstats_file)
+        assert 0 < len(pruned) < len(full)
+        assert all(v.metadata['cumtime'] >= threshold for v in pruned)
+        pruned.validate()
+
+    def test_cache(self, pstats_file, tmpdir, mocker):
+        from codememo.graph_parsers import _pstats
+
+        parser = self.get_parser(tmpdir)
+        spy = mocker.spy(_pstats, 'load_stats')
+        node_collection = parser.parse(pstats_file)
+        cached = parser.parse(pstats_file)
+        assert spy.call_count == 1
+        assert [v.to_record() for v in cached] == [
+            dict(v.to_record(), uuid=w.to_record()['uuid'])
+            for v, w in zip(node_collection, cached)
         ]
+        assert sorted(v.root_idx for v in cached.resolve_index_links()) == \
+            sorted(v.root_idx for v in node_collection.resolve_index_links())
+        assert list(Path(tmpdir, 'cache').iterdir()) == [
+            Path(parser.get_cache_path(node_collection.metadata['pstats']['hash']))
+        ]
+
+        # Cache is keyed by threshold as well
+        self.get_parser(tmpdir, min_cumulative_time=1.0).parse(pstats_file)
+        assert spy.call_count == 2
+
+        # Broken cache is ignored
+        Path(tmpdir, 'cache').joinpath(Path(parser.get_cache_path(
+            node_collection.metadata['pstats']['hash']
+        )).name).write_bytes(b'broken')
+        assert len(parser.parse(pstats_file)) == len(node_collection)
+        assert spy.call_count == 3
+
+    def test_parse_iter(self, pstats_file, tmpdir):
+        parser = self.get_parser(tmpdir)
+        batches = list(parser.parse_iter(pstats_file, batch_size=2))
+        assert len(batches) == 4
+        node_collection = NodeCollection.from_batches(batches)
+        assert len(node_collection) == len(parser.parse(pstats_file))
+        node_collection.validate()
+
+    def test_parse_invalid_file(self, tmpdir):
+        fn = Path(tmpdir, 'invalid.prof')
+        fn.write_text('not a profile')
+        with pytest.raises(ValueError, match='not a pstats file'):
+            self.get_parser(tmpdir, use_cache=False).parse(str(fn))
+
+
+class TestFoldedStackParser:
+    TEXT = (
+        'main (app.py:10);foo (app.py:4);bar (app.py:1) 3\n'
+        'main (app.py:10);foo (app.py:4) 2\n'
+        '\n'
+        'main (app.py:10);foo (app.py:4);foo (app.py:4);<native> 5\n'
+        'main (app.py:10);bar (app.py:1) 1\n'
+    )
+
+    def test_parse(self, tmpdir):
+        fn = Path(tmpdir, 'profile.folded')
+        fn.write_text(self.TEXT)
+        node_collection = get_graph_parser('.folded').parse(str(fn))
+
+        node_map = {v.snippet.name: v for v in node_collection}
+        assert list(node_map) == ['main', 'foo', 'bar', '<native>']
+        main, foo, bar, native = node_map.values()
+        assert (main.snippet.path, main.snippet.line_start) == ('app.py', 10)
+        assert (native.snippet.path, native.snippet.line_start) == ('', 1)
+
+        # Recursive frames are counted once per sample
+        assert main.metadata == {'samples': 11, 'self_samples': 0}
+        assert foo.metadata == {'samples': 10, 'self_samples': 2}
+        assert bar.metadata == {'samples': 4, 'self_samples': 4}
+        assert native.metadata == {'samples': 5, 'self_samples': 5}
+
+        assert main.leaves == [foo, bar]
+        assert foo.leaves == [bar, foo, native]
+        node_collection.validate()
+
+    def test_parse_iter(self, tmpdir):
+        fn = Path(tmpdir, 'profile.txt')
+        fn.write_text(self.TEXT)
+        batches = list(get_graph_parser('.txt').parse_iter(str(fn), batch_size=2))
+        assert [len(v[0]) for v in batches] == [2, 2, 0, 0, 0]
+        assert sum(len(v[1]) for v in batches) == 5
+
+    @pytest.mark.parametrize('line', ['main;foo', 'main;foo x', '3'])
+    def test_parse_invalid_file(self, tmpdir, line):
+        fn = Path(tmpdir, 'profile.folded')
+        fn.write_text(f'main 1\n{line}\n')
+        with pytest.raises(ValueError, match='Invalid folded stack at line 2'):
+            get_graph_parser('.folded').parse(str(fn))
+
+
+class TestCtagsParser:
+    SOURCE = 'class Foo:\n    def bar(self):\n        return 1\n\n\ndef buzz():\n    pass\n'
+    TAGS = [
+        {'name': 'Foo', 'path': 'mod.py', 'line': 1, 'end': 3, 'kind': 'class'},
+        {'name': 'bar', 'path': 'mod.py', 'line': 2, 'end': 3, 'kind': 'member', 'scope': 'Foo'},
+        {'name': 'buzz', 'path': 'mod.py', 'line': 6, 'end': 7, 'kind': 'function'},
+    ]
+
+    @pytest.fixture
+    def tags_file(self, tmpdir):
+        Path(tmpdir, 'mod.py').write_text(self.SOURCE)
+        fn = Path(tmpdir, 'project.tags')
+        fn.write_text(''.join(
+            json.dumps(dict(_type='tag', language='Python', **v)) + '\n' for v in self.TAGS
+        ))
+        return str(fn)
+
+    def test_parse(self, tags_file):
+        parser = get_graph_parser('.tags', kinds=['class', 'function'], use_cache=False)
+        node_collection = parser.parse(tags_file)
+        assert [v.snippet.name for v in node_collection] == ['Foo', 'buzz']
+        assert node_collection.nodes[1].snippet.content == 'def buzz():\n    pass'
+        assert node_collection.nodes[1].snippet.line_start == 6
+        assert node_collection.nodes[1].metadata == {'kind': 'function'}
+        assert node_collection.metadata['ctags'] == {'path': tags_file, 'n_symbols': 3}
+
+    def test_parse_default_kinds(self, tags_file):
+        node_collection = get_graph_parser('.tags', use_cache=False).parse(tags_file)
+        assert [v.snippet.name for v in node_collection] == ['Foo', 'Foo.bar', 'buzz']
+        assert node_collection.metadata['ctags']['n_symbols'] == 3
+
+    def test_parse_all_kinds(self, tags_file):
+        with open(tags_file, 'a') as f:
+            f.write(json.dumps({
+                '_type': 'tag', 'language': 'Python', 'name': 'X', 'path': 'mod.py',
+                'line': 1, 'kind': 'variable',
+            }) + '\n')
+        parser = get_graph_parser('.tags', kinds=[], use_cache=False)
+        node_collection = parser.parse(tags_file)
+        assert [v.snippet.name for v in node_collection] == ['Foo', 'X', 'Foo.bar', 'buzz']
+
+    def test_parse_tags_file_name(self, tags_file):
+        fn = Path(tags_file).with_name('tags')
+        Path(tags_file).rename(fn)
+        parser_type = parser_registry.get_parser_type(str(fn))
+        assert parser_type == 'tags'
+        assert parser_registry.get_parser_type(tags_file) == '.tags'
+        node_collection = get_graph_parser(parser_type, use_cache=False).parse(str(fn))
+        assert len(node_collection) == 3
+
+
+class TestBatchImporter:
+    GRAPHS = [
+        'digraph G { main -> foo; foo -> util }',
+        'digraph G { main -> bar; bar -> util }',
+        'digraph G { main -> foo; foo -> util; util -> log }',
+        'digraph G { other }',
+    ]
+
+    @pytest.fixture
+    def graph_dir(self, tmpdir):
+        root = Path(tmpdir, 'graphs')
+        root.joinpath('sub').mkdir(parents=True)
+        for i, text in enumerate(self.GRAPHS):
+            root.joinpath('sub' if i == 3 else '', f'test_{i}.dot').write_text(text)
+        root.joinpath('notes.txt').write_text('not a graph')
+        return root
+
+    def check_merged(self, node_collection, graph_dir):
+        from codememo.graph_parsers.batch import METADATA_KEY, SOURCES_KEY
+
+        node_map = {v.snippet.name: v for v in node_collection}
+        assert sorted(node_map) == ['bar', 'foo', 'log', 'main', 'other', 'util']
+        assert [v.snippet.name for v in node_map['main'].leaves] == ['foo', 'bar']
+        assert [v.snippet.name for v in node_map['util'].roots] == ['foo', 'bar']
+        sources = node_collection.metadata[METADATA_KEY]['sources']
+        assert sorted([Path(v).name for v in sources]) == [f'test_{i}.dot' for i in range(4)]
+
+        def get_sources(name):
+            return sorted([Path(sources[i]).name for i in node_map[name].metadata[SOURCES_KEY]])
+
+        assert get_sources('main') == ['test_0.dot', 'test_1.dot', 'test_2.dot']
+        assert get_sources('log') == ['test_2.dot']
+        assert get_sources('other') == ['test_3.dot']
+        node_collection.validate()
+
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_import_directory(self, graph_dir, max_workers):
+        from codememo.graph_parsers.batch import BatchImporter
+
+        importer = BatchImporter(parser_type='.dot', max_workers=max_workers)
+        node_collection = importer.import_from(str(graph_dir))
+        self.check_merged(node_collection, graph_dir)
+
+    def test_import_glob(self, graph_dir):
+        from codememo.graph_parsers.batch import BatchImporter, expand_sources
+
+        pattern = str(graph_dir.joinpath('**', 'test_*.dot'))
+        assert len(expand_sources(pattern)) == 4
+        node_collection = BatchImporter(max_workers=1).import_from(pattern)
+        self.check_merged(node_collection, graph_dir)
+
+        with pytest.raises(ValueError, match='No file'):
+            BatchImporter().import_from(str(graph_dir.joinpath('*.prof')))
+
+    def test_import_with_errors(self, graph_dir):
+        from codememo.graph_parsers.batch import BatchImporter, METADATA_KEY
+
+        fn_invalid = graph_dir.joinpath('invalid.dot')
+        fn_invalid.write_text('digraph G { a -> ')
+        files = [str(fn_invalid), str(graph_dir.joinpath('test_0.dot'))]
+        node_collection = BatchImporter(max_workers=1).import_files(files)
+        assert [v.snippet.name for v in node_collection] == ['main', 'foo', 'util']
+        errors = node_collection.metadata[METADATA_KEY]['errors']
+        assert list(errors) == [str(fn_invalid)]
+        assert 'unexpected end of file' in errors[str(fn_invalid)]
+
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_import_with_progress(self, graph_dir, max_workers):
+        from codememo.graph_parsers.batch import BatchImporter
+        from codememo.tasks import TaskProgress
+
+        importer = BatchImporter(parser_type='.dot', max_workers=max_workers)
+        importer.progress = TaskProgress()
+        node_collection = importer.import_from(str(graph_dir))
+        assert importer.progress.bytes_read == importer.progress.bytes_total == 0
+        assert importer.progress.stage == 'Building'
+        assert importer.progress.n_nodes == len(node_collection) == 6
+        assert importer.progress.n_edges == 5
+
+    def test_cancel_import(self, graph_dir, mocker):
+        from codememo.exceptions import TaskCancelledException
+        from codememo.graph_parsers import batch
+        from codememo.tasks import TaskProgress
+
+        importer = batch.BatchImporter(parser_type='.dot', max_workers=1)
+        importer.progress = progress = TaskProgress()
+        parse_file = batch._parse_file
 
-        assert set(node_names) == set(desired_node_names)
+        def parse_and_cancel(args):
+            progress.cancel()
+            return parse_file(args)
 
-        # Here we won't validate `root_slot` and `leaf_slot` of `NodeLink`s because
-        # we cannot guarantee that order of leaf nodes generated by other tools will
-        # always match to our implementation.
-        assert set(node_links) == set(desired_node_links)
+        spy = mocker.patch.object(batch, '_parse_file', side_effect=parse_and_cancel)
+        with pytest.raises(TaskCancelledException):
+            importer.import_from(str(graph_dir))
+        # Cancellation is checked between files
+        assert spy.call_count == 1
+        assert progress.bytes_total == 4
+        assert progress.bytes_read == 0
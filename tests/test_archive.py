@@ -0,0 +1,134 @@
+from pathlib import Path
+import pytest
+
+from codememo.archive import ProjectArchive
+from codememo.objects import Snippet, Node, NodeCollection
+from codememo.exceptions import FileLoadingException
+
+
+@pytest.fixture
+def dummy_node_collection():
+    data = [
+        ('foo.py', 'def foo():\n    bar()\n    buzz()\n', 'python'),
+        ('bar.py', 'def bar():\n    print("bar")', 'python'),
+        ('buzz.py', 'def buzz():\n    print("buzz")', 'python'),
+        ('orphan_0', 'print(0)', None),
+        ('orphan_1', 'print(1)', None),
+    ]
+    nodes = [Node(Snippet(v[0], v[1], lang=v[2])) for v in data]
+
+    # foo --> bar, buzz; orphan_0 --> orphan_1
+    nodes[0].add_leaf(nodes[1], 2)
+    nodes[0].add_leaf(nodes[2], 3)
+    nodes[3].add_leaf(nodes[4])
+    return NodeCollection(nodes)
+
+
+class TestProjectArchive:
+    def test__write_and_load(self, dummy_node_collection, tmpdir):
+        fn = str(Path(tmpdir, f'project{ProjectArchive.SUFFIX}'))
+        dummy_node_collection.save(fn)
+
+        assert ProjectArchive.is_archive(fn)
+        loaded = NodeCollection.load(fn)
+        assert loaded.to_dict() == dummy_node_collection.to_dict()
+        assert loaded.metadata == {}
+
+        dummy_node_collection.metadata['source'] = {'files': ['foo.py']}
+        dummy_node_collection.save(fn)
+        with ProjectArchive(fn) as archive:
+            assert archive.names == [v.snippet.name for v in dummy_node_collection]
+            assert archive.metadata == {'source': {'files': ['foo.py']}}
+        loaded = NodeCollection.load(fn)
+        assert loaded.to_dict() == dummy_node_collection.to_dict()
+
+    def test__random_access(self, dummy_node_collection, tmpdir):
+        fn = str(Path(tmpdir, f'project{ProjectArchive.SUFFIX}'))
+        ProjectArchive.write(dummy_node_collection, fn)
+
+        with ProjectArchive(fn) as archive:
+            assert len(archive) == len(dummy_node_collection)
+            assert archive.names == [v.snippet.name for v in dummy_node_collection]
+            assert archive.find('^orphan') == [3, 4]
+            assert list(archive.iter_leaves(0)) == [(1, 2, None), (2, 3, None)]
+
+            node = archive.read_node(4)
+            assert node.uuid == dummy_node_collection[4].uuid
+            assert list(archive._nodes) == [4]
+
+    def test__load_subgraph(self, dummy_node_collection, tmpdir):
+        fn = str(Path(tmpdir, f'project{ProjectArchive.SUFFIX}'))
+        ProjectArchive.write(dummy_node_collection, fn)
+
+        with ProjectArchive(fn) as archive:
+            subgraph = archive.load_subgraph([3])
+        assert [v.snippet.name for v in subgraph] == ['orphan_0', 'orphan_1']
+        assert subgraph[1].roots == [subgraph[0]]
+
+    def test__access_advice(self, dummy_node_collection, tmpdir):
+        fn = str(Path(tmpdir, f'project{ProjectArchive.SUFFIX}'))
+        ProjectArchive.write(dummy_node_collection, fn)
+
+        with ProjectArchive(fn) as archive:
+            # No hint is given until records are read
+            assert archive._advice is None
+            archive.to_node_collection()
+            assert archive._advice == 'MADV_SEQUENTIAL'
+            archive.read_node(1)
+            assert archive._advice == 'MADV_RANDOM'
+            archive.to_node_collection()
+            assert archive._advice == 'MADV_SEQUENTIAL'
+            archive.load_subgraph([3])
+            assert archive._advice == 'MADV_RANDOM'
+
+    def test__invalid_file(self, tmpdir):
+        fn = str(Path(tmpdir, 'invalid.cma'))
+        with open(fn, 'wb') as f:
+            f.write(b'{"nodes": []}')
+        assert not ProjectArchive.is_archive(fn)
+        with pytest.raises(FileLoadingException, match='Invalid archive'):
+            ProjectArchive(fn)
+
+    def test__corrupted_trailer(self, dummy_node_collection, tmpdir):
+        import struct
+
+        fn = str(Path(tmpdir, f'project{ProjectArchive.SUFFIX}'))
+        dummy_node_collection.save(fn)
+        with open(fn, 'rb') as f:
+            data = f.read()
+        size = ProjectArchive.TRAILER_SIZE
+        n_nodes, n_edges, offset_footer, size_names, magic = struct.unpack(
+            ProjectArchive.TRAILER_FORMAT, data[-size:]
+        )
+
+        def write(body, trailer):
+            with open(fn, 'wb') as f:
+                f.write(body + struct.pack(ProjectArchive.TRAILER_FORMAT, *trailer))
+
+        for body, trailer in [
+            # Truncated tables
+            (data[:offset_footer + 20], (n_nodes, n_edges, offset_footer, size_names, magic)),
+            # Tables out of file
+            (data[:-size], (n_nodes, n_edges, len(data) * 2, size_names, magic)),
+            (data[:-size], (2**40, n_edges, offset_footer, size_names, magic)),
+            # Misaligned tables
+            (data[:-size], (n_nodes, n_edges, offset_footer + 1, size_names - 1, magic)),
+            # Inconsistent offsets
+            (data[:-size], (n_nodes - 1, n_edges, offset_footer, size_names + 8, magic)),
+        ]:
+            write(body, trailer)
+            with pytest.raises(FileLoadingException, match='Invalid archive'):
+                NodeCollection.load(fn)
+
+    def test__corrupted_edges(self, dummy_node_collection, tmpdir):
+        fn = str(Path(tmpdir, f'project{ProjectArchive.SUFFIX}'))
+        dummy_node_collection.save(fn)
+        with ProjectArchive(fn) as archive:
+            pos = archive._offsets[archive.n_nodes] + 16 * (archive.n_nodes + 1)
+        # Leaf index of the first edge
+        with open(fn, 'r+b') as f:
+            f.seek(pos)
+            f.write((100).to_bytes(8, 'little'))
+        for trusted in [False, True]:
+            with pytest.raises(FileLoadingException, match='invalid references'):
+                NodeCollection.load(fn, trusted=trusted)
@@ -0,0 +1,452 @@
+from pathlib import Path
+import json
+import math
+import time
+
+import pytest
+from codememo.components import (
+    CodeNodeViewer, ConfirmationModal, MenuBar, SaveFileDialog, TaskProgressModal, Vec2,
+)
+from codememo.config import AppConfig
+from codememo.exceptions import NodeValidationException
+from codememo.internal import GlobalState
+from codememo.objects import Node, NodeCollection, Snippet
+from codememo.shortcuts import IOWrapper, ShortcutRegistry
+
+
+class DummyApp:
+    """An application without window, which is enough for components whose
+    logic is run without rendering."""
+
+    def __init__(self):
+        self.imgui_components = []
+        self.config = AppConfig()
+        self.shortcuts_registry = ShortcutRegistry(IOWrapper(None))
+
+    def add_component(self, component):
+        self.imgui_components.append(component)
+
+    def remove_component(self, component):
+        self.imgui_components.remove(component)
+
+
+@pytest.fixture
+def app():
+    return DummyApp()
+
+
+@pytest.fixture
+def viewer(app):
+    # main -> foo -> util, main -> bar
+    nodes = [Node(Snippet(name, 'pass')) for name in ['main', 'foo', 'bar', 'util']]
+    nodes[0].add_leaf(nodes[1])
+    nodes[0].add_leaf(nodes[2])
+    nodes[1].add_leaf(nodes[3])
+    return CodeNodeViewer(app, NodeCollection(nodes))
+
+
+def get_component(viewer, name):
+    return next(v for v in viewer.node_components if v.node.snippet.name == name)
+
+
+class TestMenuBar:
+    def test_open_invalid_project(self, app, tmpdir):
+        fn = str(Path(tmpdir, 'project.json'))
+        NodeCollection([Node(Snippet('main', 'pass'))]).save(fn)
+        with open(fn, 'r') as f:
+            data = json.load(f)
+        data['nodes'][0]['uuid'] = 'not-a-uuid'
+        with open(fn, 'w') as f:
+            json.dump(data, f)
+
+        # Project is validated before a viewer is created
+        MenuBar(app)._open_project(fn)
+        progress_window, = app.imgui_components
+        assert isinstance(progress_window, TaskProgressModal)
+        assert progress_window.task.wait(10)
+        progress_window.render()
+        assert app.imgui_components == []
+        assert isinstance(GlobalState().pop_error(), NodeValidationException)
+        assert not GlobalState().error_occured
+
+
+    def test_quit(self, app, mocker):
+        import threading
+        from codememo.tasks import BackgroundTask
+
+        # There is nothing to save, so the viewer is closed without confirmation
+        viewer = CodeNodeViewer(app, NodeCollection([]))
+        event = threading.Event()
+        task = BackgroundTask(lambda progress: event.wait(10)).start()
+        progress_window = TaskProgressModal(app, 'Loading', task)
+        app.add_component(progress_window)
+        app.add_component(viewer)
+        spy = mocker.spy(viewer, 'close')
+        mocked_exit = mocker.patch('builtins.exit')
+
+        # Viewers are closed first, progress windows are not touched
+        menu_bar = MenuBar(app)
+        menu_bar.quit()
+        assert spy.call_count == 1
+        assert app.imgui_components == [progress_window]
+        assert mocked_exit.call_count == 0
+
+        menu_bar.quit()
+        assert mocked_exit.call_count == 1
+        event.set()
+        assert task.wait(10)
+
+
+class TestTaskProgressModal:
+    def test_close(self, app):
+        from codememo.exceptions import TaskCancelledException
+        from codememo.tasks import BackgroundTask
+
+        def wait_for_cancellation(progress):
+            while True:
+                progress.check()
+                time.sleep(0.01)
+
+        task = BackgroundTask(wait_for_cancellation).start()
+        progress_window = TaskProgressModal(app, 'Loading', task)
+        app.add_component(progress_window)
+        progress_window.close()
+        assert progress_window.terminated and app.imgui_components == []
+        assert task.wait(10)
+        assert isinstance(task.exception, TaskCancelledException)
+
+    def test_close_finished_task(self, app):
+        from codememo.tasks import BackgroundTask
+
+        results = []
+        task = BackgroundTask(lambda progress: 42).start()
+        assert task.wait(10)
+        progress_window = TaskProgressModal(app, 'Loading', task, callback=results.append)
+        app.add_component(progress_window)
+        progress_window.render()
+        assert results == [42] and progress_window.terminated
+        assert not task.progress.cancelled
+
+
+class TestSaveFileDialog:
+    def test_save_new_file(self, app, tmpdir):
+        saved = []
+        dialog = SaveFileDialog(app, saved.append)
+        dialog.filename = str(Path(tmpdir, 'project.json'))
+        dialog.handle_save()
+        assert saved == [dialog.filename]
+        assert dialog.terminated and dialog not in app.imgui_components
+
+    def test_overwrite_existing_file(self, app, tmpdir):
+        saved = []
+        fn = Path(tmpdir, 'project.json')
+        fn.write_text('{}')
+        dialog = SaveFileDialog(app, saved.append)
+        dialog.filename = str(fn)
+        dialog.handle_save()
+        assert saved == [] and not dialog.terminated
+        assert isinstance(dialog.confirmation_modal, ConfirmationModal)
+
+        dialog.confirmation_modal.callback_yes()
+        assert saved == [str(fn)]
+        assert dialog.terminated
+
+    def test_directory(self, app, tmpdir):
+        saved = []
+        dialog = SaveFileDialog(app, saved.append)
+        dialog.filename = str(tmpdir)
+        dialog.handle_save()
+        assert saved == [] and not dialog.terminated
+        assert dialog.error_msg == 'Invalid filename.'
+
+
+class TestNodeSelection:
+    def get_selected_names(self, viewer):
+        return sorted([v.node.snippet.name for v in viewer.selected_node_components])
+
+    def test_select_node_components(self, viewer):
+        main, foo, bar = [get_component(viewer, v) for v in ['main', 'foo', 'bar']]
+        viewer.select_node_components([main, foo])
+        assert self.get_selected_names(viewer) == ['foo', 'main']
+
+        viewer.select_node_components([bar], add=True)
+        assert self.get_selected_names(viewer) == ['bar', 'foo', 'main']
+
+        viewer.select_node_components([bar])
+        assert self.get_selected_names(viewer) == ['bar']
+
+    def test_click(self, viewer):
+        main, foo = get_component(viewer, 'main'), get_component(viewer, 'foo')
+        viewer.handle_node_clicked(main)
+        assert viewer.selected_node is main and viewer.id_selected == main.id
+        assert self.get_selected_names(viewer) == ['main']
+
+        # Clicking another node replaces selection
+        viewer.handle_node_clicked(foo)
+        assert viewer.selected_node is foo
+        assert self.get_selected_names(viewer) == ['foo']
+
+    def test_ctrl_click_toggles_selection(self, viewer):
+        main, foo = get_component(viewer, 'main'), get_component(viewer, 'foo')
+        viewer.handle_node_clicked(main)
+        viewer.handle_node_clicked(foo, multi_selection=True)
+        assert viewer.selected_node is foo
+        assert self.get_selected_names(viewer) == ['foo', 'main']
+
+        viewer.handle_node_clicked(main, multi_selection=True)
+        assert viewer.selected_node is foo
+        assert self.get_selected_names(viewer) == ['foo']
+
+    def test_deselect_selected_node(self, viewer):
+        main, foo = get_component(viewer, 'main'), get_component(viewer, 'foo')
+        viewer.handle_node_clicked(main)
+        viewer.handle_node_clicked(foo, multi_selection=True)
+
+        # The node selected last is deselected by CTRL + click
+        viewer.handle_node_clicked(foo, multi_selection=True)
+        assert viewer.selected_node is None and viewer.id_selected == -1
+        assert self.get_selected_names(viewer) == ['main']
+
+        viewer.handle_node_clicked(main)
+        viewer.select_node_components([])
+        assert viewer.selected_node is None and viewer.id_selected == -1
+
+    def test_remove_selected_node_components(self, viewer):
+        main, foo = get_component(viewer, 'main'), get_component(viewer, 'foo')
+        viewer.handle_node_clicked(main)
+        viewer.handle_node_clicked(foo, multi_selection=True)
+        viewer.remove_selected_node_components()
+        assert len(viewer.node_components) == 4
+
+        viewer.confirmation_modal.callback_yes()
+        # Leaves which are not selected are kept
+        names = [v.node.snippet.name for v in viewer.node_components]
+        assert names == ['bar', 'util']
+        assert [v.snippet.name for v in viewer.node_collection] == ['bar', 'util']
+        assert all([len(v.node.roots) == 0 for v in viewer.node_components])
+        assert set(viewer.node_component_map) == set([v.node.nid for v in viewer.node_components])
+        assert viewer.links == []
+        assert viewer.selected_node is None and viewer.id_selected == -1
+        assert viewer.selected_node_components == set()
+        viewer.node_collection.validate()
+
+    def test_remove_without_selection(self, viewer):
+        viewer.remove_selected_node_components()
+        assert viewer.confirmation_modal is None
+
+
+class TestCanvasZoom:
+    @pytest.mark.parametrize('zoom', [0.1, 0.5, 1.5, 1e-4, 100.0])
+    @pytest.mark.parametrize('pivot', [(0, 0), (320, 240), (-50, 1000)])
+    def test_zoom_at(self, viewer, zoom, pivot):
+        pivot = Vec2(*pivot)
+        viewer.panning = Vec2(120.0, -80.0)
+        viewer.zoom = 0.8
+        canvas_pos = viewer.to_canvas_pos(pivot)
+
+        viewer.zoom_at(zoom, pivot)
+        assert viewer.zoom == min(max(zoom, viewer.ZOOM_MIN), viewer.ZOOM_MAX)
+        # Position under the pivot is kept even if the zoom is clamped
+        assert tuple(viewer.to_canvas_pos(pivot)) == pytest.approx(tuple(canvas_pos))
+
+    def test_zoom_to_fit(self, viewer):
+        for i, component in enumerate(viewer.node_components):
+            component.pos = Vec2(i * 3000.0, i * -500.0)
+        viewer._canvas_size = Vec2(800.0, 600.0)
+        viewer.zoom_to_fit()
+        assert viewer.ZOOM_MIN <= viewer.zoom < 1
+
+        x_min, y_min, x_max, y_max = viewer.get_visible_rect()
+        for component in viewer.node_components:
+            x0, y0, x1, y1 = component.rect
+            assert x_min <= x0 and x1 <= x_max and y_min <= y0 and y1 <= y_max
+
+    def test_zoom_to_fit_clamped(self, viewer):
+        viewer._canvas_size = Vec2(1e6, 1e6)
+        viewer.zoom_to_fit()
+        assert viewer.zoom == viewer.ZOOM_MAX
+
+    def test_zoom_to_fit_nothing(self, app, viewer):
+        # Zero-size canvas, i.e. it's not rendered yet
+        viewer.zoom_to_fit()
+        assert viewer.zoom == 1.0 and viewer.panning == Vec2(0.0, 0.0)
+
+        empty_viewer = CodeNodeViewer(app, NodeCollection([]))
+        empty_viewer._canvas_size = Vec2(800.0, 600.0)
+        empty_viewer.zoom_to_fit()
+        assert empty_viewer.zoom == 1.0 and empty_viewer.panning == Vec2(0.0, 0.0)
+
+
+class TestLodGeometry:
+    @pytest.fixture
+    def lod_viewer(self, app):
+        # a -> b, a -> c, a -> d, c -> c
+        nodes = [Node(Snippet(name, 'pass')) for name in 'abcd']
+        for leaf in nodes[1:]:
+            nodes[0].add_leaf(leaf)
+        nodes[2].add_leaf(nodes[2])
+        viewer = CodeNodeViewer(app, NodeCollection(nodes))
+        # At zoom 0.01, b and c are in the same grid cell, and so are a and d
+        positions = {'a': (0.0, 0.0), 'b': (10000.0, 0.0), 'c': (10000.0, 50.0), 'd': (0.5, 0.5)}
+        for name, pos in positions.items():
+            get_component(viewer, name).pos = Vec2(*pos)
+        viewer.zoom = 0.01
+        return viewer
+
+    def test_snapping(self, lod_viewer):
+        grid = lod_viewer.LOD_GRID_SIZE
+        geometry = lod_viewer._build_lod_geometry((0, 0, 20000, 20000))
+        assert geometry['zoom'] == 0.01
+        for values in geometry['node_rects'] + geometry['segments']:
+            assert all([v % grid == 0 for v in values])
+        # Nodes smaller than a grid cell are still drawn
+        for x0, y0, x1, y1 in geometry['node_rects']:
+            assert x1 - x0 >= grid and y1 - y0 >= grid
+
+    def test_dedup(self, lod_viewer):
+        grid = lod_viewer.LOD_GRID_SIZE
+        geometry = lod_viewer._build_lod_geometry((0, 0, 20000, 20000))
+        assert sorted(geometry['node_rects']) == [(0, 0, grid, grid), (100, 0, 100 + grid, grid)]
+        # Links to b and c are merged, and the link to d and the self reference
+        # of c are omitted since they are collapsed to a point.
+        assert geometry['segments'] == [(0, 0, 100, 0)]
+
+    def test_region(self, lod_viewer):
+        # Only nodes and links around the visible region are included
+        geometry = lod_viewer._build_lod_geometry((-100, -100, -50, -50))
+        assert geometry['region'] == (-150, -150, 0, 0)
+        assert geometry['node_rects'] == [(0, 0, 2, 2)]
+        assert geometry['segments'] == [(0, 0, 100, 0)]
+
+
+class TestLinkGeometry:
+    def get_link_indices(self, viewer, name):
+        return sorted([
+            i for i, v in enumerate(viewer.links)
+            if name in (v.root.snippet.name, v.leaf.snippet.name)
+        ])
+
+    def test_cache_invalidated_by_moving_node(self, viewer):
+        n_links = len(viewer.links)
+        geometry = [viewer._get_link_geometry(i) for i in range(n_links)]
+        assert sorted(viewer._link_geometry) == list(range(n_links))
+
+        bar = get_component(viewer, 'bar')
+        bar.pos = bar.pos + Vec2(100.0, 50.0)
+        # Only links of the moved node are dropped
+        moved = self.get_link_indices(viewer, 'bar')
+        assert len(moved) == 1
+        assert sorted(viewer._link_geometry) == [i for i in range(n_links) if i not in moved]
+
+        idx = moved[0]
+        x1, y1, x2, y2 = geometry[idx][:4]
+        assert viewer._get_link_geometry(idx)[:4] == (x1 + 100.0, y1 + 50.0, x2, y2)
+
+    def test_cache_cleared_by_links(self, viewer):
+        for i in range(len(viewer.links)):
+            viewer._get_link_geometry(i)
+        viewer.links = viewer.node_collection.resolve_links()
+        assert viewer._link_geometry == {}
+
+    def get_old_geometry(self, viewer, link, offset, zoom):
+        """Geometry computed in each frame before it's cached."""
+        cos30d, sin30d = 0.8660254037844387, 0.5
+        node_leaf = viewer.node_component_map[link.leaf.nid]
+        node_root = viewer.node_component_map[link.root.nid]
+        p1 = offset + node_leaf.get_root_slot_pos(link.root_slot) * zoom
+        p2 = offset + node_root.get_leaf_slot_pos(link.leaf_slot) * zoom
+
+        circle = None
+        if node_root is node_leaf:
+            top_mid = offset + (node_leaf.pos + Vec2(node_leaf.size.x / 2, 0)) * zoom
+            v_mid_p2 = p2 - top_mid
+            d = math.sqrt(v_mid_p2.x**2 + v_mid_p2.y**2)
+            u_mid_p2 = v_mid_p2 * (1/d)
+            un_mid_p2 = Vec2(-u_mid_p2.y, u_mid_p2.x)
+            center = (p2 + top_mid) * 0.5 - un_mid_p2 * (d/2)
+            circle = (center.x, center.y, d / 2**0.5)
+            p1 = top_mid
+
+        vd = Vec2(0, 1) if circle is not None else (p1 - p2)
+        d = math.sqrt(vd.x**2 + vd.y**2)
+        vd = vd * (viewer.LINK_ARROW_LENGTH/d)
+        a1 = p1 - Vec2(vd.x*cos30d + vd.y*sin30d, -vd.x*sin30d + vd.y*cos30d)
+        a2 = p1 - Vec2(vd.x*cos30d - vd.y*sin30d, vd.x*sin30d + vd.y*cos30d)
+        return (p1.x, p1.y, p2.x, p2.y, a1.x, a1.y, a2.x, a2.y), circle
+
+    @pytest.fixture
+    def imgui_context(self):
+        from codememo.vendor import imgui
+
+        # Colors are converted by current context, no frame is required
+        context = imgui.create_context()
+        yield
+        imgui.destroy_context(context)
+
+    @pytest.mark.parametrize('zoom', [1.0, 0.37, 1.8])
+    def test_display_links(self, app, imgui_context, zoom):
+        # a -> b, a -> c, b -> b
+        nodes = [Node(Snippet(name, 'pass')) for name in ['a', 'b', 'c']]
+        nodes[0].add_leaf(nodes[1])
+        nodes[0].add_leaf(nodes[2])
+        nodes[1].add_leaf(nodes[1])
+        viewer = CodeNodeViewer(app, NodeCollection(nodes))
+        get_component(viewer, 'c').pos = Vec2(-120.0, 340.0)
+        viewer.zoom = zoom
+        viewer.panning = Vec2(500.0, 500.0)
+        viewer._canvas_size = Vec2(5000.0, 5000.0)
+        offset = Vec2(13.0, 7.0)
+
+        expected = {'line': [], 'circle': [], 'slot': [], 'arrow': []}
+        for link in viewer.links:
+            vertices, circle = self.get_old_geometry(viewer, link, offset, zoom)
+            if circle is None:
+                expected['line'].append(vertices[:4])
+            else:
+                expected['circle'].append(circle)
+            expected['slot'].extend([vertices[:2], vertices[2:4]])
+            expected['arrow'].append(vertices[:2] + vertices[4:])
+
+        def sort(values):
+            return sorted(values, key=lambda v: [round(x, 3) for x in v])
+
+        draw_list = RecordingDrawList()
+        viewer.display_links(draw_list, offset)
+        for kind, values in expected.items():
+            assert len(draw_list.calls[kind]) == len(values)
+            for drawn, value in zip(sort(draw_list.calls[kind]), sort(values)):
+                assert drawn == pytest.approx(value)
+        assert len(expected['line']) == 2 and len(expected['circle']) == 1
+
+        # Geometry is cached, and it's drawn the same in the next frame
+        assert len(viewer._link_geometry) == 3
+        calls = draw_list.calls
+        draw_list = RecordingDrawList()
+        viewer.display_links(draw_list, offset)
+        assert draw_list.calls == calls
+
+
+class RecordingDrawList:
+    """A draw list recording coordinates of primitives."""
+
+    def __init__(self):
+        self.calls = {'line': [], 'circle': [], 'slot': [], 'arrow': []}
+
+    def channels_split(self, count):
+        pass
+
+    def channels_set_current(self, idx):
+        pass
+
+    def add_line(self, x1, y1, x2, y2, color):
+        self.calls['line'].append((x1, y1, x2, y2))
+
+    def add_circle(self, cx, cy, r, color):
+        self.calls['circle'].append((cx, cy, r))
+
+    def add_circle_filled(self, x, y, r, color):
+        self.calls['slot'].append((x, y))
+
+    def add_polyline(self, points, color, closed=False):
+        assert closed
+        self.calls['arrow'].append(tuple(v for point in points for v in point))
@@ -0,0 +1,77 @@
+from pathlib import Path
+import json
+import shutil
+import pytest
+
+from codememo.compression import detect_compression, open_text
+from codememo.objects import NodeCollection
+from codememo.exceptions import FileLoadingException
+from codememo.tasks import TaskProgress
+
+THIS_DIR = Path(__file__).parent
+
+
+@pytest.fixture
+def dummy_node_collection():
+    fn_data = Path(THIS_DIR, 'node_collection_data.json')
+    with open(fn_data, 'r') as f:
+        return NodeCollection.from_dict(json.load(f))
+
+
+@pytest.mark.parametrize('suffix, compression', [
+    ('.json', None), ('.json.gz', 'gzip'), ('.json.xz', 'xz'), ('.json.bz2', 'bz2'),
+])
+def test__save_and_load(dummy_node_collection, tmpdir, suffix, compression):
+    fn = str(Path(tmpdir, f'project{suffix}'))
+    dummy_node_collection.save(fn)
+    assert detect_compression(fn) == compression
+
+    loaded = NodeCollection.load(fn)
+    assert loaded.to_dict() == dummy_node_collection.to_dict()
+
+
+def test__detect_compression__by_content(dummy_node_collection, tmpdir):
+    fn = str(Path(tmpdir, 'project.json.gz'))
+    fn_renamed = str(Path(tmpdir, 'project.json'))
+    dummy_node_collection.save(fn)
+    shutil.move(fn, fn_renamed)
+
+    assert detect_compression(fn_renamed) == 'gzip'
+    assert detect_compression(fn_renamed, by_content=False) is None
+    assert NodeCollection.load(fn_renamed).to_dict() == dummy_node_collection.to_dict()
+
+
+def test__open_text__large_content(tmpdir):
+    fn = str(Path(tmpdir, 'large.txt.xz'))
+    lines = [f'line {i}: 節點' for i in range(100000)]
+    with open_text(fn, 'w') as f:
+        for line in lines:
+            f.write(line + '\n')
+    with open_text(fn, 'r') as f:
+        assert f.read().splitlines() == lines
+
+
+@pytest.mark.parametrize('suffix', ['.json.gz', '.json.xz', '.json.bz2'])
+@pytest.mark.parametrize('corrupt', ['truncate', 'garble'])
+@pytest.mark.parametrize('with_progress', [False, True])
+def test__load__corrupted_file(dummy_node_collection, tmpdir, suffix, corrupt, with_progress):
+    fn = str(Path(tmpdir, f'project{suffix}'))
+    dummy_node_collection.save(fn)
+    with open(fn, 'rb') as f:
+        data = f.read()
+    if corrupt == 'truncate':
+        data = data[:len(data) // 2]
+    else:
+        # Keep the header, so that compression is still detected
+        data = data[:16] + bytes(255 - v for v in data[16:])
+    with open(fn, 'wb') as f:
+        f.write(data)
+
+    progress = TaskProgress() if with_progress else None
+    with pytest.raises(FileLoadingException, match='decompressing'):
+        NodeCollection.load(fn, progress=progress)
+
+
+def test__load__missing_file(tmpdir):
+    with pytest.raises(FileNotFoundError):
+        NodeCollection.load(str(Path(tmpdir, 'missing.json.bz2')))
@@ -8,6 +8,7 @@ import codememo.config as mod_config
 from codememo.config import (
     AppConfig, AppDefaults,
     AppHistory, RecentlyOpenedFilesHistory,
+    ImporterConfig, ImporterDefaults,
 )
 
 
@@ -155,3 +156,15 @@ class TestRecentlyOpenedFilesHistory:
 
         recent_files.clear()
         assert len(recent_files) == 0
+
+
+class TestImporterConfig:
+    def test__ctags_kinds_are_not_shared(self):
+        config = ImporterConfig()
+        config.ctags_kinds.append('variable')
+        assert 'variable' not in ImporterConfig().ctags_kinds
+        assert 'variable' not in ImporterDefaults.ctags_kinds
+
+        options = config.get_parser_options('.tags')
+        options['kinds'].clear()
+        assert config.ctags_kinds == ['class', 'function', 'method', 'member', 'variable']
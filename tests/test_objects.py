@@ -1,12 +1,14 @@
 from pathlib import Path
+from uuid import UUID
 import json
 import pytest
 
 from codememo.objects import (
-    Snippet, Node, NodeLink, NodeIndexLink, NodeCollection
+    Snippet, Node, NodeLink, NodeIndexLink, NodeCollection, FORMAT_VERSION,
 )
 from codememo.exceptions import (
-    NodeRemovalException, NodeReferenceException,
+    FileLoadingException, NodeRemovalException, NodeReferenceException,
+    NodeValidationException,
 )
 
 
@@ -185,6 +187,34 @@ class TestNode:
         node = Node.from_dict(data)
         assert node.to_dict() == data
 
+    def test__nid(self, dummy_nodes):
+        A, B = dummy_nodes[:2]
+        assert isinstance(A.nid, int) and A.nid != B.nid
+        A.add_leaf(B, 2)
+        assert list(B.ref_infos) == [A.nid]
+
+    def test__uuid(self, dummy_node_data):
+        record = {'uuid': dummy_node_data['uuid'], 'snippet': dummy_node_data['snippet']}
+        node = Node.from_record(record, trusted=True)
+        assert node.to_record()['uuid'] == record['uuid']
+        assert node.uuid == UUID(record['uuid'])
+
+        with pytest.raises(TypeError, match='uuid should be an instance'):
+            node.uuid = 42
+
+    def test__metadata(self, dummy_node_data):
+        node = Node.from_dict(dummy_node_data)
+        assert 'metadata' not in node.to_record()
+        node.metadata['ncalls'] = 3
+        assert node.to_dict()['metadata'] == {'ncalls': 3}
+
+        for trusted in [False, True]:
+            restored = Node.from_record(node.to_record(), trusted=trusted)
+            assert restored.metadata == {'ncalls': 3}
+
+        with pytest.raises(TypeError, match='metadata should be an instance'):
+            node.metadata = None
+
     def test__add_leaf__self_reference(self, dummy_nodes):
         A = dummy_nodes[0]
         A.add_leaf(A)
@@ -292,7 +322,7 @@ class TestNodeCollection:
         ref_start, ref_stop = 1, 2
         node_collection.add_leaf_reference(root, leaf, ref_start=1, ref_stop=2)
         assert root in leaf.roots
-        ref_info = leaf.ref_infos[root.uuid]
+        ref_info = leaf.ref_infos[root.nid]
         assert (ref_info.start, ref_info.stop) == (ref_start, ref_stop)
 
     def test__remove_root_reference(self, dummy_nodes_multiple_trees):
@@ -396,10 +426,154 @@ class TestNodeCollection:
         links = node_collection.resolve_links()
         assert links == []
 
+    def test__remove_nodes(self, dummy_nodes_multiple_trees):
+        nodes, *_ = dummy_nodes_multiple_trees
+        node_collection = NodeCollection(list(nodes))
+        root, leaf_2, leaf_3 = [node_collection[i] for i in [0, 2, 3]]
+
+        # Nodes having leaves can be removed, and their leaves are kept
+        node_collection.remove_nodes([root, leaf_2])
+        assert root not in node_collection.nodes and leaf_2 not in node_collection.nodes
+        assert leaf_3 in node_collection.nodes
+        assert leaf_2 not in leaf_3.roots
+        assert len(root.leaves) == 0
+        node_collection.validate()
+
     def test__to_dict(self, dummy_node_collection_data):
+        data = NodeCollection.from_dict(dummy_node_collection_data).to_dict()
+        assert data['format_version'] == FORMAT_VERSION
+        node_collection = NodeCollection.from_dict(data)
+        assert node_collection.to_dict() == data
+
+    def test__to_dict__omit_defaults(self, dummy_node_collection_data):
+        data = NodeCollection.from_dict(dummy_node_collection_data).to_dict()
+        record_foo, record_bar, record_buzz = data['nodes']
+        assert 'roots' not in record_bar
+        assert 'comment' not in record_foo
+        assert record_foo['snippet'] == {
+            'name': 'foo.py', 'content': 'def foo():\n    bar()\n    buzz()\n',
+        }
+        assert record_bar['snippet']['line_start'] == 57
+        assert record_foo['leaves'] == [[1, 2, []], [2, 3]]
+
+    def test__from_dict__migrate_v1(self, dummy_node_collection_data):
         data = dummy_node_collection_data
         node_collection = NodeCollection.from_dict(data)
+        assert [v.to_dict() for v in node_collection] == data['nodes']
+
+    def test__from_dict__unsupported_version(self, dummy_node_collection_data):
+        data = dict(dummy_node_collection_data, format_version=FORMAT_VERSION + 1)
+        with pytest.raises(ValueError, match='Unsupported format version'):
+            NodeCollection.from_dict(data)
+
+    def test__from_dict__trusted(self, dummy_node_collection_data):
+        data = NodeCollection.from_dict(dummy_node_collection_data).to_dict()
+        node_collection = NodeCollection.from_dict(data, trusted=True)
         assert node_collection.to_dict() == data
+        node_collection.validate()
+
+        root, leaf = node_collection[0], node_collection[2]
+        assert leaf.roots == [root]
+        assert leaf.ref_infos[root.nid].start == 3
+
+    def test__validate(self, dummy_nodes_multiple_trees):
+        nodes, *_ = dummy_nodes_multiple_trees
+        node_collection = NodeCollection(nodes)
+        node_collection.validate()
+
+        # Break the symmetry of references
+        nodes[0].leaves.append(nodes[4])
+        with pytest.raises(NodeValidationException, match='is not a root of its leaf'):
+            node_collection.validate()
+
+    def test__validate__missing_leaf(self, dummy_nodes):
+        A, B = dummy_nodes[:2]
+        A.add_leaf(B)
+        with pytest.raises(NodeValidationException, match='does not exist in this collection'):
+            NodeCollection([A]).validate()
+
+    def test__add_edges(self, dummy_nodes):
+        edges = [(0, 1, 1, None), (0, 2, 2, None), (1, 1, 1, 2)]
+        node_collection = NodeCollection(dummy_nodes[:3])
+        trusted_collection = NodeCollection([Node(v.snippet) for v in dummy_nodes[:3]])
+        node_collection.add_edges(edges)
+        trusted_collection.add_edges(edges, trusted=True)
+
+        for collection in [node_collection, trusted_collection]:
+            collection.validate()
+            links = [
+                (link.root_idx, link.root_slot, link.leaf_idx, link.leaf_slot)
+                for link in collection.resolve_index_links()
+            ]
+            assert links == [(0, 0, 1, 0), (0, 0, 2, 1), (1, 1, 1, 0)]
+
+    @pytest.mark.parametrize('trusted', [False, True])
+    @pytest.mark.parametrize('edge', [(0, -1, 1, None), (-1, 0, 1, None), (0, 3, 1, None)])
+    def test__add_edges__out_of_range(self, dummy_nodes, edge, trusted):
+        node_collection = NodeCollection(dummy_nodes[:3])
+        with pytest.raises(IndexError, match='out of range'):
+            node_collection.add_edges([edge], trusted=trusted)
+        assert all(len(v.leaves) == 0 for v in dummy_nodes[:3])
+
+    @pytest.mark.parametrize('trusted', [False, True])
+    def test__load__negative_index(self, dummy_nodes, tmpdir, trusted):
+        fn = str(Path(tmpdir, 'project.json'))
+        NodeCollection(dummy_nodes[:2]).save(fn)
+        with open(fn, 'r') as f:
+            data = json.load(f)
+        data['nodes'][0]['leaves'] = [[-1, 1]]
+        with open(fn, 'w') as f:
+            json.dump(data, f)
+        with pytest.raises(FileLoadingException, match='invalid references'):
+            NodeCollection.load(fn, trusted=trusted)
+
+    def test__from_batches(self, dummy_nodes):
+        # Edges of the second batch refer to nodes of the first one
+        batches = [
+            (dummy_nodes[:2], [(0, 1, 1, None)]),
+            (dummy_nodes[2:4], [(0, 2, 2, None), (3, 1, 1, 2)]),
+        ]
+        node_collection = NodeCollection.from_batches(iter(batches))
+        assert node_collection.nodes == dummy_nodes[:4]
+        node_collection.validate()
+
+        links = [
+            (link.root_idx, link.leaf_idx) for link in node_collection.resolve_index_links()
+        ]
+        assert sorted(links) == [(0, 1), (0, 2), (3, 1)]
+
+    def test__iter_json(self, dummy_node_collection_data, dummy_nodes_multiple_trees):
+        nodes, *_ = dummy_nodes_multiple_trees
+        nodes[0].comment = 'comment with non-ASCII characters: 節點'
+        for node_collection in [
+            NodeCollection.from_dict(dummy_node_collection_data),
+            NodeCollection(nodes),
+            NodeCollection([]),
+            NodeCollection(nodes, metadata={'source': {'a.py': [1, '節點']}}),
+        ]:
+            desired = json.dumps(
+                node_collection.to_dict(), ensure_ascii=False, separators=(',', ':')
+            )
+            assert ''.join(node_collection.iter_json()) == desired
+
+    def test__save_and_load(self, dummy_node_collection_data, tmpdir):
+        fn_v1 = Path(tmpdir, 'v1.json')
+        fn_v2 = Path(tmpdir, 'v2.json')
+        with open(fn_v1, 'w') as f:
+            json.dump(dummy_node_collection_data, f, indent=2)
+
+        node_collection = NodeCollection.load(fn_v1)
+        node_collection.save(fn_v2)
+        assert fn_v2.stat().st_size < 0.6 * fn_v1.stat().st_size
+
+        loaded = NodeCollection.load(fn_v2)
+        assert loaded.to_dict() == node_collection.to_dict()
+        assert loaded.metadata == {}
+
+        node_collection.metadata['source'] = {'root': '/tmp'}
+        node_collection.save(fn_v2)
+        loaded = NodeCollection.load(fn_v2)
+        assert loaded.metadata == {'source': {'root': '/tmp'}}
 
     def test__resolve_link__multiple_trees(self, dummy_nodes_multiple_trees):
         nodes, desired_links, _ = dummy_nodes_multiple_trees
@@ -0,0 +1,114 @@
+from pathlib import Path
+import textwrap
+
+import pytest
+from codememo.objects import Snippet, Node
+from codememo.graph_parsers._dot import DotParser
+from codememo.sources import SourceFileCache, SourceResolver, read_block
+
+THIS_DIR = Path(__file__).parent
+DIR_GRAPH_PARSERS = THIS_DIR.joinpath('graph_parsers')
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    pkg = tmp_path.joinpath('pkg')
+    pkg.mkdir()
+    pkg.joinpath('__init__.py').write_text('def init_func():\n    pass\n')
+    pkg.joinpath('mod.py').write_text(textwrap.dedent("""\
+        import functools
+
+
+        class Foo:
+            @functools.lru_cache()
+            def bar(self):
+                def inner():
+                    return 1
+                return inner()
+
+
+        def buzz():
+            x = 1
+            return x
+    """))
+    return tmp_path
+
+
+class TestSourceResolver:
+    def test_resolve_qualname(self, source_tree):
+        nodes = [
+            Node(Snippet('pkg.mod.Foo.bar', '')),
+            Node(Snippet('pkg.mod.Foo.bar.<locals>.inner', '')),
+            Node(Snippet('pkg.init_func', '')),
+            Node(Snippet('pkg.mod.missing', '')),
+            Node(Snippet('unknown.func', '')),
+        ]
+        resolver = SourceResolver(source_roots=[str(source_tree)])
+        resolved = resolver.resolve(nodes)
+        assert resolved == nodes[:3]
+
+        snippet = nodes[0].snippet
+        assert snippet.line_start == 5
+        assert snippet.content.startswith('    @functools.lru_cache()')
+        assert snippet.content.endswith('return inner()')
+        assert snippet.lang == 'python'
+        assert snippet.path == str(source_tree.joinpath('pkg', 'mod.py'))
+        assert nodes[1].snippet.content.strip().startswith('def inner')
+        assert nodes[2].snippet.content == 'def init_func():\n    pass'
+        assert nodes[3].snippet.content == ''
+
+    def test_resolve_path_and_line(self, source_tree):
+        nodes = [
+            # Line of definition (e.g. from pstats)
+            Node(Snippet('buzz', '', line_start=13, path='pkg/mod.py')),
+            # Line inside definition (e.g. from folded stacks)
+            Node(Snippet('bar', '', line_start=9, path='pkg/mod.py')),
+            Node(Snippet('<module>', '', line_start=1, path='pkg/__init__.py')),
+            Node(Snippet('foo', '', line_start=1, path='foo.c')),
+        ]
+        resolver = SourceResolver(source_roots=[str(source_tree)])
+        resolved = resolver.resolve(nodes)
+        assert resolved == nodes[:3]
+        assert nodes[0].snippet.content == 'def buzz():\n    x = 1\n    return x'
+        assert nodes[1].snippet.line_start == 5
+        assert nodes[2].snippet.content == 'def init_func():\n    pass'
+        # Each file is read only once
+        assert len(resolver.file_cache) == 2
+
+    def test_keep_existing_content(self, source_tree):
+        node = Node(Snippet('pkg.mod.buzz', 'existing'))
+        resolver = SourceResolver(source_roots=[str(source_tree)])
+        assert resolver.resolve([node]) == []
+        assert resolver.resolve([node], overwrite=True) == [node]
+        assert node.snippet.content.startswith('def buzz')
+
+    def test_shared_file_cache(self, source_tree):
+        file_cache = SourceFileCache()
+        for name in ['pkg.mod.buzz', 'pkg.mod.Foo']:
+            resolver = SourceResolver(source_roots=[str(source_tree)], file_cache=file_cache)
+            resolver.resolve([Node(Snippet(name, ''))])
+        assert len(file_cache) == 1
+
+    def test_resolve_dot_call_graph(self):
+        fn_script = DIR_GRAPH_PARSERS.joinpath('script_for_call_graph.py')
+        node_collection = DotParser().parse(
+            str(DIR_GRAPH_PARSERS.joinpath('call_graph_sample.dot'))
+        )
+        resolver = SourceResolver(main_path=str(fn_script))
+        resolved = resolver.resolve(node_collection)
+
+        # `__main__` is a node added by pycallgraph, it's not a definition
+        assert set([v.snippet.name for v in resolved]) == set([
+            '<module>', 'main', 'foo', 'bar', 'buzz', 'my_print',
+        ])
+        snippet = [v.snippet for v in node_collection if v.snippet.name == 'foo'][0]
+        assert snippet.content == "def foo():\n    my_print('foo')"
+        assert snippet.line_start == 4
+        node_collection.validate()
+
+
+def test_read_block():
+    lines = ['def foo():\n', '    return 1\n', '\n', 'x = 1\n']
+    assert read_block(lines, 1) == 'def foo():\n    return 1'
+    assert read_block(lines, 4) == 'x = 1'
+    assert read_block(lines, 5) == ''
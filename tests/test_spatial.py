@@ -0,0 +1,72 @@
+import random
+
+import pytest
+from codememo.spatial import GridIndex
+
+
+def brute_force_query(rects, rect):
+    return {
+        k for k, v in rects.items()
+        if v[0] <= rect[2] and rect[0] <= v[2] and v[1] <= rect[3] and rect[1] <= v[3]
+    }
+
+
+class TestGridIndex:
+    def test_query(self):
+        index = GridIndex(cell_size=100)
+        index.insert('a', (0, 0, 50, 20))
+        index.insert('b', (150, 150, 200, 170))
+        # A long link across lots of cells
+        index.insert('c', (-1000, 10, 5000, 5000))
+        assert len(index) == 3
+        assert 'a' in index and 'd' not in index
+
+        assert index.query((0, 0, 100, 100)) == {'a', 'c'}
+        assert index.query((190, 160, 300, 300)) == {'b', 'c'}
+        assert index.query((-5000, -5000, -2000, -2000)) == set()
+        assert index.query_point(50, 20) == {'a', 'c'}
+        assert index.query_point(0, 0) == {'a'}
+        # Querying a region larger than the populated one
+        assert index.query((-1e6, -1e6, 1e6, 1e6)) == {'a', 'b', 'c'}
+
+    def test_update(self):
+        index = GridIndex(cell_size=100)
+        index.insert('a', (0, 0, 50, 20))
+        index.insert('a', (10, 10, 60, 30))
+        assert index.get('a') == (10, 10, 60, 30)
+        assert index.query_point(5, 5) == set()
+
+        index.insert('a', (1000, 1000, 1050, 1020))
+        assert index.query((0, 0, 100, 100)) == set()
+        assert index.query_point(1000, 1000) == {'a'}
+
+        index.remove('a')
+        index.remove('a')
+        assert len(index) == 0
+        assert index.get('a') is None
+        assert index.query((-1e6, -1e6, 1e6, 1e6)) == set()
+        assert index._levels == {}
+
+        with pytest.raises(ValueError):
+            index.insert('a', (10, 0, 0, 10))
+
+    def test_random(self):
+        rng = random.Random(0)
+        index, rects = GridIndex(cell_size=64), {}
+        for i in range(2000):
+            x, y = rng.uniform(-5000, 5000), rng.uniform(-5000, 5000)
+            w, h = rng.expovariate(1 / 100), rng.expovariate(1 / 100)
+            rects[i] = (x, y, x + w, y + h)
+            index.insert(i, rects[i])
+        for i in rng.sample(range(2000), 500):
+            x, y = rng.uniform(-5000, 5000), rng.uniform(-5000, 5000)
+            rects[i] = (x, y, x + 80, y + 20)
+            index.insert(i, rects[i])
+        for i in rng.sample(range(2000), 500):
+            del rects[i]
+            index.remove(i)
+
+        for _ in range(100):
+            x, y = rng.uniform(-6000, 6000), rng.uniform(-6000, 6000)
+            rect = (x, y, x + rng.uniform(0, 2000), y + rng.uniform(0, 2000))
+            assert index.query(rect) == brute_force_query(rects, rect)
@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+from codememo.symbols import SymbolIndex, load_symbol_index
+
+SOURCE = '''\
+class Foo:
+    def bar(self):
+        return 1
+
+    def baz(self):
+        return 2
+
+
+def bar_func():
+    return Foo().bar()
+'''
+
+
+def make_tags(path, tags):
+    with open(path, 'w') as f:
+        f.write(json.dumps({'_type': 'ptag', 'name': 'JSON_OUTPUT_VERSION'}) + '\n')
+        for tag in tags:
+            f.write(json.dumps(dict(_type='tag', language='Python', **tag)) + '\n')
+
+
+@pytest.fixture
+def tags_file(tmp_path):
+    tmp_path.joinpath('mod.py').write_text(SOURCE)
+    fn = str(tmp_path.joinpath('project.tags'))
+    make_tags(fn, [
+        {'name': 'Foo', 'path': 'mod.py', 'line': 1, 'end': 6, 'kind': 'class'},
+        {'name': 'bar', 'path': 'mod.py', 'line': 2, 'end': 3, 'kind': 'member', 'scope': 'Foo'},
+        # Without `end`, block is read according to indentation
+        {'name': 'baz', 'path': 'mod.py', 'line': 5, 'kind': 'member', 'scope': 'Foo'},
+        # Without `line`, it's found by pattern
+        {'name': 'bar_func', 'path': 'mod.py', 'pattern': '/^def bar_func():$/', 'kind': 'function'},
+    ])
+    return fn
+
+
+class TestSymbolIndex:
+    def test_lookup(self, tags_file):
+        with open(tags_file, 'rb') as f:
+            index = SymbolIndex.from_tags(f, root=os.path.dirname(tags_file))
+        assert len(index) == 4
+
+        assert [v.name for v in index.search('BA')] == ['bar', 'bar_func', 'baz']
+        assert [v.name for v in index.search('ba', limit=1)] == ['bar']
+        assert index.search('') == []
+        assert index.search('x') == []
+
+        symbols = index.find('bar')
+        assert len(symbols) == 1
+        assert symbols[0].scope == 'Foo'
+        assert symbols[0].path == os.path.join(os.path.dirname(tags_file), 'mod.py')
+        assert index.find('Bar') == []
+
+        assert [v.name for v in index.iter_symbols(['member'])] == ['bar', 'baz']
+
+    def test_read_snippet(self, tags_file):
+        index = load_symbol_index(tags_file, use_cache=False)
+
+        snippet = index.read_snippet(index.find('bar')[0])
+        assert snippet.name == 'Foo.bar'
+        assert snippet.content == '    def bar(self):\n        return 1'
+        assert snippet.line_start == 2
+        assert snippet.lang == 'python'
+
+        snippet = index.read_snippet(index.find('baz')[0])
+        assert snippet.content == '    def baz(self):\n        return 2'
+
+        snippet = index.read_snippet(index.find('bar_func')[0])
+        assert snippet.line_start == 9
+        assert snippet.content == 'def bar_func():\n    return Foo().bar()'
+
+    def test_cache(self, tags_file, tmp_path):
+        cache_dir = str(tmp_path.joinpath('cache'))
+        index = load_symbol_index(tags_file, cache_dir=cache_dir)
+        # Loaded indices are kept in memory
+        assert load_symbol_index(tags_file, cache_dir=cache_dir) is index
+
+        fn_cache = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+        loaded = SymbolIndex.load(fn_cache)
+        assert [v.name for v in loaded.search('b')] == ['bar', 'bar_func', 'baz']
+
+        with open(fn_cache, 'wb') as f:
+            f.write(b'broken')
+        with pytest.raises(ValueError):
+            SymbolIndex.load(fn_cache)
+
+    def test_invalid_tags(self, tmp_path):
+        with pytest.raises(ValueError, match='line 2'):
+            SymbolIndex.from_tags(['{"_type": "ptag"}', '{broken'])
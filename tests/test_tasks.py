@@ -0,0 +1,189 @@
+from pathlib import Path
+import io
+import json
+import os
+import threading
+
+import pytest
+from codememo.exceptions import FileLoadingException, TaskCancelledException
+from codememo.graph_parsers import get_graph_parser
+from codememo.objects import Node, NodeCollection, Snippet
+from codememo.tasks import BackgroundTask, ProgressReader, TaskProgress, new_process_pool
+
+THIS_DIR = Path(__file__).parent
+FN_DOT_SAMPLE = THIS_DIR.joinpath('graph_parsers', 'call_graph_sample.dot')
+FN_PROJECT_SAMPLE = THIS_DIR.joinpath('node_collection_data.json')
+
+
+class TestProgressReader:
+    def test_read(self):
+        progress = TaskProgress()
+        with ProgressReader(io.BytesIO(b'foo\nbar\nbuzz\n'), progress) as f:
+            assert f.readline() == b'foo\n'
+            assert progress.bytes_read == 4
+            assert list(f) == [b'bar\n', b'buzz\n']
+            assert progress.bytes_read == 13
+            assert f.read() == b''
+
+    def test_cancel(self):
+        progress = TaskProgress()
+        f = ProgressReader(io.StringIO('foo\nbar\n'), progress)
+        assert f.read(2) == 'fo'
+        progress.cancel()
+        with pytest.raises(TaskCancelledException):
+            f.read(2)
+        with pytest.raises(TaskCancelledException):
+            next(iter(f))
+
+
+class TestBackgroundTask:
+    def test_result(self):
+        def func(progress):
+            progress.n_nodes = 3
+            return 'done'
+
+        task = BackgroundTask(func).start()
+        assert task.wait(5)
+        assert task.done and not task.cancelled
+        assert task.result == 'done'
+        assert task.exception is None
+        assert task.progress.n_nodes == 3
+
+        with pytest.raises(RuntimeError):
+            task.start()
+
+    def test_exception(self):
+        def func(progress):
+            raise ValueError('invalid file')
+
+        task = BackgroundTask(func).start()
+        assert task.wait(5)
+        assert isinstance(task.exception, ValueError)
+        assert not task.cancelled
+
+    def test_cancel(self):
+        started = threading.Event()
+
+        def func(progress):
+            started.set()
+            while True:
+                progress.check()
+
+        task = BackgroundTask(func).start()
+        assert started.wait(5)
+        task.cancel()
+        assert task.wait(5)
+        assert task.cancelled
+        assert task.result is None
+
+
+def test_new_process_pool(mocker):
+    import multiprocessing
+
+    spy = mocker.spy(multiprocessing, 'get_context')
+    with new_process_pool(1) as executor:
+        assert executor.submit(os.getpid).result() != os.getpid()
+    spy.assert_called_once_with('spawn')
+
+
+class TestParserProgress:
+    @pytest.mark.parametrize('ext, fn_factory', [
+        ('.dot', lambda tmpdir: FN_DOT_SAMPLE),
+        ('.folded', lambda tmpdir: _write(tmpdir, 'profile.folded', 'main;foo 1\nmain;bar 2\n')),
+    ])
+    def test_report(self, tmpdir, ext, fn_factory):
+        fn = fn_factory(tmpdir)
+        parser = get_graph_parser(ext)
+        parser.progress = TaskProgress()
+        node_collection = parser.parse(str(fn))
+
+        progress = parser.progress
+        assert progress.bytes_total == Path(fn).stat().st_size
+        assert progress.bytes_read == progress.bytes_total
+        assert progress.fraction == 1.0
+        assert progress.n_nodes == len(node_collection)
+        assert progress.n_edges == len(node_collection.resolve_links())
+
+    def test_cancel(self):
+        parser = get_graph_parser('.dot')
+        parser.progress = TaskProgress()
+        parser.progress.cancel()
+        with pytest.raises(TaskCancelledException):
+            parser.parse(FN_DOT_SAMPLE)
+
+    def test_no_progress(self):
+        parser = get_graph_parser('.dot')
+        assert parser.progress is None
+        assert len(parser.parse(FN_DOT_SAMPLE)) == 7
+
+
+class TestLoadProgress:
+    @pytest.fixture
+    def node_collection(self):
+        nodes = [Node(Snippet(f'func_{i}', f'def func_{i}():\n    pass')) for i in range(10)]
+        for root, leaf in zip(nodes[:-1], nodes[1:]):
+            root.add_leaf(leaf, 2)
+        return NodeCollection(nodes)
+
+    @pytest.mark.parametrize('suffix', ['.json', '.json.gz', '.json.xz', '.cma'])
+    def test_load(self, node_collection, tmpdir, suffix):
+        fn = str(Path(tmpdir, f'project{suffix}'))
+        node_collection.save(fn)
+
+        progress = TaskProgress()
+        loaded = NodeCollection.load(fn, progress=progress)
+        assert loaded.to_dict() == node_collection.to_dict()
+        assert progress.stage == 'Building graph'
+        assert progress.n_nodes == len(node_collection)
+        assert progress.n_edges == len(node_collection.resolve_links())
+
+    def test_read_compressed(self, node_collection, tmpdir):
+        # Compressed bytes are counted while reading
+        fn = str(Path(tmpdir, 'project.json.gz'))
+        node_collection.save(fn)
+
+        progress = TaskProgress()
+        stages = []
+        start_stage = progress.start_stage
+
+        def record_stage(name, total=0):
+            stages.append((name, progress.bytes_read, progress.bytes_total))
+            start_stage(name, total)
+
+        progress.start_stage = record_stage
+        NodeCollection.load(fn, progress=progress)
+        size = Path(fn).stat().st_size
+        assert [v[0] for v in stages] == ['Reading', 'Decoding', 'Building graph']
+        assert stages[1][1:] == (size, size)
+
+    def test_decode_formatted_file(self, tmpdir):
+        # Files not written by `save()` (e.g. edited by hand) are decoded as well
+        fn = str(Path(tmpdir, 'project.json'))
+        with open(FN_PROJECT_SAMPLE, 'r') as f:
+            data = json.load(f)
+        with open(fn, 'w') as f:
+            json.dump(data, f, indent=4)
+
+        loaded = NodeCollection.load(fn, progress=TaskProgress())
+        assert loaded.to_dict() == NodeCollection.from_dict(data).to_dict()
+
+        with open(fn, 'w') as f:
+            f.write('{"nodes": [] ')
+        with pytest.raises(FileLoadingException, match='decoding'):
+            NodeCollection.load(fn, progress=TaskProgress())
+
+    @pytest.mark.parametrize('suffix', ['.json', '.cma'])
+    def test_cancel(self, node_collection, tmpdir, suffix):
+        fn = str(Path(tmpdir, f'project{suffix}'))
+        node_collection.save(fn)
+
+        progress = TaskProgress()
+        progress.cancel()
+        with pytest.raises(TaskCancelledException):
+            NodeCollection.load(fn, progress=progress)
+
+
+def _write(tmpdir, name, text):
+    fn = Path(tmpdir, name)
+    fn.write_text(text)
+    return fn
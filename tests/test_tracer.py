@@ -0,0 +1,141 @@
+from pathlib import Path
+import sys
+import pytest
+
+from codememo import tracer
+from codememo.objects import NodeCollection
+from codememo.tracer import CallRecorder, read_source_block
+
+
+def leaf(x):
+    return x + 1
+
+
+def branch(n):
+    total = 0
+    for i in range(n):
+        total += leaf(i)
+    return total
+
+
+def root():
+    branch(3)
+    return leaf(
+        0
+    )
+
+
+def get_node_map(node_collection):
+    return {v.snippet.name: v for v in node_collection}
+
+
+class TestCallRecorder:
+    def test_record(self):
+        with CallRecorder() as recorder:
+            root()
+        assert sys.getprofile() is None
+
+        node_collection = recorder.to_node_collection()
+        node_map = get_node_map(node_collection)
+        assert {'root', 'branch', 'leaf'} <= set(node_map)
+        # Calls to the recorder itself are excluded
+        assert not any(v.snippet.path == tracer.__file__ for v in node_collection)
+
+        node_root, node_branch, node_leaf = [node_map[v] for v in ['root', 'branch', 'leaf']]
+        assert node_root.snippet.path == __file__
+        assert node_root.snippet.line_start == root.__code__.co_firstlineno
+        assert node_root.snippet.content.startswith('def root():\n    branch(3)')
+        assert node_leaf.metadata == {'calls': 4}
+        assert node_root.leaves == [node_branch, node_leaf]
+
+        # Lines of call sites are relative to snippet of caller
+        assert node_branch.ref_infos[node_root.nid].start == 2
+        assert node_leaf.ref_infos[node_root.nid].start == 3
+        assert node_leaf.ref_infos[node_branch.nid].start == 4
+        node_collection.validate()
+
+    def test_decorator(self):
+        recorder = CallRecorder(with_source=False)
+        decorated = recorder(root)
+        decorated()
+        decorated()
+        assert not recorder.running
+
+        node_map = get_node_map(recorder.to_node_collection())
+        assert node_map['leaf'].metadata == {'calls': 8}
+        assert node_map['root'].snippet.content == ''
+        assert node_map['leaf'].ref_infos[node_map['root'].nid].start == 1
+
+    def test_sampling(self):
+        with CallRecorder(sample_interval=2) as recorder:
+            for _ in range(10):
+                leaf(0)
+        node_map = get_node_map(recorder.to_node_collection())
+        assert node_map['leaf'].metadata == {'calls': 5}
+
+    def test_cprofile(self, tmpdir):
+        with CallRecorder(line_numbers=False) as recorder:
+            root()
+        fn = str(Path(tmpdir, 'calls.json'))
+        recorder.save(fn)
+
+        node_collection = NodeCollection.load(fn)
+        node_map = get_node_map(node_collection)
+        node_root, node_leaf = node_map['root'], node_map['leaf']
+        assert node_leaf.metadata['ncalls'] == 4
+        assert node_leaf in node_root.leaves
+        assert node_root.snippet.lang == 'python'
+        assert node_root.snippet.content.startswith('def root():')
+        assert node_collection.metadata['tracer'] == {'sample_interval': 1, 'line_numbers': False}
+        assert not any(v.snippet.path == tracer.__file__ for v in node_collection)
+        node_collection.validate()
+
+    @pytest.mark.parametrize('line_numbers', [True, False])
+    def test_restore_previous_profiler(self, line_numbers):
+        events = []
+
+        def outer_profile(frame, event, arg):
+            events.append(event)
+
+        sys.setprofile(outer_profile)
+        try:
+            with CallRecorder(line_numbers=line_numbers) as recorder:
+                n_events = len(events)
+                root()
+                # Outer profiler is suspended while recording
+                assert len(events) == n_events
+            assert sys.getprofile() is outer_profile
+        finally:
+            sys.setprofile(None)
+
+        node_map = get_node_map(recorder.to_node_collection())
+        assert {'root', 'branch', 'leaf'} <= set(node_map)
+
+        # Recorders can be nested, calls are recorded by the inner one then
+        with CallRecorder() as outer:
+            with CallRecorder() as inner:
+                leaf(0)
+            root()
+        assert sys.getprofile() is None
+        assert 'leaf' in get_node_map(inner.to_node_collection())
+        assert 'root' in get_node_map(outer.to_node_collection())
+
+    def test_invalid_usage(self):
+        with pytest.raises(ValueError, match='sampling is not supported'):
+            CallRecorder(sample_interval=2, line_numbers=False)
+
+        recorder = CallRecorder()
+        with recorder:
+            with pytest.raises(RuntimeError, match='running already'):
+                recorder.start()
+            with pytest.raises(RuntimeError, match='should be stopped first'):
+                recorder.to_node_collection()
+
+
+def test_read_source_block():
+    line_start = branch.__code__.co_firstlineno
+    content = read_source_block(__file__, line_start)
+    assert content.splitlines()[0] == 'def branch(n):'
+    assert content.splitlines()[-1] == '    return total'
+    assert read_source_block(__file__, 10**6) == ''
+    assert read_source_block('not_exist.py', 1) == ''